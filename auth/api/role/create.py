@@ -4,6 +4,7 @@ from flask_jwt_extended import jwt_required
 from flask_restful import Resource, reqparse
 
 from core.permissions import is_admin_permissions
+from core.role_catalog import bump_catalog_version
 from models import Role
 from utils.decorators import api_response_wrapper
 from utils.rate_limit import rate_limit
@@ -100,6 +101,7 @@ class RoleCreate(Resource):
         if not Role.by_name_exist(role_name=role_name):
             new_role = Role(name=role_name)
             new_role.save_to_db()
+            bump_catalog_version()
             return role_schema.dump(new_role), http.HTTPStatus.CREATED
         return {
             "message": "wrong data",
@@ -4,6 +4,8 @@ from flask_jwt_extended import jwt_required
 from flask_restful import Resource, abort, reqparse
 
 from core.permissions import is_admin_permissions
+from core.role_catalog import bump_catalog_version, catalog_response
+from core.role_service import get_role_user_ids, invalidate_user_roles
 from db import db
 from models import Role
 from utils.decorators import api_response_wrapper
@@ -38,6 +40,10 @@ class RoleDetail(Resource):
             required: true
             description: The ID of user's role
             type: string
+          - in: header
+            name: If-None-Match
+            type: string
+            description: ETag of a previous response
         responses:
           200:
             description: The Role data
@@ -66,13 +72,21 @@ class RoleDetail(Resource):
                           type: string
                           default: 2022-02-27 14:12
                   default: []
+          304:
+            description: The role has not changed since the ETag
+          404:
+            description: Role doesn't exist
           429:
             description: Too many requests. Limit in interval seconds.
         """
         from schemas.role import role_schema
 
-        role = return_or_abort_if_role_not_exist(role_id=role_id)
-        return role_schema.dump(role), http.HTTPStatus.OK
+        return catalog_response(
+            name=f"role:{role_id}",
+            render=lambda: role_schema.dump(
+                return_or_abort_if_role_not_exist(role_id=role_id)
+            ),
+        )
 
     @rate_limit()
     @api_response_wrapper()
@@ -162,6 +176,8 @@ class RoleDetail(Resource):
             role = return_or_abort_if_role_not_exist(role_id=role_id)
             role.name = new_name
             role.save_to_db()
+            bump_catalog_version()
+            invalidate_user_roles(*get_role_user_ids(role_id=role_id))
             return role_schema.dump(role), http.HTTPStatus.OK
 
     @rate_limit()
@@ -203,8 +219,11 @@ class RoleDetail(Resource):
         """
         role = return_or_abort_if_role_not_exist(role_id=role_id)
         if role:
+            user_ids: list[str] = get_role_user_ids(role_id=role_id)
             db.session.delete(role)
             db.session.commit()
+            bump_catalog_version()
+            invalidate_user_roles(*user_ids)
         return {
             "message": f"Role '{role_id}' has been deleted"
         }, http.HTTPStatus.ACCEPTED
@@ -1,5 +1,7 @@
+from flask import Response
 from flask_restful import Resource
 
+from core.role_catalog import catalog_response
 from models import Role
 from utils.decorators import api_response_wrapper
 from utils.rate_limit import rate_limit
@@ -8,12 +10,17 @@ from utils.rate_limit import rate_limit
 class RoleList(Resource):
     @rate_limit()
     @api_response_wrapper()
-    def get(self) -> dict:
+    def get(self) -> Response:
         """
         Return list of user's roles
         ---
         tags:
           - role
+        parameters:
+          - in: header
+            name: If-None-Match
+            type: string
+            description: ETag of a previous response
         responses:
           200:
             description: The Role data
@@ -51,9 +58,13 @@ class RoleList(Resource):
                 message:
                   type: string
                   description: Response message
+          304:
+            description: Roles have not changed since the ETag
           429:
             description: Too many requests. Limit in interval seconds.
         """
         from schemas.role import roles_schema
 
-        return {"roles": roles_schema.dump(Role.query.all())}
+        return catalog_response(
+            name="roles", render=lambda: {"roles": roles_schema.dump(Role.query.all())}
+        )
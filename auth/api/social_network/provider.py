@@ -1,6 +1,5 @@
 from flask import request, Blueprint
 
-from app import app
 from utils.rate_limit import rate_limit
 
 social_net = Blueprint('social_net', __name__)
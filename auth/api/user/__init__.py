@@ -1,7 +1,10 @@
 from flask import Blueprint
 from flask_restful import Api
 
+from utils.representations import output_json
+
 api_bp_user = Blueprint("user", __name__)
 api = Api(api_bp_user)
+api.representations["application/json"] = output_json
 
 from . import routes
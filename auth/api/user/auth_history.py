@@ -1,13 +1,38 @@
 import http
 
 from flask_jwt_extended import get_jwt_identity, jwt_required
-from flask_restful import Resource
+from flask_restful import Resource, inputs, reqparse
 
-from models import SuccessHistory
+from api.user.history_service import get_history_page
+from core import config
 from schemas.history import history_schema
 from utils.decorators import api_response_wrapper
 from utils.rate_limit import rate_limit
 
+parser = reqparse.RequestParser()
+parser.add_argument(
+    "limit",
+    type=inputs.int_range(1, config.HISTORY_MAX_PAGE_SIZE),
+    default=config.HISTORY_PAGE_SIZE,
+    location="args",
+    help=f"limit must be between 1 and {config.HISTORY_MAX_PAGE_SIZE}",
+)
+parser.add_argument("cursor", type=str, location="args", required=False)
+parser.add_argument(
+    "date_from",
+    type=inputs.datetime_from_iso8601,
+    location="args",
+    help="send date in ISO 8601 format",
+    required=False,
+)
+parser.add_argument(
+    "date_to",
+    type=inputs.datetime_from_iso8601,
+    location="args",
+    help="send date in ISO 8601 format",
+    required=False,
+)
+
 
 class AuthHistory(Resource):
     @rate_limit()
@@ -15,10 +40,33 @@ class AuthHistory(Resource):
     @jwt_required()
     def get(self) -> tuple[dict[str, str], int]:
         """
-        Return list of user's login history
+        Return page of user's login history, newest first
         ---
         tags:
           - profile
+        parameters:
+          - in: query
+            name: limit
+            type: integer
+            required: false
+            description: Page size
+          - in: query
+            name: cursor
+            type: string
+            required: false
+            description: next_cursor from the previous page
+          - in: query
+            name: date_from
+            type: string
+            format: date-time
+            required: false
+            description: Logins since the date (inclusive)
+          - in: query
+            name: date_to
+            type: string
+            format: date-time
+            required: false
+            description: Logins before the date (exclusive)
         responses:
           200:
             description: Success user's login
@@ -30,13 +78,58 @@ class AuthHistory(Resource):
                   default: True
                 data:
                   type: array
-                  description: Response data
+                  description: The envelope's one item, the page
+                  minItems: 1
+                  maxItems: 1
                   items:
-                    type: string
+                    type: object
+                    required:
+                      - history
+                      - next_cursor
+                    properties:
+                      history:
+                        type: array
+                        description: Logins, newest first
+                        items:
+                          type: object
+                          properties:
+                            description:
+                              type: string
+                            ip_address:
+                              type: string
+                            user_agent:
+                              type: string
+                            platform:
+                              type: string
+                            browser:
+                              type: string
+                            created_at:
+                              type: string
+                              example: "2022-04-06 16:41"
+                            updated_at:
+                              type: string
+                              example: "2022-04-06 16:41"
+                      next_cursor:
+                        type: string
+                        x-nullable: true
+                        description: Cursor of the next page, null on the last one
+          400:
+            description: Wrong params
           429:
             description: Too many requests. Limit in interval seconds.
         """
-        user_id: str = get_jwt_identity()
-        history = SuccessHistory.query.filter_by(user_id=user_id)
-        return {"history": history_schema.dump(history)}, http.HTTPStatus.OK
-        # return pagination.paginate(SuccessHistory, history_schema)
+        data = parser.parse_args()
+        try:
+            history, next_cursor = get_history_page(
+                user_id=get_jwt_identity(),
+                limit=data.get("limit"),
+                cursor=data.get("cursor"),
+                date_from=data.get("date_from"),
+                date_to=data.get("date_to"),
+            )
+        except ValueError:
+            return {"message": "Wrong cursor"}, http.HTTPStatus.BAD_REQUEST
+        return {
+            "history": history_schema.dump(history),
+            "next_cursor": next_cursor,
+        }, http.HTTPStatus.OK
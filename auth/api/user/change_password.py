@@ -3,7 +3,8 @@ import http
 from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restful import Resource, reqparse
 
-from db import db
+from core import config
+from db import blocklist, db, sessions
 from models import User
 from utils.decorators import api_response_wrapper
 from utils.rate_limit import rate_limit
@@ -132,6 +133,11 @@ class ChangePassword(Resource):
         try:
             current_user.set_password(password=password)
             current_user.save_to_db()
+            # log out on all devices
+            sessions.revoke_all(user_id=current_user.id)
+            blocklist.revoke_users(
+                user_ids=[current_user.id], expire=config.JWT_ACCESS_TOKEN_EXPIRES
+            )
             return {
                 "message": "Successful password change by the user"
             }, http.HTTPStatus.OK
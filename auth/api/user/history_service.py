@@ -0,0 +1,297 @@
+import atexit
+import base64
+import logging
+import os
+import queue
+import time
+import uuid
+from datetime import datetime
+from threading import Event, Lock, Thread
+from typing import Optional
+
+from flask import current_app
+from opentelemetry import trace
+from sqlalchemy import tuple_
+
+from core import config
+from db import async_clients, db
+from models import SuccessHistory
+from models.success_history import create_month_partitions
+from utils.client_info import ClientInfo
+
+logger = logging.getLogger(__name__)
+tracer = trace.get_tracer(__name__)
+
+# queued by flush() to wake the worker up from an empty queue
+STOP: object = object()
+
+
+def get_platform(user_agent_platform: Optional[str]) -> str:
+    """partition key of success_history"""
+    check_platform: str = (user_agent_platform or "").lower()
+    if "windows" in check_platform:
+        return "windows"
+    elif "linux" in check_platform:
+        return "linux"
+    elif "macos" in check_platform:
+        return "macos"
+    return "other"
+
+
+def build_history_row(user_id: str, client: ClientInfo) -> dict:
+    """success_history row for the client's login"""
+    now: datetime = datetime.now()
+    return {
+        "id": uuid.uuid4(),
+        "created_at": now,
+        "updated_at": now,
+        "user_id": user_id,
+        "description": f"устройство: {client.user_agent}\nдата входа: {now}",
+        "ip_address": client.ip_address,
+        "user_agent": client.user_agent,
+        "platform": get_platform(client.platform),
+        "browser": client.browser,
+    }
+
+
+def insert_rows(rows: list[dict]) -> None:
+    """one multi-row INSERT and commit"""
+    with tracer.start_as_current_span("history.insert") as span:
+        span.set_attribute("history.rows", len(rows))
+        db.session.execute(SuccessHistory.__table__.insert().values(rows))
+        db.session.commit()
+
+
+async def insert_rows_async(rows: list[dict]) -> None:
+    """insert_rows on the asyncio engine"""
+    with tracer.start_as_current_span("history.insert") as span:
+        span.set_attribute("history.rows", len(rows))
+        async with async_clients.engine.begin() as connection:
+            await connection.execute(SuccessHistory.__table__.insert().values(rows))
+
+
+def encode_cursor(row: SuccessHistory) -> str:
+    """position after the row: its (created_at, id)"""
+    return base64.urlsafe_b64encode(
+        f"{row.created_at.isoformat()}|{row.id}".encode()
+    ).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    """raises ValueError on a malformed cursor"""
+    created_at, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+    return datetime.fromisoformat(created_at), uuid.UUID(row_id)
+
+
+def get_history_page(
+    user_id: str,
+    limit: int,
+    cursor: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+) -> tuple[list[SuccessHistory], Optional[str]]:
+    """Newest first page of user's history and the cursor of the next one.
+
+    Keyset pagination on (created_at, id): every page is a range scan of
+    ix_success_history_user_id_created_at, no matter how deep it is.
+    """
+    query = SuccessHistory.query.filter(SuccessHistory.user_id == user_id)
+    if date_from:
+        query = query.filter(SuccessHistory.created_at >= date_from)
+    if date_to:
+        query = query.filter(SuccessHistory.created_at < date_to)
+    if cursor:
+        query = query.filter(
+            tuple_(SuccessHistory.created_at, SuccessHistory.id)
+            < tuple_(*decode_cursor(cursor=cursor))
+        )
+    rows: list[SuccessHistory] = (
+        query.order_by(SuccessHistory.created_at.desc(), SuccessHistory.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    if len(rows) > limit:
+        return rows[:limit], encode_cursor(row=rows[limit - 1])
+    return rows, None
+
+
+class HistoryWriter:
+    """Write-behind buffer for success_history.
+
+    Rows go to a bounded in-memory queue and a background worker (a greenlet
+    under gevent) inserts them in batches of up to batch_size rows, at least
+    every flush_interval seconds. When the queue is full the row is written
+    synchronously, so back-pressure slows logins down instead of losing
+    history. flush() stops the worker, which writes the batch it holds, and
+    writes what is left in the queue: the launcher calls it on worker exit,
+    atexit on interpreter shutdown.
+    """
+
+    def __init__(self, max_size: int, batch_size: int, flush_interval: float):
+        self.batch_size: int = batch_size
+        self.flush_interval: float = flush_interval
+        self.queue: queue.Queue = queue.Queue(maxsize=max_size)
+        self.stats: dict[str, int] = {
+            "enqueued": 0,
+            "written": 0,
+            "failed": 0,
+            "batches": 0,
+            "sync_fallback": 0,
+        }
+        self._app = None
+        self._worker: Optional[Thread] = None
+        self._pid: Optional[int] = None
+        self._lock: Lock = Lock()
+        self._stop: Event = Event()
+
+    @property
+    def depth(self) -> int:
+        return self.queue.qsize()
+
+    def write(self, row: dict) -> None:
+        history_partitioner.ensure_worker()
+        if not config.HISTORY_WRITE_BEHIND:
+            insert_rows(rows=[row])
+            return
+        self._ensure_worker()
+        try:
+            self.queue.put_nowait(row)
+            self.stats["enqueued"] += 1
+        except queue.Full:
+            self.stats["sync_fallback"] += 1
+            insert_rows(rows=[row])
+
+    async def write_async(self, row: dict) -> None:
+        """write from an event loop: a full queue or no write-behind insert
+        on the asyncio engine, never through the blocking session"""
+        history_partitioner.ensure_worker()
+        if config.HISTORY_WRITE_BEHIND:
+            self._ensure_worker()
+            try:
+                self.queue.put_nowait(row)
+                self.stats["enqueued"] += 1
+                return
+            except queue.Full:
+                self.stats["sync_fallback"] += 1
+        await insert_rows_async(rows=[row])
+
+    def flush(self) -> None:
+        """stop the worker, wait for it to write its batch, then write
+        everything still queued from the calling thread"""
+        if self._pid == os.getpid() and self._worker.is_alive():
+            self._stop.set()
+            try:
+                self.queue.put_nowait(STOP)
+            except queue.Full:
+                # the worker isn't waiting on an empty queue
+                pass
+            self._worker.join()
+        while True:
+            rows: list[dict] = self._get_batch(block=False)
+            if rows:
+                self._write_batch(rows=rows)
+            elif self.queue.empty():
+                return
+
+    def _ensure_worker(self) -> None:
+        if self._pid == os.getpid() and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._worker.is_alive():
+                return
+            if self._pid is None:
+                atexit.register(self.flush)
+            self._app = current_app._get_current_object()
+            self._pid = os.getpid()
+            self._stop = Event()
+            self._worker = Thread(target=self._run, name="history-writer", daemon=True)
+            self._worker.start()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            rows: list[dict] = self._get_batch(block=True)
+            if rows:
+                self._write_batch(rows=rows)
+
+    def _get_batch(self, block: bool) -> list[dict]:
+        """up to batch_size rows, waiting at most flush_interval after the
+        first one; cut short by STOP"""
+        rows: list[dict] = []
+        deadline: Optional[float] = None
+        while len(rows) < self.batch_size:
+            timeout: Optional[float] = None
+            if deadline is not None:
+                timeout = max(deadline - time.monotonic(), 0)
+            try:
+                row = self.queue.get(block=block, timeout=timeout)
+            except queue.Empty:
+                break
+            if row is STOP:
+                break
+            rows.append(row)
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+        return rows
+
+    def _write_batch(self, rows: list[dict]) -> None:
+        with self._app.app_context():
+            try:
+                insert_rows(rows=rows)
+                self.stats["written"] += len(rows)
+                self.stats["batches"] += 1
+            except Exception:
+                db.session.rollback()
+                self.stats["failed"] += len(rows)
+                logger.exception("Failed to write %s history rows", len(rows))
+
+
+class HistoryPartitioner:
+    """Creates success_history partitions months_ahead months ahead every
+    interval seconds, from a background worker of every serving process.
+
+    Container start only covers the months ahead of that start: a process
+    running longer would write into the DEFAULT partitions. The processes
+    race for the same months, create_month_partition serializes them.
+    interval 0 leaves it to flask create_history_partitions.
+    """
+
+    def __init__(self, months_ahead: int, interval: float):
+        self.months_ahead: int = months_ahead
+        self.interval: float = interval
+        self._app = None
+        self._pid: Optional[int] = None
+        self._lock: Lock = Lock()
+
+    def ensure_worker(self) -> None:
+        if not self.interval or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._app = current_app._get_current_object()
+            self._pid = os.getpid()
+            Thread(target=self._run, name="history-partitioner", daemon=True).start()
+
+    def _run(self) -> None:
+        while True:
+            with self._app.app_context():
+                try:
+                    created: list[str] = create_month_partitions(
+                        engine=db.engine, months_ahead=self.months_ahead
+                    )
+                    if created:
+                        logger.info("Created history partitions %s", created)
+                except Exception:
+                    logger.exception("Failed to create history partitions")
+            time.sleep(self.interval)
+
+
+history_partitioner: HistoryPartitioner = HistoryPartitioner(
+    months_ahead=config.HISTORY_PARTITIONS_AHEAD,
+    interval=config.HISTORY_PARTITIONS_INTERVAL,
+)
+history_writer: HistoryWriter = HistoryWriter(
+    max_size=config.HISTORY_QUEUE_SIZE,
+    batch_size=config.HISTORY_BATCH_SIZE,
+    flush_interval=config.HISTORY_FLUSH_INTERVAL,
+)
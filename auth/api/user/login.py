@@ -4,10 +4,16 @@ from flask import request
 from flask_restful import Resource, reqparse
 
 from models import User
+from utils.client_info import get_client_info
 from utils.decorators import api_response_wrapper
 from utils.rate_limit import rate_limit
 
-from .login_service import generate_jwt_tokens
+from .login_service import (
+    check_password_async,
+    find_user_by_email_async,
+    generate_jwt_tokens,
+    generate_jwt_tokens_async,
+)
 
 parser = reqparse.RequestParser()
 parser.add_argument("email", help="This field cannot be blank", required=True)
@@ -87,15 +93,46 @@ class UserLogin(Resource):
         email: str = data.get("email")
         current_user = User.find_by_email(email=email)
         if not current_user:
-            return {"message": f"User {email} doesn't exist"}, http.HTTPStatus.NOT_FOUND
+            return user_not_found(email=email)
 
         if current_user.check_password(password=data.get("password")):
+            if current_user.rehash_password(password=data.get("password")):
+                current_user.save_to_db()
             jwt_tokens: dict[str, str] = generate_jwt_tokens(
-                current_user=current_user, request=request
+                current_user=current_user, client=get_client_info(request=request)
             )
-            return {
-                "message": f"Logged in as {current_user.username}",
-                "access_token": jwt_tokens.get("access_token"),
-                "refresh_token": jwt_tokens.get("refresh_token"),
-            }, http.HTTPStatus.OK
-        return {"message": "Wrong credentials"}, http.HTTPStatus.BAD_REQUEST
+            return logged_in(username=current_user.username, jwt_tokens=jwt_tokens)
+        return WRONG_CREDENTIALS
+
+
+def user_not_found(email: str) -> tuple:
+    return {"message": f"User {email} doesn't exist"}, http.HTTPStatus.NOT_FOUND
+
+
+def logged_in(username: str, jwt_tokens: dict[str, str]) -> tuple:
+    return {
+        "message": f"Logged in as {username}",
+        "access_token": jwt_tokens.get("access_token"),
+        "refresh_token": jwt_tokens.get("refresh_token"),
+    }, http.HTTPStatus.OK
+
+
+WRONG_CREDENTIALS: tuple = {"message": "Wrong credentials"}, http.HTTPStatus.BAD_REQUEST
+
+
+@rate_limit(scope=f"{__name__}.UserLogin.post")
+@api_response_wrapper()
+async def login_async():
+    """UserLogin.post of the ASGI mode (asgi.py), on the asyncio clients"""
+    data = parser.parse_args()
+    email: str = data.get("email")
+    current_user = await find_user_by_email_async(email=email)
+    if not current_user:
+        return user_not_found(email=email)
+
+    if await check_password_async(user=current_user, password=data.get("password")):
+        jwt_tokens: dict[str, str] = await generate_jwt_tokens_async(
+            user_id=current_user.id, client=get_client_info(request=request)
+        )
+        return logged_in(username=current_user.username, jwt_tokens=jwt_tokens)
+    return WRONG_CREDENTIALS
@@ -1,54 +1,70 @@
-from datetime import datetime
-from typing import Any, Union
+from typing import Optional
 
-import jwt
-from flask_jwt_extended import create_access_token, create_refresh_token
+from sqlalchemy import select, update
 
 from core import config
-from db import cache, db
-from models import SuccessHistory, User
+from core.metrics import password_seconds
+from core.password_service import password_hasher
+from core.token_service import issue_tokens, issue_tokens_async
+from db import async_clients
+from models import User
+from utils.client_info import ClientInfo
 
+from .history_service import build_history_row, history_writer
 
-def generate_jwt_tokens(current_user: User, request=None) -> dict[str, str]:
-    additional_claims: dict[str, list] = {
-        "roles": [i.role.name for i in current_user.user_roles]
-    }
-    acc_token: str = create_access_token(
-        identity=current_user.id, additional_claims=additional_claims
-    )
-    ref_token: str = create_refresh_token(
-        identity=current_user.id, additional_claims=additional_claims
-    )
-    # put refresh token in REDIS
-    jti: Union[str, Any] = jwt.decode(
-        jwt=ref_token, key=config.JWT_SECRET_KEY, algorithms=config.JWT_ALGORITHM
-    ).get("jti")
-    # add refresh token in black list
-    cache.add_token(
-        key=jti, expire=config.JWT_REFRESH_TOKEN_EXPIRES, value=current_user.id
+
+def generate_jwt_tokens(
+    current_user: User, client: Optional[ClientInfo] = None
+) -> dict[str, str]:
+    tokens: dict[str, str] = issue_tokens(
+        user_id=current_user.id, device=client.as_dict() if client else None
     )
-    if request:
+    if client:
         # save history
-        user_agent: str = request.user_agent.string
-        ip_address: str = request.remote_addr
-        check_platform: str = request.user_agent.platform
-        browser: str = request.user_agent.browser
-        if check_platform and "windows" in check_platform.lower():
-            platform: str = "windows"
-        elif check_platform and "linux" in check_platform.lower():
-            platform: str = "linux"
-        elif check_platform and "macos" in check_platform.lower():
-            platform: str = "macos"
-        else:
-            platform: str = "other"
-        history = SuccessHistory(
-            user_id=current_user.id,
-            description=f"устройство: {user_agent}\nдата входа: {datetime.now()}",
-            ip_address=ip_address,
-            user_agent=user_agent,
-            platform=platform,
-            browser=browser,
+        history_writer.write(
+            row=build_history_row(user_id=current_user.id, client=client)
+        )
+    return tokens
+
+
+async def find_user_by_email_async(email: str):
+    """(id, username, password) row of the user, None if there is none"""
+    async with async_clients.engine.connect() as connection:
+        result = await connection.execute(
+            select(User.id, User.username, User.password).where(User.email == email)
+        )
+        return result.first()
+
+
+async def check_password_async(user, password: str) -> bool:
+    """User.check_password and rehash_password of a find_user_by_email_async
+    row: a hash of other parameters is replaced after the check"""
+    with password_seconds["verify"].time():
+        if not await password_hasher.verify_async(
+            pwhash=user.password, password=password
+        ):
+            return False
+    if config.PASSWORD_REHASH_ON_LOGIN and password_hasher.needs_rehash(
+        pwhash=user.password
+    ):
+        with password_seconds["hash"].time():
+            pwhash: str = await password_hasher.hash_async(password=password)
+        async with async_clients.engine.begin() as connection:
+            await connection.execute(
+                update(User).where(User.id == user.id).values(password=pwhash)
+            )
+    return True
+
+
+async def generate_jwt_tokens_async(
+    user_id: str, client: Optional[ClientInfo] = None
+) -> dict[str, str]:
+    """generate_jwt_tokens on the asyncio clients"""
+    tokens: dict[str, str] = await issue_tokens_async(
+        user_id=user_id, device=client.as_dict() if client else None
+    )
+    if client:
+        await history_writer.write_async(
+            row=build_history_row(user_id=user_id, client=client)
         )
-        db.session.add(history)
-        db.session.commit()
-    return {"access_token": acc_token, "refresh_token": ref_token}
+    return tokens
@@ -4,7 +4,7 @@ from flask_jwt_extended import get_jwt, get_jwt_identity, jwt_required
 from flask_restful import Resource
 
 from core import config
-from db import cache
+from db import blocklist, sessions
 from utils.decorators import api_response_wrapper
 from utils.rate_limit import rate_limit
 
@@ -63,8 +63,8 @@ class UserLogoutAccess(Resource):
         jti: str = get_jwt().get("jti")
         user_id: str = get_jwt_identity()
         try:
-            cache.add_token(
-                key=jti, expire=config.JWT_ACCESS_TOKEN_EXPIRES, value=user_id
+            blocklist.revoke(
+                jti=jti, user_id=user_id, expire=config.JWT_ACCESS_TOKEN_EXPIRES
             )
             return {"message": "Access token has been revoked"}, http.HTTPStatus.OK
         except Exception:
@@ -124,7 +124,7 @@ class UserLogoutRefresh(Resource):
         """
         jti: str = get_jwt().get("jti")
         try:
-            cache.delete_token(key=jti)
+            sessions.revoke(user_id=get_jwt_identity(), jti=jti)
             return {"message": "Refresh token has been revoked"}, http.HTTPStatus.OK
         except Exception:
             return {"message": "Something went wrong"}, http.HTTPStatus.BAD_REQUEST
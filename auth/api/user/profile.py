@@ -1,10 +1,10 @@
 import http
 
-from flask_jwt_extended import get_jwt, get_jwt_identity, jwt_required
+from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restful import Resource, reqparse
 
 from core import config
-from db import cache, db
+from db import blocklist, db, sessions
 from models import User
 from utils import codes
 from utils.decorators import api_response_wrapper
@@ -220,15 +220,15 @@ class Profile(Resource):
           429:
             description: Too many requests. Limit in interval seconds.
         """
-        jti: str = get_jwt().get("jti")
         user_id: str = get_jwt_identity()
         try:
             profile = User.query.filter_by(id=user_id).first()
             db.session.delete(profile)
             db.session.commit()
-            """ revoke token """
-            cache.add_token(
-                key=jti, expire=config.JWT_ACCESS_TOKEN_EXPIRES, value=user_id
+            """ revoke tokens """
+            sessions.revoke_all(user_id=user_id)
+            blocklist.revoke_users(
+                user_ids=[user_id], expire=config.JWT_ACCESS_TOKEN_EXPIRES
             )
             return {"message": "success deleted"}, http.HTTPStatus.OK
         except Exception:
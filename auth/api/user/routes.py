@@ -1,11 +1,14 @@
-from . import api
+from typing import Callable
+
+from . import api, api_bp_user
 from .auth_history import AuthHistory
 from .change_password import ChangePassword
-from .login import UserLogin
+from .login import UserLogin, login_async
 from .logout import UserLogoutAccess, UserLogoutRefresh
 from .profile import Profile
 from .registration import UserRegistration
-from .token_refresh import TokenRefresh
+from .sessions import UserSession, UserSessions
+from .token_refresh import TokenRefresh, token_refresh_async
 
 api.add_resource(UserRegistration, "/registration")
 api.add_resource(UserLogin, "/login")
@@ -15,3 +18,12 @@ api.add_resource(TokenRefresh, "/token/refresh")
 api.add_resource(Profile, "/me/users")
 api.add_resource(AuthHistory, "/auth_history")
 api.add_resource(ChangePassword, "/change_password")
+api.add_resource(UserSessions, "/sessions")
+api.add_resource(UserSession, "/sessions/<string:jti>")
+
+# coroutine twins of the hot views by endpoint, awaited by the ASGI mode
+# (asgi.py) instead of running the sync view on its thread pool
+async_views: dict[str, Callable] = {
+    f"{api_bp_user.name}.userlogin": login_async,
+    f"{api_bp_user.name}.tokenrefresh": token_refresh_async,
+}
@@ -0,0 +1,140 @@
+import http
+
+from flask_jwt_extended import get_jwt_identity, jwt_required
+from flask_restful import Resource
+
+from core import config
+from db import blocklist, sessions
+from utils.decorators import api_response_wrapper
+from utils.rate_limit import rate_limit
+
+
+class UserSessions(Resource):
+    @rate_limit()
+    @api_response_wrapper()
+    @jwt_required()
+    def get(self):
+        """
+        Return list of user's active sessions (devices)
+        ---
+        tags:
+          - profile
+        responses:
+          200:
+            description: User's sessions
+            schema:
+              properties:
+                success:
+                  type: boolean
+                  description: Response status
+                  default: True
+                data:
+                  type: array
+                  description: Response data
+                  items:
+                    type: object
+                    properties:
+                      sessions:
+                        type: array
+                        items:
+                          type: object
+                          properties:
+                            jti:
+                              type: string
+                            user_agent:
+                              type: string
+                            platform:
+                              type: string
+                            browser:
+                              type: string
+                            ip_address:
+                              type: string
+                            created_at:
+                              type: integer
+                            expires_at:
+                              type: integer
+          429:
+            description: Too many requests. Limit in interval seconds.
+        """
+        user_id: str = get_jwt_identity()
+        return {"sessions": sessions.list(user_id=user_id)}, http.HTTPStatus.OK
+
+    @rate_limit()
+    @api_response_wrapper()
+    @jwt_required()
+    def delete(self):
+        """
+        Log out everywhere: revoke all user's sessions and current access token
+        ---
+        tags:
+          - profile
+        responses:
+          200:
+            description: All sessions have been revoked
+            schema:
+              properties:
+                success:
+                  type: boolean
+                  description: Response status
+                  default: True
+                data:
+                  type: array
+                  description: Response data
+                  items:
+                    type: object
+                    properties:
+                      revoked:
+                        type: integer
+                message:
+                  type: string
+                  description: Response message
+          429:
+            description: Too many requests. Limit in interval seconds.
+        """
+        user_id: str = get_jwt_identity()
+        revoked: int = sessions.revoke_all(user_id=user_id)
+        blocklist.revoke_users(
+            user_ids=[user_id], expire=config.JWT_ACCESS_TOKEN_EXPIRES
+        )
+        return {
+            "message": "All sessions have been revoked",
+            "revoked": revoked,
+        }, http.HTTPStatus.OK
+
+
+class UserSession(Resource):
+    @rate_limit()
+    @api_response_wrapper()
+    @jwt_required()
+    def delete(self, jti: str):
+        """
+        Revoke one user's session (device)
+        ---
+        tags:
+          - profile
+        parameters:
+          - in: path
+            name: jti
+            required: true
+            description: The ID of the session
+            type: string
+        responses:
+          200:
+            description: The session has been revoked
+            schema:
+              properties:
+                success:
+                  type: boolean
+                  description: Response status
+                  default: True
+                message:
+                  type: string
+                  description: Response message
+          404:
+            description: The session doesn't exist
+          429:
+            description: Too many requests. Limit in interval seconds.
+        """
+        if sessions.revoke(user_id=get_jwt_identity(), jti=jti):
+            return {"message": "Session has been revoked"}, http.HTTPStatus.OK
+        return {"message": f"Session '{jti}' doesn't exist"}, http.HTTPStatus.NOT_FOUND
@@ -1,15 +1,17 @@
 import http
+import time
 
 from flask_jwt_extended import (
     create_access_token,
     get_jwt,
     get_jwt_identity,
     jwt_required,
+    verify_jwt_in_request,
 )
 from flask_restful import Resource
 
-from db import cache
-from models import UserRole
+from core.role_service import get_user_roles, get_user_roles_async
+from db import sessions
 from utils.decorators import api_response_wrapper
 from utils.rate_limit import rate_limit
 
@@ -65,22 +67,43 @@ class TokenRefresh(Resource):
           429:
             description: Too many requests. Limit in interval seconds.
         """
-        jti = get_jwt().get("jti")
+        jti: str = get_jwt().get("jti")
         user_id: str = get_jwt_identity()
-        # user's roles
-        additional_claims: dict[str, list] = {
-            "roles": [i.role.name for i in UserRole.query.filter_by(user_id=user_id)]
-        }
-        print(additional_claims)
-        # new access token
-        access_token: str = create_access_token(
-            identity=user_id, additional_claims=additional_claims
-        )
-        if cache.is_jti_blacklisted(jti=jti):
-            return {"access_token": access_token}, http.HTTPStatus.OK
-        return {
-            "success": False,
-            "errors": [],
-            "message": "token revoked",
-            "description": "The refresh token has been revoked.",
-        }, http.HTTPStatus.UNAUTHORIZED
+        # revoked refresh tokens cost neither a roles lookup nor a signature
+        if not sessions.is_active(user_id=user_id, jti=jti):
+            return TOKEN_REVOKED
+        # user's roles from the roles cache, invalidated on role changes; not
+        # from the in-process layer, it may predate a change for a few seconds
+        roles_at: float = time.time()
+        roles: list[str] = get_user_roles(user_id=user_id, local=False)
+        return refreshed(user_id=user_id, roles=roles, roles_at=roles_at)
+
+
+TOKEN_REVOKED: tuple = {
+    "success": False,
+    "errors": [],
+    "message": "token revoked",
+    "description": "The refresh token has been revoked.",
+}, http.HTTPStatus.UNAUTHORIZED
+
+
+def refreshed(user_id: str, roles: list[str], roles_at: float) -> tuple:
+    """new access token"""
+    access_token: str = create_access_token(
+        identity=user_id, additional_claims={"roles": roles, "roles_at": roles_at}
+    )
+    return {"access_token": access_token}, http.HTTPStatus.OK
+
+
+@rate_limit(scope=f"{__name__}.TokenRefresh.post")
+@api_response_wrapper()
+async def token_refresh_async():
+    """TokenRefresh.post of the ASGI mode (asgi.py), on the asyncio clients"""
+    verify_jwt_in_request(refresh=True)
+    jti: str = get_jwt().get("jti")
+    user_id: str = get_jwt_identity()
+    if not await sessions.is_active_async(user_id=user_id, jti=jti):
+        return TOKEN_REVOKED
+    roles_at: float = time.time()
+    roles: list[str] = await get_user_roles_async(user_id=user_id, local=False)
+    return refreshed(user_id=user_id, roles=roles, roles_at=roles_at)
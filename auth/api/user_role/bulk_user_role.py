@@ -0,0 +1,180 @@
+import http
+from typing import Callable, Optional
+
+from flask_jwt_extended import get_jwt_identity, jwt_required
+from flask_restful import Resource, reqparse
+
+from core import config
+from core.permissions import is_admin_permissions
+from utils.decorators import api_response_wrapper
+from utils.rate_limit import rate_limit
+
+from .user_role_service import assign_roles, parse_items, revoke_roles
+
+parser = reqparse.RequestParser()
+parser.add_argument(
+    "items",
+    type=dict,
+    action="append",
+    location="json",
+    help="send list of objects with user_id and role_id",
+    required=True,
+)
+
+
+def apply_bulk(action: Callable, own_user_id: Optional[str] = None) -> tuple[dict, int]:
+    items: list[dict] = parser.parse_args().get("items")
+    if len(items) > config.USER_ROLE_BULK_MAX_ITEMS:
+        return {
+            "message": f"Send at most {config.USER_ROLE_BULK_MAX_ITEMS} items"
+        }, http.HTTPStatus.BAD_REQUEST
+    pairs = parse_items(items=items)
+    statuses: dict = action(
+        pairs=[
+            pair for pair in pairs if pair is not None and f"{pair[0]}" != own_user_id
+        ]
+    )
+    results: list[dict] = []
+    for item, pair in zip(items, pairs):
+        if pair is None:
+            status: str = "invalid"
+        elif f"{pair[0]}" == own_user_id:
+            status = "forbidden"
+        else:
+            status = statuses[pair]
+        results.append(
+            {
+                "user_id": item.get("user_id"),
+                "role_id": item.get("role_id"),
+                "status": status,
+            }
+        )
+    return {"results": results}, http.HTTPStatus.OK
+
+
+class BulkUserRole(Resource):
+    @rate_limit()
+    @api_response_wrapper()
+    @jwt_required()
+    @is_admin_permissions()
+    def post(self):
+        """
+        Grant roles to users in bulk
+        ---
+        tags:
+          - user_role
+        parameters:
+          - in: body
+            name: body
+            schema:
+              id: UserRoleBulk
+              required:
+                - items
+              properties:
+                items:
+                  type: array
+                  items:
+                    type: object
+                    properties:
+                      user_id:
+                        type: string
+                        description: The user's id.
+                      role_id:
+                        type: string
+                        description: The role's id.
+        responses:
+          200:
+            description: Result for every item, in the order of items
+            schema:
+              properties:
+                success:
+                  type: boolean
+                  description: Response status
+                  default: True
+                data:
+                  type: array
+                  description: Response data
+                  items:
+                    type: object
+                    properties:
+                      results:
+                        type: array
+                        items:
+                          type: object
+                          properties:
+                            user_id:
+                              type: string
+                            role_id:
+                              type: string
+                            status:
+                              type: string
+                              enum: [created, exists, not_found, invalid]
+          400:
+            description: Too many items
+          429:
+            description: Too many requests. Limit in interval seconds.
+        """
+        return apply_bulk(action=assign_roles)
+
+    @rate_limit()
+    @api_response_wrapper()
+    @jwt_required()
+    @is_admin_permissions()
+    def delete(self):
+        """
+        Revoke roles from users in bulk, own roles can not be revoked
+        ---
+        tags:
+          - user_role
+        parameters:
+          - in: body
+            name: body
+            schema:
+              id: UserRoleBulk
+              required:
+                - items
+              properties:
+                items:
+                  type: array
+                  items:
+                    type: object
+                    properties:
+                      user_id:
+                        type: string
+                        description: The user's id.
+                      role_id:
+                        type: string
+                        description: The role's id.
+        responses:
+          200:
+            description: Result for every item, in the order of items
+            schema:
+              properties:
+                success:
+                  type: boolean
+                  description: Response status
+                  default: True
+                data:
+                  type: array
+                  description: Response data
+                  items:
+                    type: object
+                    properties:
+                      results:
+                        type: array
+                        items:
+                          type: object
+                          properties:
+                            user_id:
+                              type: string
+                            role_id:
+                              type: string
+                            status:
+                              type: string
+                              enum: [deleted, not_found, forbidden, invalid]
+          400:
+            description: Too many items
+          429:
+            description: Too many requests. Limit in interval seconds.
+        """
+        return apply_bulk(action=revoke_roles, own_user_id=get_jwt_identity())
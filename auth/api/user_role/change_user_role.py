@@ -2,6 +2,7 @@ from flask_jwt_extended import jwt_required
 from flask_restful import Resource, reqparse
 
 from core.permissions import is_admin_permissions
+from core.role_service import invalidate_user_roles
 from models import UserRole
 from utils.decorators import api_response_wrapper
 from utils.rate_limit import rate_limit
@@ -67,4 +68,5 @@ class ChangeUserRole(Resource):
         if not UserRole.is_row_exist(user_id=user_id, role_id=role_id):
             new_user_role = UserRole(user_id=user_id, role_id=role_id)
             new_user_role.save_to_db()
+            invalidate_user_roles(user_id)
         return {}
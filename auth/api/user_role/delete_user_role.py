@@ -4,6 +4,7 @@ from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restful import Resource, reqparse
 
 from core.permissions import is_admin_permissions
+from core.role_service import invalidate_user_roles
 from db import db
 from models import UserRole
 from utils.decorators import api_response_wrapper
@@ -93,4 +94,5 @@ class DeleteUserRole(Resource):
         if user_role:
             db.session.delete(user_role)
             db.session.commit()
+            invalidate_user_roles(user_id)
         return {}
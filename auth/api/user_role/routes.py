@@ -1,4 +1,5 @@
 from . import api
+from .bulk_user_role import BulkUserRole
 from .change_user_role import ChangeUserRole
 from .delete_user_role import DeleteUserRole
 from .set_own_role import SetOwnUserRole
@@ -6,3 +7,4 @@ from .set_own_role import SetOwnUserRole
 api.add_resource(ChangeUserRole, "/user_role/change")
 api.add_resource(DeleteUserRole, "/user_role/remove")
 api.add_resource(SetOwnUserRole, "/user_role/own")
+api.add_resource(BulkUserRole, "/user_role/bulk")
@@ -4,6 +4,7 @@ from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restful import Resource, reqparse
 
 from core import config
+from core.role_service import invalidate_user_roles
 from models import UserRole
 from utils.decorators import api_response_wrapper
 from utils.rate_limit import rate_limit
@@ -29,5 +30,6 @@ class SetOwnUserRole(Resource):
             if not UserRole.is_row_exist(user_id=user_id, role_id=role_id):
                 new_user_role = UserRole(user_id=user_id, role_id=role_id)
                 new_user_role.save_to_db()
+                invalidate_user_roles(user_id)
             return {"success": True}, http.HTTPStatus.OK
         return {}, http.HTTPStatus.FORBIDDEN
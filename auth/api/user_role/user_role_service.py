@@ -0,0 +1,134 @@
+import uuid
+from typing import Iterable, Optional
+
+from sqlalchemy import and_, cast, column, func, literal, select, values
+from sqlalchemy.dialects.postgresql import UUID, insert
+
+from core import config
+from core.role_service import invalidate_user_roles
+from db import db
+from models import Role, User, UserRole
+
+Pair = tuple[uuid.UUID, uuid.UUID]
+
+
+def parse_items(items: list[dict]) -> list[Optional[Pair]]:
+    """(user_id, role_id) of every item, None for a malformed one"""
+    pairs: list[Optional[Pair]] = []
+    for item in items:
+        try:
+            pairs.append(
+                (uuid.UUID(item.get("user_id")), uuid.UUID(item.get("role_id")))
+            )
+        except (AttributeError, TypeError, ValueError):
+            pairs.append(None)
+    return pairs
+
+
+def chunks(pairs: list[Pair]) -> Iterable[list[Pair]]:
+    for start in range(0, len(pairs), config.USER_ROLE_BULK_BATCH_SIZE):
+        yield pairs[start : start + config.USER_ROLE_BULK_BATCH_SIZE]
+
+
+def pairs_values(pairs: list[Pair], with_id: bool = False):
+    """VALUES list usable as a table in INSERT ... SELECT and DELETE ... USING"""
+    columns = [
+        column("user_id", UUID(as_uuid=True)),
+        column("role_id", UUID(as_uuid=True)),
+    ]
+    if with_id:
+        columns.insert(0, column("id", UUID(as_uuid=True)))
+        pairs = [(uuid.uuid4(), *pair) for pair in pairs]
+    rows = values(*columns, name="rows").data(pairs)
+    # VALUES of bound parameters are text, uuid columns compare with uuid only
+    return select(
+        *[
+            cast(row_column, UUID(as_uuid=True)).label(row_column.name)
+            for row_column in rows.c
+        ]
+    ).subquery("items")
+
+
+def find_existing(pairs: list[Pair]) -> tuple[set, set]:
+    """ids of the pairs' users and roles which exist, one query"""
+    user_ids: set = {user_id for user_id, _ in pairs}
+    role_ids: set = {role_id for _, role_id in pairs}
+    rows = db.session.execute(
+        select(User.id, literal("user"))
+        .where(User.id.in_(user_ids))
+        .union_all(select(Role.id, literal("role")).where(Role.id.in_(role_ids)))
+    )
+    existing: dict[str, set] = {"user": set(), "role": set()}
+    for row_id, kind in rows:
+        existing[kind].add(row_id)
+    return existing["user"], existing["role"]
+
+
+def assign_roles(pairs: list[Pair]) -> dict[Pair, str]:
+    """Grant roles: one INSERT ... ON CONFLICT DO NOTHING per batch.
+
+    Pair status: created, exists or not_found (no such user or role).
+    """
+    statuses: dict[Pair, str] = {}
+    for batch in chunks(pairs=list(dict.fromkeys(pairs))):
+        items = pairs_values(pairs=batch, with_id=True)
+        created: set[Pair] = set(
+            db.session.execute(
+                insert(UserRole.__table__)
+                .from_select(
+                    ["id", "created_at", "updated_at", "user_id", "role_id"],
+                    select(
+                        items.c.id,
+                        func.now(),
+                        func.now(),
+                        items.c.user_id,
+                        items.c.role_id,
+                    )
+                    .join(User, User.id == items.c.user_id)
+                    .join(Role, Role.id == items.c.role_id),
+                )
+                .on_conflict_do_nothing(constraint="user_role_pk")
+                .returning(UserRole.user_id, UserRole.role_id)
+            ).all()
+        )
+        user_ids, role_ids = (
+            find_existing(pairs=batch) if len(created) < len(batch) else (set(), set())
+        )
+        for pair in batch:
+            if pair in created:
+                statuses[pair] = "created"
+            elif pair[0] in user_ids and pair[1] in role_ids:
+                statuses[pair] = "exists"
+            else:
+                statuses[pair] = "not_found"
+    db.session.commit()
+    invalidate_user_roles(
+        *{user_id for (user_id, _), status in statuses.items() if status == "created"}
+    )
+    return statuses
+
+
+def revoke_roles(pairs: list[Pair]) -> dict[Pair, str]:
+    """Revoke roles: one DELETE ... USING per batch; deleted or not_found"""
+    statuses: dict[Pair, str] = {}
+    for batch in chunks(pairs=list(dict.fromkeys(pairs))):
+        items = pairs_values(pairs=batch)
+        deleted: set[Pair] = set(
+            db.session.execute(
+                UserRole.__table__.delete()
+                .where(
+                    and_(
+                        UserRole.user_id == items.c.user_id,
+                        UserRole.role_id == items.c.role_id,
+                    )
+                )
+                .returning(UserRole.user_id, UserRole.role_id)
+            ).all()
+        )
+        for pair in batch:
+            statuses[pair] = "deleted" if pair in deleted else "not_found"
+    db.session.commit()
+    invalidate_user_roles(
+        *{user_id for (user_id, _), status in statuses.items() if status == "deleted"}
+    )
+    return statuses
@@ -1,9 +1,8 @@
 import http
-from typing import Union
+import os
+from typing import Optional, Union
 
 import click
-from authlib.integrations.flask_client import OAuth
-from flasgger import Swagger
 from flask import Flask
 from flask.cli import with_appcontext
 from flask_jwt_extended import JWTManager
@@ -11,67 +10,35 @@ from flask_marshmallow import Marshmallow
 from flask_migrate import Migrate
 from flask_restful import Api
 from opentelemetry import trace
-from opentelemetry.instrumentation.flask import FlaskInstrumentor
-from opentelemetry.instrumentation.requests import RequestsInstrumentor
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
 
 import core.config
-from api.social_network.provider import social_net
 from core import config
-from db import cache, db, db_url
+from core.metrics import setup_metrics
+from core.openapi import build_spec, setup_swagger
+from core.role_catalog import bump_catalog_version
+from core.tracing import setup_tracing
+from core.user_import_service import UserImporter, read_records
+from db import blocklist, db, db_url, serving_connect_args
 from models import Role, User, UserRole
+from models.success_history import create_month_partitions, drop_expired_partitions
 from utils import constants
-from utils.decorators import requires_basic_auth
+from utils.representations import dumps, output_json
 
 app = Flask(__name__)
 app.secret_key = config.SECRET_KEY
 api = Api(app=app)
+api.representations["application/json"] = output_json
 migrate = Migrate(app, db)
 ma = Marshmallow(app=app)
-oauth = OAuth(app)
-oauth.init_app(app)
 jwt = JWTManager(app)
 
-trace.set_tracer_provider(TracerProvider())
-trace.get_tracer_provider().add_span_processor(
-    BatchSpanProcessor(ConsoleSpanExporter())
-)
-
-FlaskInstrumentor().instrument_app(app)
-RequestsInstrumentor().instrument()
+setup_tracing(flask_app=app)
+setup_metrics(flask_app=app)
 
 tracer = trace.get_tracer(__name__)
 
 
-swagger = Swagger(
-    app=app,
-    decorators=[requires_basic_auth],
-    template={
-        "swagger": "2.0",
-        "info": {
-            "title": "Auth service, Team 16",
-            "description": "Sprint 7",
-            "version": "1.0",
-        },
-        "securityDefinitions": {
-            "Bearer": {
-                "type": "apiKey",
-                "name": "Authorization",
-                "in": "header",
-                "description": 'JWT Authorization header using the Bearer scheme. Example: "Authorization: Bearer {'
-                'token}"',
-            }
-        },
-        "security": [{"Bearer": []}],
-        "consumes": [
-            "application/json",
-        ],
-        "produces": [
-            "application/json",
-        ],
-    },
-)
+setup_swagger(flask_app=app)
 
 app.config["SQLALCHEMY_DATABASE_URI"]: str = db_url
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"]: bool = False
@@ -112,11 +79,89 @@ def create_admin(username: str, password: str):
         db.session.commit()
 
 
+@app.cli.command("bump_role_catalog")
+@with_appcontext
+def bump_role_catalog():
+    """drop cached role list/detail responses and their ETags, run after
+    changing role rows outside the API (SQL, migrations)"""
+    bump_catalog_version()
+    click.echo("role catalog version replaced")
+
+
+@app.cli.command("import-users")
+@with_appcontext
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "file_format", type=click.Choice(["csv", "jsonl"]))
+@click.option("--batch-size", default=config.IMPORT_BATCH_SIZE, type=int)
+@click.option("--workers", default=config.IMPORT_HASH_WORKERS, type=int)
+@click.option("--checkpoint", help="checkpoint file, PATH.checkpoint by default")
+@click.option("--restart", is_flag=True, help="ignore the checkpoint")
+def import_users(
+    path: str,
+    file_format: Optional[str],
+    batch_size: int,
+    workers: int,
+    checkpoint: Optional[str],
+    restart: bool,
+):
+    """import users from CSV or JSONL: username, email, password or
+    password_hash, roles"""
+    checkpoint = checkpoint or f"{path}.checkpoint"
+    if restart and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    importer = UserImporter(
+        batch_size=batch_size, workers=workers, checkpoint_path=checkpoint
+    )
+    report = importer.run(
+        records=read_records(path=path, file_format=file_format),
+        progress=click.echo,
+    )
+    click.echo(f"done: {report}")
+
+
+@app.cli.command("create_history_partitions")
+@with_appcontext
+@click.option("--months-ahead", default=config.HISTORY_PARTITIONS_AHEAD, type=int)
+def create_history_partitions(months_ahead: int):
+    """create monthly success_history partitions ahead of time"""
+    created: list[str] = create_month_partitions(
+        engine=db.engine, months_ahead=months_ahead
+    )
+    click.echo(f"success_history partitions: {', '.join(created) or 'up to date'}")
+
+
+@app.cli.command("drop_history_partitions")
+@with_appcontext
+@click.option("--retention-months", default=config.HISTORY_RETENTION_MONTHS, type=int)
+@click.option("--detach-only", is_flag=True, help="keep detached tables")
+def drop_history_partitions(retention_months: int, detach_only: bool):
+    """detach and drop success_history partitions older than retention"""
+    expired: list[str] = drop_expired_partitions(
+        engine=db.engine, retention_months=retention_months, detach_only=detach_only
+    )
+    click.echo(f"expired success_history partitions: {', '.join(expired) or 'none'}")
+
+
+@app.cli.command("openapi")
+@with_appcontext
+@click.option("--output", default=config.OPENAPI_SPEC_PATH, show_default=True)
+def openapi(output: str):
+    """write the OpenAPI spec, served as-is from OPENAPI_SPEC_PATH"""
+    spec: dict = build_spec(flask_app=create_app(flask_app=app))
+    with open(output, "wb") as file:
+        file.write(dumps(spec))
+    click.echo(f"{output}: {len(spec['paths'])} paths")
+
+
 @jwt.token_in_blocklist_loader
 def check_if_token_in_blacklist(jwt_header, jwt_payload) -> bool:
     access = jwt_payload.get("type")
     if access == "access":
-        return cache.is_jti_blacklisted(jwt_payload.get("jti"))
+        return blocklist.is_revoked(
+            jti=jwt_payload.get("jti"),
+            user_id=jwt_payload.get("sub"),
+            roles_at=jwt_payload.get("roles_at", jwt_payload.get("iat")),
+        )
     else:
         # In blacklist there are only access tokens
         return False
@@ -174,25 +219,30 @@ def create_tables():
     if not Role.by_name_exist(role_name=constants.DEFAULT_ROLE_FOR_ALL_USERS):
         new_role = Role(name=constants.DEFAULT_ROLE_FOR_ALL_USERS)
         new_role.save_to_db()
+        bump_catalog_version()
     if not Role.by_name_exist(role_name=constants.ROLE_FOR_ADMIN):
         new_role = Role(name=constants.ROLE_FOR_ADMIN)
         new_role.save_to_db()
+        bump_catalog_version()
 
 
-def create_app(flask_app):
-    db.init_app(app=flask_app)
+def create_app(flask_app: Flask) -> Flask:
+    """register API blueprints and the statement timeout, serving is up to
+    the entry point"""
     from api.role import api_bp_role
+    from api.social_network.provider import social_net
     from api.user import api_bp_user
     from api.user_role import api_bp_user_role
 
-    app.register_blueprint(api_bp_user)
-    app.register_blueprint(api_bp_role)
-    app.register_blueprint(api_bp_user_role)
-    app.register_blueprint(social_net)
-
-    # flask_app.run(debug=True, use_reloader=False)
-    flask_app.run(debug=True, host="0.0.0.0")
+    for blueprint in (api_bp_user, api_bp_role, api_bp_user_role, social_net):
+        if blueprint.name not in flask_app.blueprints:
+            flask_app.register_blueprint(blueprint)
+    # before the engine is created on the first request
+    flask_app.config["SQLALCHEMY_ENGINE_OPTIONS"]["connect_args"] = serving_connect_args
+    return flask_app
 
 
 if __name__ == "__main__":
+    # flask_app.run(debug=True, use_reloader=False)
     create_app(flask_app=app)
+    app.run(debug=True, host="0.0.0.0")
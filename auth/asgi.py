@@ -0,0 +1,139 @@
+"""ASGI entry point: uvicorn asgi:application
+
+The hot endpoints, login and token refresh (async_views of
+api/user/routes.py), are coroutines awaited on the event loop: their Redis
+and Postgres calls go through redis.asyncio and asyncpg, see
+db/async_clients.py. They run in a Flask request context, so parsing, JWT
+checks, envelopes, error handlers and request hooks are the sync views'.
+Every other route, registration and the OAuth callbacks included, is the
+same Flask app on a pool of ASGI_WORKER_THREADS threads next to the event
+loop: the OAuth callbacks wait on authlib's Flask client and the provider
+HTTP pool, both blocking.
+"""
+
+import io
+import os
+from typing import Callable
+
+from dotenv import load_dotenv
+from flask import Flask, request_started
+from flask_restful import Api
+from flask_restful.utils import unpack
+from uvicorn.middleware.wsgi import WSGIMiddleware, build_environ
+from werkzeug.wrappers import Response
+
+from api.user import api as user_api
+from api.user.history_service import history_writer
+from api.user.routes import async_views
+from app import app, create_app
+from core.password_service import password_hasher
+from db import async_clients
+from utils.rate_limit import limiter
+
+load_dotenv()
+
+ASGI_WORKER_THREADS: int = int(os.getenv("ASGI_WORKER_THREADS", 20))
+
+
+async def read_body(receive) -> bytes:
+    body: bytes = b""
+    more_body: bool = True
+    while more_body:
+        message: dict = await receive()
+        body += message.get("body", b"")
+        more_body = message.get("more_body", False)
+    return body
+
+
+class Application:
+    def __init__(self, flask_app: Flask, api: Api, views: dict[str, Callable]):
+        self.flask_app: Flask = flask_app
+        self.api: Api = api
+        self.wsgi: WSGIMiddleware = WSGIMiddleware(
+            flask_app, workers=ASGI_WORKER_THREADS
+        )
+        # (method, path) -> coroutine view, for rules without arguments
+        self.routes: dict[tuple[str, str], Callable] = {
+            (method, rule.rule): views[rule.endpoint]
+            for rule in flask_app.url_map.iter_rules()
+            if rule.endpoint in views and not rule.arguments
+            for method in rule.methods - {"HEAD", "OPTIONS"}
+        }
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive=receive, send=send)
+            return
+        view = None
+        if scope["type"] == "http":
+            view = self.routes.get((scope["method"], scope["path"]))
+        if view is None:
+            await self.wsgi(scope, receive, send)
+            return
+        body: bytes = await read_body(receive=receive)
+        environ: dict = build_environ(scope, None, io.BytesIO(body))
+        # the body is read whole, chunked requests included
+        environ["CONTENT_LENGTH"] = str(len(body))
+        response: Response = await self.handle(view=view, environ=environ)
+        await send(
+            {
+                "type": "http.response.start",
+                "status": response.status_code,
+                "headers": [
+                    (name.lower().encode("latin1"), value.encode("latin1"))
+                    for name, value in response.headers.items()
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": response.get_data()})
+        response.close()
+
+    async def handle(self, view: Callable, environ: dict) -> Response:
+        """Flask.wsgi_app with the view awaited"""
+        ctx = self.flask_app.request_context(environ)
+        error = None
+        try:
+            try:
+                ctx.push()
+                return await self.full_dispatch(view=view)
+            except Exception as e:
+                error = e
+                return self.flask_app.handle_exception(e)
+        finally:
+            ctx.auto_pop(error)
+
+    async def full_dispatch(self, view: Callable) -> Response:
+        """Flask.full_dispatch_request, the result made a response by the
+        view's flask-restful Api like a Resource's"""
+        self.flask_app.try_trigger_before_first_request_functions()
+        try:
+            request_started.send(self.flask_app)
+            rv = self.flask_app.preprocess_request()
+            if rv is None:
+                rv = await view()
+                if not isinstance(rv, Response):
+                    data, code, headers = unpack(rv)
+                    rv = self.api.make_response(data, code, headers=headers)
+        except Exception as e:
+            rv = self.flask_app.handle_user_exception(e)
+        return self.flask_app.finalize_request(rv)
+
+    @staticmethod
+    async def lifespan(receive, send) -> None:
+        while True:
+            message: dict = await receive()
+            if message["type"] == "lifespan.startup":
+                await async_clients.connect()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                history_writer.flush()
+                limiter.flush()
+                password_hasher.shutdown(wait=True)
+                await async_clients.close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+application = Application(
+    flask_app=create_app(flask_app=app), api=user_api, views=async_views
+)
@@ -0,0 +1,350 @@
+"""Load test of a running auth service: python3 -m benchmarks.load
+
+Every scenario runs --concurrency virtual users in a loop for --duration
+seconds against --url (python3 -m benchmarks.serve starts one) and reports
+RPS, latency percentiles and, from the service's /metrics, DB queries and
+Redis round trips per request. The report is written as JSON; with
+--baseline the run is compared with an earlier report.
+
+    python3 -m benchmarks.load --scenario login --scenario refresh_storm \\
+        --output results/$(git rev-parse --short HEAD).json
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import subprocess
+import time
+import uuid
+from collections import Counter, defaultdict
+from typing import Awaitable, Callable, Optional
+
+import aiohttp
+from prometheus_client.parser import text_string_to_metric_families
+
+PASSWORD: str = "Bench_Passw0rd!"
+BACKEND_CALLS_METRIC: str = "auth_http_request_backend_calls"
+
+
+class Client:
+    """aiohttp session recording latency and status of every request"""
+
+    def __init__(self, url: str, session: aiohttp.ClientSession):
+        self.url: str = url.rstrip("/")
+        self.session: aiohttp.ClientSession = session
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.statuses: Counter = Counter()
+        self.recording: bool = False
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        label: Optional[str] = None,
+        token: Optional[str] = None,
+        json_data: Optional[dict] = None,
+    ) -> tuple[int, dict]:
+        headers: dict = {"Authorization": f"Bearer {token}"} if token else {}
+        started_at: float = time.perf_counter()
+        async with self.session.request(
+            method, f"{self.url}{path}", json=json_data, headers=headers
+        ) as response:
+            body: dict = await response.json(content_type=None) or {}
+            status: int = response.status
+        if self.recording:
+            self.latencies[label or path].append(time.perf_counter() - started_at)
+            self.statuses[status] += 1
+        return status, body
+
+    async def register(self, prefix: str) -> dict:
+        name: str = f"{prefix}_{uuid.uuid4().hex[:12]}"
+        user: dict = {"username": name, "email": f"{name}@bench.local"}
+        status, body = await self.request(
+            "post",
+            "/registration",
+            label="POST /registration",
+            json_data={**user, "password": PASSWORD, "password_confirm": PASSWORD},
+        )
+        if status >= 400:
+            raise RuntimeError(f"registration failed: {status} {body}")
+        return user
+
+    async def login(self, email: str, password: str = PASSWORD) -> dict:
+        status, body = await self.request(
+            "post",
+            "/login",
+            label="POST /login",
+            json_data={"email": email, "password": password},
+        )
+        if status >= 400:
+            raise RuntimeError(f"login failed: {status} {body}")
+        return body["data"][0]
+
+    async def backend_calls(self) -> dict[str, tuple[float, float]]:
+        """backend -> (sum, count) of per request calls, {} without /metrics"""
+        async with self.session.get(f"{self.url}/metrics") as response:
+            if response.status != 200:
+                return {}
+            text: str = await response.text()
+        calls: dict[str, list[float]] = defaultdict(lambda: [0.0, 0.0])
+        for family in text_string_to_metric_families(text):
+            if family.name != BACKEND_CALLS_METRIC:
+                continue
+            for sample in family.samples:
+                backend: str = sample.labels.get("backend")
+                if sample.name.endswith("_sum"):
+                    calls[backend][0] += sample.value
+                elif sample.name.endswith("_count"):
+                    calls[backend][1] += sample.value
+        return {backend: tuple(values) for backend, values in calls.items()}
+
+
+async def logged_in_user(client: Client, number: int) -> dict:
+    user: dict = await client.register(prefix=f"bench{number}")
+    return {**user, **await client.login(email=user["email"])}
+
+
+async def setup_users(client: Client, concurrency: int, admin: dict) -> list[dict]:
+    return list(
+        await asyncio.gather(
+            *[
+                logged_in_user(client=client, number=number)
+                for number in range(concurrency)
+            ]
+        )
+    )
+
+
+async def setup_admin(client: Client, concurrency: int, admin: dict) -> list[dict]:
+    if not admin:
+        raise RuntimeError("admin_roles needs --admin-email and --admin-password")
+    tokens: dict = await client.login(email=admin["email"], password=admin["password"])
+    return [tokens for _ in range(concurrency)]
+
+
+async def setup_none(client: Client, concurrency: int, admin: dict) -> list[dict]:
+    return [{} for _ in range(concurrency)]
+
+
+async def registration(client: Client, state: dict) -> None:
+    await client.register(prefix="benchreg")
+
+
+async def login(client: Client, state: dict) -> None:
+    await client.login(email=state["email"])
+
+
+async def refresh_storm(client: Client, state: dict) -> None:
+    await client.request(
+        "post", "/token/refresh", "POST /token/refresh", token=state["refresh_token"]
+    )
+
+
+PROFILE_READS: tuple[tuple[str, int], ...] = (
+    ("/me/users", 6),
+    ("/auth_history", 2),
+    ("/sessions", 2),
+    ("/role/", 1),
+)
+
+
+async def profile_mixed(client: Client, state: dict) -> None:
+    path: str = random.choices(
+        [path for path, _ in PROFILE_READS],
+        weights=[weight for _, weight in PROFILE_READS],
+    )[0]
+    await client.request("get", path, f"GET {path}", token=state["access_token"])
+
+
+async def admin_roles(client: Client, state: dict) -> None:
+    token: str = state["access_token"]
+    _, body = await client.request(
+        "post",
+        "/role/",
+        "POST /role/",
+        token=token,
+        json_data={"name": f"bench_{uuid.uuid4().hex[:20]}"},
+    )
+    role_id: str = body["data"][0]["id"]
+    await client.request(
+        "patch",
+        f"/role/{role_id}",
+        "PATCH /role/<role_id>",
+        token=token,
+        json_data={"name": f"bench_{uuid.uuid4().hex[:20]}"},
+    )
+    await client.request("get", "/role/", "GET /role/", token=token)
+    await client.request(
+        "delete", f"/role/{role_id}", "DELETE /role/<role_id>", token=token
+    )
+
+
+SCENARIOS: dict[str, tuple[Callable[..., Awaitable[list[dict]]], Callable]] = {
+    "registration": (setup_none, registration),
+    "login": (setup_users, login),
+    "refresh_storm": (setup_users, refresh_storm),
+    "profile_mixed": (setup_users, profile_mixed),
+    "admin_roles": (setup_admin, admin_roles),
+}
+
+
+def percentile(values: list[float], share: float) -> float:
+    """nearest rank, values sorted"""
+    return values[max(0, math.ceil(share * len(values)) - 1)]
+
+
+def latency_summary(latencies: list[float]) -> dict[str, float]:
+    values: list[float] = sorted(latencies)
+    if not values:
+        return {}
+    return {
+        "p50": round(percentile(values, 0.50) * 1000, 2),
+        "p95": round(percentile(values, 0.95) * 1000, 2),
+        "p99": round(percentile(values, 0.99) * 1000, 2),
+        "max": round(values[-1] * 1000, 2),
+        "mean": round(sum(values) / len(values) * 1000, 2),
+    }
+
+
+async def run_scenario(
+    url: str, name: str, concurrency: int, duration: float, admin: dict
+) -> dict:
+    setup, step = SCENARIOS[name]
+    connector = aiohttp.TCPConnector(limit=concurrency + 1)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        client = Client(url=url, session=session)
+        states: list[dict] = await setup(
+            client=client, concurrency=concurrency, admin=admin
+        )
+        before: dict = await client.backend_calls()
+        client.recording = True
+        deadline: float = time.monotonic() + duration
+        errors: list[str] = []
+
+        async def virtual_user(state: dict) -> None:
+            while time.monotonic() < deadline:
+                try:
+                    await step(client=client, state=state)
+                except (aiohttp.ClientError, IndexError, KeyError, RuntimeError) as e:
+                    errors.append(f"{type(e).__name__}: {e}")
+
+        started_at: float = time.monotonic()
+        await asyncio.gather(*[virtual_user(state=state) for state in states])
+        elapsed: float = time.monotonic() - started_at
+        client.recording = False
+        after: dict = await client.backend_calls()
+
+    all_latencies: list[float] = [
+        latency for latencies in client.latencies.values() for latency in latencies
+    ]
+    per_request: dict[str, float] = {}
+    for backend, (calls, requests) in after.items():
+        calls -= before.get(backend, (0, 0))[0]
+        # the first /metrics scrape is counted in between
+        requests -= before.get(backend, (0, 0))[1] + 1
+        if requests > 0:
+            per_request[backend] = round(calls / requests, 2)
+    return {
+        "concurrency": concurrency,
+        "duration": round(elapsed, 2),
+        "requests": len(all_latencies),
+        "rps": round(len(all_latencies) / elapsed, 1),
+        "latency_ms": latency_summary(latencies=all_latencies),
+        "endpoints": {
+            label: {"requests": len(latencies), **latency_summary(latencies)}
+            for label, latencies in sorted(client.latencies.items())
+        },
+        "statuses": {f"{status}": count for status, count in client.statuses.items()},
+        "errors": len(errors),
+        "error_samples": errors[:5],
+        "backend_calls_per_request": per_request,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report: dict, baseline: dict) -> None:
+    print(f"\n{'scenario':<16}{'rps':>18}{'p95 ms':>20}{'db/request':>16}")
+    for name, result in report["scenarios"].items():
+        base: Optional[dict] = baseline.get("scenarios", {}).get(name)
+        if not base:
+            continue
+
+        def change(new: float, old: float) -> str:
+            delta: float = (new - old) / old * 100 if old else 0.0
+            return f"{old}->{new} ({delta:+.0f}%)"
+
+        print(
+            f"{name:<16}{change(result['rps'], base['rps']):>18}"
+            f"{change(result['latency_ms'].get('p95', 0), base['latency_ms'].get('p95', 0)):>20}"
+            f"{change(result['backend_calls_per_request'].get('db', 0), base['backend_calls_per_request'].get('db', 0)):>16}"
+        )
+
+
+async def main(args: argparse.Namespace) -> dict:
+    admin: dict = (
+        {"email": args.admin_email, "password": args.admin_password}
+        if args.admin_email
+        else {}
+    )
+    report: dict = {
+        "commit": git_commit(),
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "url": args.url,
+        "label": args.label,
+        "scenarios": {},
+    }
+    for name in args.scenario or list(SCENARIOS):
+        result: dict = await run_scenario(
+            url=args.url,
+            name=name,
+            concurrency=args.concurrency,
+            duration=args.duration,
+            admin=admin,
+        )
+        report["scenarios"][name] = result
+        latency: dict = result["latency_ms"]
+        print(
+            f"{name:<16} {result['rps']:>8} rps  p50 {latency.get('p50')} "
+            f"p95 {latency.get('p95')} p99 {latency.get('p99')} ms  "
+            f"calls/request {result['backend_calls_per_request']}  "
+            f"statuses {result['statuses']}  errors {result['errors']}"
+        )
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument(
+        "--scenario", action="append", choices=list(SCENARIOS), help="default: all"
+    )
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--admin-email", help="admin user for admin_roles")
+    parser.add_argument("--admin-password")
+    parser.add_argument("--label", help="e.g. the server mode, kept in the report")
+    parser.add_argument("--output", default="load-report.json")
+    parser.add_argument("--baseline", help="earlier report to compare with")
+    args = parser.parse_args()
+    report: dict = asyncio.run(main(args=args))
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"report: {args.output}")
+    if args.baseline:
+        with open(args.baseline) as file:
+            compare(report=report, baseline=json.load(file))
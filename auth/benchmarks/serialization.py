@@ -0,0 +1,125 @@
+"""Response serialization cost per endpoint: python3 -m benchmarks.serialization
+
+Compares the previous path (api_response_wrapper popping keys, then
+flask-restful's stdlib json) with build_envelope + orjson. Payloads have
+the shape of the schemas' output, so no database is needed.
+"""
+import argparse
+import json
+import timeit
+import uuid
+from datetime import datetime, timedelta
+
+from utils.decorators import build_envelope
+from utils.representations import dumps
+
+
+def legacy_envelope(response, status_code: int) -> dict:
+    """api_response_wrapper before the single pass envelope"""
+    message = response.pop("message") if "message" in response else None
+    description = response.pop("description") if "description" in response else None
+    errors = response.pop("errors") if "errors" in response else []
+    data: list = []
+    if isinstance(response, list):
+        data = response
+    elif response:
+        data.append(response)
+    wrapped_response: dict = {
+        "success": True if str(status_code.numerator).startswith("2") else False,
+        "data": data,
+    }
+    if message:
+        wrapped_response["message"] = message
+    if description:
+        wrapped_response["description"] = description
+    if errors:
+        wrapped_response["errors"] = errors
+    return wrapped_response
+
+
+def legacy_path(response: dict, status_code: int) -> bytes:
+    # the endpoint builds a new dict on every call, popping mutates it
+    envelope: dict = legacy_envelope(response=dict(response), status_code=status_code)
+    return (json.dumps(envelope) + "\n").encode()
+
+
+def fast_path(response: dict, status_code: int) -> bytes:
+    return dumps(build_envelope(response=response, status_code=status_code))
+
+
+def role(number: int) -> dict:
+    return {
+        "id": f"{uuid.uuid4()}",
+        "name": f"role_{number}",
+        "created_at": "2022-02-27 14:12",
+        "updated_at": "2022-02-27 14:12",
+    }
+
+
+def history_row(number: int) -> dict:
+    return {
+        "id": f"{uuid.uuid4()}",
+        "created_at": f"{datetime(2022, 4, 1) - timedelta(minutes=number)}",
+        "description": "login",
+        "ip_address": "127.0.0.1",
+        "user_agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36",
+        "platform": "linux",
+        "browser": "chrome",
+    }
+
+
+PAYLOADS: dict[str, tuple[dict, int]] = {
+    "profile": (
+        {
+            "id": f"{uuid.uuid4()}",
+            "username": "username",
+            "email": "user@mail.ru",
+            "created_at": "2022-02-27 14:12",
+        },
+        200,
+    ),
+    "login": (
+        {"access_token": "x" * 350, "refresh_token": "x" * 330},
+        200,
+    ),
+    "roles": ({"roles": [role(number=number) for number in range(20)]}, 200),
+    "history": (
+        {
+            "history": [history_row(number=number) for number in range(20)],
+            "next_cursor": "MjAyMi0wNC0wMVQwMDowMDowMHw0Mg",
+        },
+        200,
+    ),
+    "error": (
+        {
+            "message": "wrong data",
+            "errors": [{"name": "Role name <admin> already exist"}],
+        },
+        400,
+    ),
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+    print(f"{'endpoint':<10}{'legacy us':>12}{'fast us':>12}{'speedup':>10}")
+    for name, (response, status_code) in PAYLOADS.items():
+        assert json.loads(legacy_path(response, status_code)) == json.loads(
+            fast_path(response, status_code)
+        )
+        legacy: float = timeit.timeit(
+            lambda: legacy_path(response, status_code), number=args.number
+        )
+        fast: float = timeit.timeit(
+            lambda: fast_path(response, status_code), number=args.number
+        )
+        print(
+            f"{name:<10}{legacy / args.number * 1e6:>12.2f}"
+            f"{fast / args.number * 1e6:>12.2f}{legacy / fast:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
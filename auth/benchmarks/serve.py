@@ -0,0 +1,112 @@
+"""Auth service for load tests: python3 -m benchmarks.serve --mode launcher
+
+Runs one of the entry points (pywsgi.py, launcher.py, asgi.py) with the
+environment from .env, rate limits scaled up (RATE_LIMIT_SCALE) and
+/metrics on. Postgres has to be migrated (flask db upgrade). --fakeredis
+replaces Redis with an in-process fakeredis (pip install "fakeredis[lua]",
+the Lua scripts need lupa); its data is per process, so the launcher is
+limited to one worker.
+--admin-email/--admin-password create an admin for the admin_roles
+scenario of benchmarks.load.
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+
+from dotenv import load_dotenv
+
+BASE_DIR: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def use_fakeredis() -> None:
+    try:
+        import lupa  # noqa: F401
+    except ImportError:
+        # without it fakeredis answers EVALSHA with "unknown command", and
+        # rate limits, sessions and token issuance all run Lua
+        sys.exit('--fakeredis needs Lua scripting: pip install "fakeredis[lua]"')
+    import fakeredis
+    import redis
+
+    client = fakeredis.FakeRedis(decode_responses=True)
+    redis.Redis = lambda *args, **kwargs: client
+
+
+def create_admin(email: str, password: str, fake_redis: bool) -> None:
+    """runs in a spawned process: the server's process imports no app"""
+    sys.path.insert(0, BASE_DIR)
+    if fake_redis:
+        use_fakeredis()
+    from app import app, create_tables
+    from db import db
+    from models import Role, User, UserRole
+    from utils import constants
+
+    with app.app_context():
+        create_tables()
+        if User.find_by_email(email=email):
+            return
+        user = User(username=email.split("@")[0], email=email)
+        user.set_password(password=password)
+        db.session.add(user)
+        db.session.flush()
+        role = Role.find_by_role_name(role_name=constants.ROLE_FOR_ADMIN)
+        db.session.add(UserRole(user_id=user.id, role_id=role.id))
+        db.session.commit()
+
+
+def serve(mode: str, port: int, fake_redis: bool) -> None:
+    os.environ["FLASK_PORT"] = f"{port}"
+    if mode == "pywsgi":
+        from gevent import monkey
+
+        monkey.patch_all()
+        if fake_redis:
+            use_fakeredis()
+        import pywsgi  # noqa: F401  serves on import
+    elif mode == "launcher":
+        if fake_redis:
+            os.environ["WEB_WORKERS"] = "1"
+            use_fakeredis()
+        else:
+            os.environ.setdefault(
+                "PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="auth-metrics-")
+            )
+        import launcher
+
+        launcher.main()
+    else:
+        import uvicorn
+
+        if fake_redis:
+            use_fakeredis()
+        uvicorn.run("asgi:application", host="0.0.0.0", port=port, log_level="warning")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--mode", choices=("pywsgi", "launcher", "asgi"), default="launcher"
+    )
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--fakeredis", action="store_true")
+    parser.add_argument("--rate-limit-scale", default="1000")
+    parser.add_argument("--admin-email")
+    parser.add_argument("--admin-password")
+    args = parser.parse_args()
+    sys.path.insert(0, BASE_DIR)
+    os.chdir(BASE_DIR)
+    load_dotenv()
+    os.environ["RATE_LIMIT_SCALE"] = args.rate_limit_scale
+    os.environ["METRICS_ENABLED"] = "True"
+    if args.admin_email:
+        process = multiprocessing.get_context("spawn").Process(
+            target=create_admin,
+            args=(args.admin_email, args.admin_password, args.fakeredis),
+        )
+        process.start()
+        process.join()
+    serve(mode=args.mode, port=args.port, fake_redis=args.fakeredis)
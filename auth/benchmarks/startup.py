@@ -0,0 +1,91 @@
+"""Worker startup time of the auth app: python3 -m benchmarks.startup
+
+Imports the app in fresh interpreters under -X importtime, as every
+launcher worker does after fork, and reports the median import time, the
+packages it is spent in (own time of their modules) and create_app, then
+the first /apispec_1.json: read from OPENAPI_SPEC_PATH when flask openapi
+wrote it, built from the docstrings otherwise. Needs the environment of
+.env, no database.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+BASE_DIR: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHILD: str = """
+import json, sys, time
+started_at = time.perf_counter()
+import app
+timings = {"import app": time.perf_counter() - started_at}
+started_at = time.perf_counter()
+app.create_app(flask_app=app.app)
+timings["create_app"] = time.perf_counter() - started_at
+deferred = {name: name in sys.modules for name in ("flasgger", "authlib")}
+from core.openapi import spec_view
+with app.app.test_request_context("/apispec_1.json"):
+    started_at = time.perf_counter()
+    spec_view()
+    timings["first /apispec_1.json"] = time.perf_counter() - started_at
+print(json.dumps({"timings": timings, "loaded_at_startup": deferred}))
+"""
+
+
+def parse_importtime(stderr: str) -> dict[str, float]:
+    """top-level package -> seconds spent in its own modules"""
+    packages: dict[str, float] = defaultdict(float)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, _, name = line[len("import time:") :].split("|")
+        packages[name.strip().split(".")[0]] += int(own) / 1e6
+    return packages
+
+
+def run_once() -> tuple[dict, dict[str, float]]:
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD],
+        cwd=BASE_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(process.stdout.splitlines()[-1]), parse_importtime(
+        stderr=process.stderr
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+    timings: dict[str, list[float]] = defaultdict(list)
+    packages: dict[str, list[float]] = defaultdict(list)
+    loaded: dict = {}
+    for _ in range(args.repeat):
+        result, imports = run_once()
+        for name, seconds in result["timings"].items():
+            timings[name].append(seconds)
+        for name, seconds in imports.items():
+            packages[name].append(seconds)
+        loaded = result["loaded_at_startup"]
+    print(f"median of {args.repeat} runs")
+    for name, values in timings.items():
+        print(f"{name:<24}{statistics.median(values) * 1000:>10.1f} ms")
+    print(f"imported at startup: {loaded}\n")
+    print(f"{'package':<24}{'own ms':>10}")
+    medians: dict[str, float] = {
+        name: statistics.median(values + [0.0] * (args.repeat - len(values)))
+        for name, values in packages.items()
+    }
+    ranked: list = sorted(medians.items(), key=lambda item: -item[1])
+    for name, seconds in ranked[: args.top]:
+        print(f"{name:<24}{seconds * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
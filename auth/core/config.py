@@ -16,3 +16,114 @@ TESTING: bool = os.getenv("TESTING") == "True"
 
 # Корень проекта
 BASE_DIR: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Rate limiting: sliding_window_log | sliding_window_counter | gcra
+RATE_LIMIT_ALGORITHM: str = os.getenv("RATE_LIMIT_ALGORITHM", "sliding_window_counter")
+# multiplies every endpoint's limit, e.g. for load tests from one address
+RATE_LIMIT_SCALE: float = float(os.getenv("RATE_LIMIT_SCALE", 1))
+# In-process token bucket in front of the Redis limiter (per worker)
+RATE_LIMIT_LOCAL_ENABLED: bool = os.getenv("RATE_LIMIT_LOCAL_ENABLED") == "True"
+RATE_LIMIT_LOCAL_MAX_KEYS: int = int(os.getenv("RATE_LIMIT_LOCAL_MAX_KEYS", 10000))
+RATE_LIMIT_LOCAL_SYNC_BATCH: int = int(os.getenv("RATE_LIMIT_LOCAL_SYNC_BATCH", 10))
+RATE_LIMIT_LOCAL_SYNC_INTERVAL: float = float(
+    os.getenv("RATE_LIMIT_LOCAL_SYNC_INTERVAL", 1.0)
+)
+
+# Role resolution for permissions: claims (signed JWT "roles") | cache
+ROLE_RESOLVER: str = os.getenv("ROLE_RESOLVER", "cache")
+ROLE_CACHE_TTL: int = int(os.getenv("ROLE_CACHE_TTL", 60 * 60))
+ROLE_CACHE_LOCAL_TTL: float = float(os.getenv("ROLE_CACHE_LOCAL_TTL", 5))
+ROLE_CACHE_LOCAL_MAX_SIZE: int = int(os.getenv("ROLE_CACHE_LOCAL_MAX_SIZE", 10000))
+# Role list/detail responses, cached under a version replaced on role changes
+ROLE_CATALOG_TTL: int = int(os.getenv("ROLE_CATALOG_TTL", 60 * 60))
+ROLE_CATALOG_LOCAL_MAX_SIZE: int = int(os.getenv("ROLE_CATALOG_LOCAL_MAX_SIZE", 1000))
+# Cache-Control max-age for clients and gateways, 0 revalidates every time
+ROLE_CATALOG_MAX_AGE: int = int(os.getenv("ROLE_CATALOG_MAX_AGE", 0))
+# flask import-users
+IMPORT_BATCH_SIZE: int = int(os.getenv("IMPORT_BATCH_SIZE", 2000))
+IMPORT_HASH_WORKERS: int = int(os.getenv("IMPORT_HASH_WORKERS", os.cpu_count() or 1))
+# Bulk user_role endpoints: items per request and per SQL statement
+USER_ROLE_BULK_MAX_ITEMS: int = int(os.getenv("USER_ROLE_BULK_MAX_ITEMS", 50000))
+USER_ROLE_BULK_BATCH_SIZE: int = int(os.getenv("USER_ROLE_BULK_BATCH_SIZE", 1000))
+
+# Login history write-behind (bounded in-memory queue, batched INSERT)
+HISTORY_WRITE_BEHIND: bool = os.getenv("HISTORY_WRITE_BEHIND") == "True"
+HISTORY_QUEUE_SIZE: int = int(os.getenv("HISTORY_QUEUE_SIZE", 10000))
+HISTORY_BATCH_SIZE: int = int(os.getenv("HISTORY_BATCH_SIZE", 500))
+HISTORY_FLUSH_INTERVAL: float = float(os.getenv("HISTORY_FLUSH_INTERVAL", 1.0))
+HISTORY_PAGE_SIZE: int = int(os.getenv("HISTORY_PAGE_SIZE", 20))
+HISTORY_MAX_PAGE_SIZE: int = int(os.getenv("HISTORY_MAX_PAGE_SIZE", 100))
+HISTORY_PARTITIONS_AHEAD: int = int(os.getenv("HISTORY_PARTITIONS_AHEAD", 3))
+# seconds between partition checks of serving processes, 0 disables them
+HISTORY_PARTITIONS_INTERVAL: float = float(
+    os.getenv("HISTORY_PARTITIONS_INTERVAL", 60 * 60)
+)
+HISTORY_RETENTION_MONTHS: int = int(os.getenv("HISTORY_RETENTION_MONTHS", 12))
+
+# Password hashing: executor process | inline
+PASSWORD_HASH_EXECUTOR: str = os.getenv("PASSWORD_HASH_EXECUTOR", "process")
+# pool size per process: every launcher worker has its own pool, so the
+# default splits the CPUs between the WEB_WORKERS workers
+PASSWORD_HASH_WORKERS: int = int(
+    os.getenv(
+        "PASSWORD_HASH_WORKERS",
+        max(
+            1,
+            (os.cpu_count() or 1) // int(os.getenv("WEB_WORKERS", os.cpu_count() or 1)),
+        ),
+    )
+)
+PASSWORD_HASH_MAX_CONCURRENCY: int = int(
+    os.getenv("PASSWORD_HASH_MAX_CONCURRENCY", PASSWORD_HASH_WORKERS * 2)
+)
+PASSWORD_HASH_METHOD: str = os.getenv("PASSWORD_HASH_METHOD", "pbkdf2:sha256:260000")
+PASSWORD_HASH_SALT_LENGTH: int = int(os.getenv("PASSWORD_HASH_SALT_LENGTH", 16))
+PASSWORD_REHASH_ON_LOGIN: bool = os.getenv("PASSWORD_REHASH_ON_LOGIN", "True") == "True"
+
+# In-process Bloom filter of revoked access tokens
+BLOCKLIST_FILTER_ENABLED: bool = os.getenv("BLOCKLIST_FILTER_ENABLED", "True") == "True"
+BLOCKLIST_FILTER_CAPACITY: int = int(os.getenv("BLOCKLIST_FILTER_CAPACITY", 100000))
+BLOCKLIST_FILTER_ERROR_RATE: float = float(
+    os.getenv("BLOCKLIST_FILTER_ERROR_RATE", 0.001)
+)
+BLOCKLIST_FILTER_REFRESH_INTERVAL: float = float(
+    os.getenv("BLOCKLIST_FILTER_REFRESH_INTERVAL", 30)
+)
+
+# Tracing exporter: none | console | file | otlp
+TRACING_EXPORTER: str = os.getenv("TRACING_EXPORTER", "none")
+TRACING_SERVICE_NAME: str = os.getenv("TRACING_SERVICE_NAME", "auth")
+# share of root traces sampled, child spans follow their parent's decision
+TRACING_SAMPLE_RATIO: float = float(os.getenv("TRACING_SAMPLE_RATIO", 0.1))
+TRACING_OTLP_ENDPOINT: str = os.getenv("TRACING_OTLP_ENDPOINT", "localhost:4317")
+TRACING_OTLP_INSECURE: bool = os.getenv("TRACING_OTLP_INSECURE", "True") == "True"
+TRACING_FILE_PATH: str = os.getenv("TRACING_FILE_PATH", "traces.jsonl")
+TRACING_MAX_QUEUE_SIZE: int = int(os.getenv("TRACING_MAX_QUEUE_SIZE", 2048))
+TRACING_MAX_EXPORT_BATCH_SIZE: int = int(
+    os.getenv("TRACING_MAX_EXPORT_BATCH_SIZE", 512)
+)
+TRACING_SCHEDULE_DELAY_MILLIS: int = int(
+    os.getenv("TRACING_SCHEDULE_DELAY_MILLIS", 5000)
+)
+TRACING_EXPORT_TIMEOUT_MILLIS: int = int(
+    os.getenv("TRACING_EXPORT_TIMEOUT_MILLIS", 10000)
+)
+# comma separated regexps of urls not traced
+TRACING_EXCLUDED_URLS: str = os.getenv("TRACING_EXCLUDED_URLS", "apidocs,flasgger")
+
+# Social login providers: keep-alive pool per provider, (connect, read)
+# timeouts of every request and seconds discovery/JWKS documents are cached
+OAUTH_HTTP_POOL_SIZE: int = int(os.getenv("OAUTH_HTTP_POOL_SIZE", 10))
+OAUTH_HTTP_CONNECT_TIMEOUT: float = float(os.getenv("OAUTH_HTTP_CONNECT_TIMEOUT", 3))
+OAUTH_HTTP_READ_TIMEOUT: float = float(os.getenv("OAUTH_HTTP_READ_TIMEOUT", 5))
+OAUTH_METADATA_TTL: int = int(os.getenv("OAUTH_METADATA_TTL", 60 * 60))
+
+# Spec written by flask openapi and served as-is at /apispec_1.json
+OPENAPI_SPEC_PATH: str = os.path.join(
+    BASE_DIR, os.getenv("OPENAPI_SPEC_PATH", "openapi.json")
+)
+
+# Prometheus GET /metrics and per request DB/Redis accounting
+METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "True") == "True"
+# seconds between samples of queue depth, pool usage and other gauges
+METRICS_GAUGE_INTERVAL: float = float(os.getenv("METRICS_GAUGE_INTERVAL", 5))
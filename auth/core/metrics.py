@@ -0,0 +1,249 @@
+import os
+import time
+from functools import wraps
+from typing import Callable, Optional
+
+from flask import Flask, Response, g, has_request_context, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from core import config
+
+CALL_BUCKETS: tuple[float, ...] = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+)
+PASSWORD_BUCKETS: tuple[float, ...] = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+PROVIDER_BUCKETS: tuple[float, ...] = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CALLS_PER_REQUEST_BUCKETS: tuple[float, ...] = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+BACKENDS: tuple[str, ...] = ("db", "redis")
+
+REQUEST_SECONDS = Histogram(
+    "auth_http_request_duration_seconds",
+    "HTTP request latency",
+    ["method", "endpoint", "status"],
+)
+REQUEST_CALLS = Histogram(
+    "auth_http_request_backend_calls",
+    "DB queries or Redis round trips made by one request",
+    ["backend"],
+    buckets=CALLS_PER_REQUEST_BUCKETS,
+)
+REQUEST_CALL_SECONDS = Histogram(
+    "auth_http_request_backend_seconds",
+    "Time one request spent in DB or Redis calls",
+    ["backend"],
+    buckets=CALL_BUCKETS,
+)
+BACKEND_CALL_SECONDS = Histogram(
+    "auth_backend_call_duration_seconds",
+    "Latency of a DB query or a Redis round trip",
+    ["backend"],
+    buckets=CALL_BUCKETS,
+)
+PASSWORD_SECONDS = Histogram(
+    "auth_password_hash_duration_seconds",
+    "Password hash and verify duration, pool queue included",
+    ["operation"],
+    buckets=PASSWORD_BUCKETS,
+)
+TOKEN_SIGN_SECONDS = Histogram(
+    "auth_token_sign_duration_seconds",
+    "Signing of an access and refresh token pair",
+    buckets=CALL_BUCKETS,
+)
+TOKENS_ISSUED = Counter("auth_tokens_issued_total", "Signed token pairs")
+OAUTH_PROVIDER_SECONDS = Histogram(
+    "auth_oauth_provider_request_seconds",
+    "Requests to social login providers by status class, error or timeout",
+    ["provider", "outcome"],
+    buckets=PROVIDER_BUCKETS,
+)
+RATE_LIMIT_REJECTIONS = Counter(
+    "auth_rate_limit_rejections_total",
+    "Requests rejected by the rate limit",
+    ["endpoint"],
+)
+# hit ratio: sum(rate(...{source="filter"})) / sum(rate(...))
+BLOCKLIST_CHECKS = Counter(
+    "auth_blocklist_checks_total",
+    "Access token blocklist checks by where they were answered",
+    ["source", "revoked"],
+)
+DB_POOL_WAIT_SECONDS = Histogram(
+    "auth_db_pool_wait_seconds",
+    "Wait for a connection from the DB pool",
+    buckets=CALL_BUCKETS,
+)
+DB_POOL_TIMEOUTS = Counter(
+    "auth_db_pool_timeouts_total", "DB pool checkouts given up after DB_POOL_TIMEOUT"
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "auth_db_pool_checked_out",
+    "DB connections in use",
+    multiprocess_mode="livesum",
+)
+HISTORY_QUEUE_DEPTH = Gauge(
+    "auth_history_queue_depth",
+    "Login history rows waiting for the write-behind worker",
+    multiprocess_mode="livesum",
+)
+WORKER_CONNECTIONS = Gauge(
+    "auth_worker_connections",
+    "Requests in flight in the workers' gevent pools",
+    multiprocess_mode="livesum",
+)
+WORKER_CONNECTIONS_LIMIT = Gauge(
+    "auth_worker_connections_limit",
+    "Size of the workers' gevent pools",
+    multiprocess_mode="livesum",
+)
+
+# children are looked up once, labels() takes a lock
+backend_call_seconds: dict = {
+    backend: BACKEND_CALL_SECONDS.labels(backend=backend) for backend in BACKENDS
+}
+password_seconds: dict = {
+    operation: PASSWORD_SECONDS.labels(operation=operation)
+    for operation in ("hash", "verify")
+}
+
+_worker_pool = None
+_sampled_at: float = 0.0
+
+
+def observe_call(backend: str, seconds: float) -> None:
+    """a DB query or Redis round trip, added up per request too"""
+    backend_call_seconds[backend].observe(seconds)
+    if has_request_context():
+        calls: Optional[dict] = g.get("backend_calls")
+        if calls is not None:
+            calls[backend][0] += 1
+            calls[backend][1] += seconds
+
+
+def timed(backend: str, func: Callable) -> Callable:
+    @wraps(func)
+    def inner(*args, **kwargs):
+        started_at: float = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            observe_call(backend=backend, seconds=time.perf_counter() - started_at)
+
+    return inner
+
+
+def timed_async(backend: str, func: Callable) -> Callable:
+    """timed() of a coroutine function"""
+
+    @wraps(func)
+    async def inner(*args, **kwargs):
+        started_at: float = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            observe_call(backend=backend, seconds=time.perf_counter() - started_at)
+
+    return inner
+
+
+def endpoint_label() -> str:
+    """route pattern, not the path: keeps the label set bounded"""
+    return request.url_rule.rule if request.url_rule else "unmatched"
+
+
+def watch_worker_pool(pool, limit: int) -> None:
+    """the launcher worker's gevent pool, sampled for WORKER_CONNECTIONS"""
+    global _worker_pool
+    _worker_pool = pool
+    WORKER_CONNECTIONS_LIMIT.set(limit)
+
+
+def sample_gauges() -> None:
+    global _sampled_at
+    _sampled_at = time.monotonic()
+    from api.user.history_service import history_writer
+    from db import db
+
+    HISTORY_QUEUE_DEPTH.set(history_writer.depth)
+    DB_POOL_CHECKED_OUT.set(db.engine.pool.checkedout())
+    if _worker_pool is not None:
+        WORKER_CONNECTIONS.set(len(_worker_pool))
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_started_at"] = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started_at: Optional[float] = conn.info.pop("query_started_at", None)
+    if started_at is not None:
+        observe_call(backend="db", seconds=time.perf_counter() - started_at)
+
+
+def before_request() -> None:
+    g.request_started_at = time.perf_counter()
+    g.backend_calls = {backend: [0, 0.0] for backend in BACKENDS}
+
+
+def after_request(response: Response) -> Response:
+    started_at: Optional[float] = g.get("request_started_at")
+    if started_at is None:
+        return response
+    REQUEST_SECONDS.labels(
+        method=request.method, endpoint=endpoint_label(), status=response.status_code
+    ).observe(time.perf_counter() - started_at)
+    for backend, (calls, seconds) in g.backend_calls.items():
+        REQUEST_CALLS.labels(backend=backend).observe(calls)
+        REQUEST_CALL_SECONDS.labels(backend=backend).observe(seconds)
+    if time.monotonic() - _sampled_at >= config.METRICS_GAUGE_INTERVAL:
+        sample_gauges()
+    return response
+
+
+def metrics_view() -> Response:
+    sample_gauges()
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        # every launcher worker writes its own files, aggregate them
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+def setup_metrics(flask_app: Flask) -> None:
+    """GET /metrics and per request latency and DB/Redis call accounting.
+
+    Counters are process-local; with several launcher workers set
+    PROMETHEUS_MULTIPROC_DIR so that /metrics of any worker reports all of
+    them. Gauges are sampled at most every METRICS_GAUGE_INTERVAL seconds.
+    """
+    if not config.METRICS_ENABLED:
+        return
+    if not event.contains(Engine, "before_cursor_execute", before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", after_cursor_execute)
+    flask_app.before_request(before_request)
+    flask_app.after_request(after_request)
+    flask_app.add_url_rule("/metrics", "metrics", metrics_view)
@@ -1,8 +1,56 @@
 import http
+from typing import Optional
+
+from sqlalchemy import literal, select, union_all
+from sqlalchemy.dialects.postgresql import insert
 
 from api.user.login_service import generate_jwt_tokens
 from api.user.registration_service import create_new_user
+from db import db
 from models import SocialAccount, User
+from utils.client_info import ClientInfo
+
+LINKED: int = 0
+
+
+def find_social_user(
+    social_name: str, social_id: str, email: str, username: str
+) -> tuple[Optional[User], bool]:
+    """One query: the user the social account is linked to, else the user
+    with that email, else with that username; and whether the link exists
+    """
+    branches: list = [
+        select(SocialAccount.user_id, literal(LINKED)).where(
+            SocialAccount.social_name == social_name,
+            SocialAccount.social_id == social_id,
+        ),
+        select(User.id, literal(2)).where(User.username == username),
+    ]
+    # no email from the provider must not match users by NULL
+    if email:
+        branches.append(select(User.id, literal(1)).where(User.email == email))
+    candidates = union_all(*branches).subquery("candidates")
+    user_id, priority = candidates.c
+    row = (
+        db.session.query(User, priority)
+        .join(candidates, user_id == User.id)
+        .order_by(priority)
+        .first()
+    )
+    if row is None:
+        return None, False
+    return row[0], row[1] == LINKED
+
+
+def link_social_account(user_id: str, social_name: str, social_id: str) -> None:
+    """INSERT ... ON CONFLICT DO NOTHING, a concurrent login may link first;
+    the caller commits
+    """
+    db.session.execute(
+        insert(SocialAccount.__table__)
+        .values(user_id=user_id, social_id=social_id, social_name=social_name)
+        .on_conflict_do_nothing(constraint="social_pk")
+    )
 
 
 def register_social_account(
@@ -10,31 +58,31 @@ def register_social_account(
     social_id: str,
     email: str,
     username: str,
-    request: "Request" = None,
+    client: Optional[ClientInfo] = None,
 ) -> tuple[dict[str, str], int]:
-    # search user in db by email
-    current_user = User.find_by_email(email=email)
-    # by username
-    if not current_user:
-        current_user = User.find_by_username(username=username)
+    current_user, linked = find_social_user(
+        social_name=social_name, social_id=social_id, email=email, username=username
+    )
     # if user not, create them
     if not current_user:
         current_user = create_new_user(
             username=username, email=email, password="Qwerty123"
         )
     # write social account in db
-    if not SocialAccount.raw_exists(
-        user_id=current_user.id, social_id=social_id, social_name=social_name
-    ):
-        SocialAccount(
-            user_id=current_user.id, social_id=social_id, social_name=social_name
-        ).save_to_db()
+    if not linked:
+        link_social_account(
+            user_id=current_user.id, social_name=social_name, social_id=social_id
+        )
+    # read before any commit, it expires the user
+    message: str = f"Logged in as {current_user.username} - {current_user.email}"
     # get jwt tokens for user
     jwt_tokens: dict[str, str] = generate_jwt_tokens(
-        current_user=current_user, request=request
+        current_user=current_user, client=client
     )
+    # the link; nothing left to commit when the login history was written
+    db.session.commit()
     return {
-        "message": f"Logged in as {current_user.username} - {current_user.email}",
+        "message": message,
         "access_token": jwt_tokens.get("access_token"),
         "refresh_token": jwt_tokens.get("refresh_token"),
     }, http.HTTPStatus.OK
@@ -1,17 +1,29 @@
 import os
+import time
+from http.cookiejar import DefaultCookiePolicy
 
 import requests
+from authlib.integrations.flask_client import FlaskRemoteApp, OAuth
 from dotenv import load_dotenv
 from flask import url_for
+from requests.adapters import HTTPAdapter
+from requests.exceptions import Timeout
+from urllib3.util.retry import Retry
 
-from app import oauth
+from app import app
+from core import config
+from core.metrics import OAUTH_PROVIDER_SECONDS
+from utils.client_info import get_client_info
 from utils.constants import OAUTH_SERVICES
 from utils.decorators import remote_oauth_api_error_handler
+from utils.local_cache import TTLCache
 
 from .oauth_service import register_social_account
 
 load_dotenv()
 
+# imported by the social network views on first use, not at app startup
+oauth = OAuth(app)
 
 OAUTH_CREDENTIALS: dict[str, dict[str, str]] = {
     "facebook": {
@@ -31,19 +43,129 @@ OAUTH_CREDENTIALS: dict[str, dict[str, str]] = {
 }
 
 
+# OpenID discovery and JWKS documents by url
+provider_documents: TTLCache = TTLCache(max_size=32, ttl=config.OAUTH_METADATA_TTL)
+provider_sessions: dict[str, requests.Session] = {}
+
+
+class ProviderAdapter(HTTPAdapter):
+    """Keep-alive pool of one provider, requests without a timeout get
+    OAUTH_HTTP_CONNECT_TIMEOUT/OAUTH_HTTP_READ_TIMEOUT and the latency of
+    every request goes to OAUTH_PROVIDER_SECONDS
+    """
+
+    def __init__(self, provider_name: str):
+        self.provider_name: str = provider_name
+        # a pooled connection the provider closed meanwhile fails on connect
+        super().__init__(
+            pool_maxsize=config.OAUTH_HTTP_POOL_SIZE,
+            max_retries=Retry(total=1, connect=1, read=False, status=0),
+        )
+
+    def send(self, request, timeout=None, **kwargs):
+        if timeout is None:
+            timeout = (
+                config.OAUTH_HTTP_CONNECT_TIMEOUT,
+                config.OAUTH_HTTP_READ_TIMEOUT,
+            )
+        started_at: float = time.perf_counter()
+        outcome: str = "error"
+        try:
+            response = super().send(request, timeout=timeout, **kwargs)
+            outcome = f"{response.status_code // 100}xx"
+            return response
+        except Timeout:
+            outcome = "timeout"
+            raise
+        finally:
+            OAUTH_PROVIDER_SECONDS.labels(
+                provider=self.provider_name, outcome=outcome
+            ).observe(time.perf_counter() - started_at)
+
+    def close(self) -> None:
+        """the pool outlives sessions, authlib closes one after every call"""
+
+
+def provider_session(provider_name: str) -> requests.Session:
+    """session of a provider shared by all its logins, it keeps no cookies"""
+    session = provider_sessions.get(provider_name)
+    if session is None:
+        session = requests.Session()
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        adapter = ProviderAdapter(provider_name=provider_name)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session = provider_sessions.setdefault(provider_name, session)
+    return session
+
+
+class ProviderRemoteApp(FlaskRemoteApp):
+    """authlib client on its provider's pool; authlib itself opens a new
+    session per call and keeps discovery and JWKS documents forever
+    """
+
+    def _get_oauth_client(self, **kwargs):
+        session = super()._get_oauth_client(**kwargs)
+        shared: requests.Session = provider_session(provider_name=self.name)
+        for prefix, adapter in shared.adapters.items():
+            session.mount(prefix, adapter)
+        return session
+
+    def _fetch_server_metadata(self, url: str) -> dict:
+        document = provider_documents.get(url)
+        if document is None:
+            response = provider_session(provider_name=self.name).get(url)
+            response.raise_for_status()
+            document = response.json()
+            provider_documents.set(url, document)
+        return document
+
+    def load_server_metadata(self) -> dict:
+        if self._server_metadata_url:
+            self.server_metadata.update(
+                self._fetch_server_metadata(url=self._server_metadata_url)
+            )
+        return self.server_metadata
+
+    def fetch_jwk_set(self, force: bool = False) -> dict:
+        uri = self.load_server_metadata().get("jwks_uri")
+        if not uri:
+            return super().fetch_jwk_set(force=force)
+        if force:
+            # unknown key id, the provider has rotated its keys
+            provider_documents.pop(uri)
+        return self._fetch_server_metadata(url=uri)
+
+
 class OAuthSignIn(object):
     providers = None
+    # oauth.register() arguments besides the name and the credentials
+    client_settings: dict = {}
 
     def __init__(self, provider_name: str):
         self.provider_name: str = provider_name.value
         credentials: dict[str, str] = OAUTH_CREDENTIALS.get(provider_name.value)
         self.client_id: str = credentials.get("id")
         self.client_secret: str = credentials.get("secret")
-        self.service = None
+        self.http: requests.Session = provider_session(provider_name=self.provider_name)
+        self._service = None
+
+    @property
+    def service(self):
+        """authlib client, registered on the provider's first use"""
+        if self._service is None:
+            self._service = oauth.register(
+                name=self.provider_name,
+                client_id=self.client_id,
+                client_secret=self.client_secret,
+                client_cls=ProviderRemoteApp,
+                **self.client_settings,
+            )
+        return self._service
 
     def get_redirect_url(self) -> str:
         redirect_uri: str = url_for(
-            "provider_auth", _external=True, provider=self.provider_name
+            "social_net.provider_auth", _external=True, provider=self.provider_name
         )
         return self.service.authorize_redirect(redirect_uri=redirect_uri)
 
@@ -61,18 +183,15 @@ class OAuthSignIn(object):
 
 
 class FacebookSignIn(OAuthSignIn):
+    client_settings: dict = {
+        "access_token_url": os.getenv("FACEBOOK_ACCESS_TOKEN_URL"),
+        "authorize_url": os.getenv("FACEBOOK_AUTHORIZE_URL"),
+        "api_base_url": os.getenv("FACEBOOK_API_BASE_URL"),
+        "client_kwargs": {"scope": "email"},
+    }
+
     def __init__(self):
-        print(OAUTH_SERVICES.facebook)
         super(FacebookSignIn, self).__init__(provider_name=OAUTH_SERVICES.facebook)
-        self.service = oauth.register(
-            name=self.provider_name,
-            client_id=self.client_id,
-            client_secret=self.client_secret,
-            access_token_url=os.getenv("FACEBOOK_ACCESS_TOKEN_URL"),
-            authorize_url=os.getenv("FACEBOOK_AUTHORIZE_URL"),
-            api_base_url=os.getenv("FACEBOOK_API_BASE_URL"),
-            client_kwargs={"scope": "email"},
-        )
 
     @remote_oauth_api_error_handler
     def get_profile_data(self, request=None):
@@ -83,7 +202,7 @@ class FacebookSignIn(OAuthSignIn):
         email: str = user_info_response.get("email")
         username: str = user_info_response.get("name")
         return register_social_account(
-            request=request,
+            client=get_client_info(request=request),
             social_name=self.provider_name,
             social_id=social_id,
             email=email,
@@ -92,15 +211,13 @@ class FacebookSignIn(OAuthSignIn):
 
 
 class GoogleSignIn(OAuthSignIn):
+    client_settings: dict = {
+        "server_metadata_url": os.getenv("GOOGLE_SERVER_METADATA_URL"),
+        "client_kwargs": {"scope": "openid email profile"},
+    }
+
     def __init__(self):
         super(GoogleSignIn, self).__init__(provider_name=OAUTH_SERVICES.google)
-        self.service = oauth.register(
-            name=self.provider_name,
-            client_id=self.client_id,
-            client_secret=self.client_secret,
-            server_metadata_url=os.getenv("GOOGLE_SERVER_METADATA_URL"),
-            client_kwargs={"scope": "openid email profile"},
-        )
 
     @remote_oauth_api_error_handler
     def get_profile_data(self, request=None):
@@ -111,7 +228,7 @@ class GoogleSignIn(OAuthSignIn):
         email: str = user_info_response.get("email")
         username: str = user_info_response.get("name")
         return register_social_account(
-            request=request,
+            client=get_client_info(request=request),
             social_name=self.provider_name,
             social_id=social_id,
             email=email,
@@ -120,22 +237,20 @@ class GoogleSignIn(OAuthSignIn):
 
 
 class VKSignIn(OAuthSignIn):
+    client_settings: dict = {
+        "authorize_url": os.getenv("VK_AUTHORIZE_URL"),
+        "scope": "email",
+        "base_url": os.getenv("VK_API_BASE_URL"),
+    }
+
     def __init__(self):
         super(VKSignIn, self).__init__(provider_name=OAUTH_SERVICES.vk)
-        self.service = oauth.register(
-            name=self.provider_name,
-            client_id=self.client_id,
-            client_secret=self.client_secret,
-            authorize_url=os.getenv("VK_AUTHORIZE_URL"),
-            scope="email",
-            base_url=os.getenv("VK_API_BASE_URL"),
-        )
 
     @remote_oauth_api_error_handler
     def get_profile_data(self, request=None):
         code: str = request.args.get("code")
         # authorize in vk
-        vk_response = requests.get(
+        vk_response = self.http.get(
             url=os.getenv("VK_ACCESS_TOKEN_URL"),
             params={
                 "client_id": self.client_id,
@@ -150,7 +265,7 @@ class VKSignIn(OAuthSignIn):
         email: str = vk_response.get("email")
         username: str = f"{self.provider_name}-{social_id}"
         return register_social_account(
-            request=request,
+            client=get_client_info(request=request),
             social_name=self.provider_name,
             social_id=social_id,
             email=email,
@@ -159,22 +274,20 @@ class VKSignIn(OAuthSignIn):
 
 
 class MailSignIn(OAuthSignIn):
+    client_settings: dict = {
+        "authorize_url": os.getenv("MAIL_AUTHORIZE_URL"),
+        "response_type": "code",
+        "scope": "userinfo",
+    }
+
     def __init__(self):
         super(MailSignIn, self).__init__(provider_name=OAUTH_SERVICES.mail)
-        self.service = oauth.register(
-            name=self.provider_name,
-            client_id=self.client_id,
-            client_secret=self.client_secret,
-            authorize_url=os.getenv("MAIL_AUTHORIZE_URL"),
-            response_type="code",
-            scope="userinfo",
-        )
 
     @remote_oauth_api_error_handler
     def get_profile_data(self, request=None):
         code: str = request.args.get("code")
         # authorize in mail
-        mail_response = requests.post(
+        mail_response = self.http.post(
             url=os.getenv("MAIL_TOKEN_URL"),
             params={"client_id": self.client_id, "client_secret": self.client_secret},
             data={
@@ -184,7 +297,7 @@ class MailSignIn(OAuthSignIn):
             },
         ).json()
         access_token: str = mail_response.get("access_token")
-        user_info_response = requests.get(
+        user_info_response = self.http.get(
             url=os.getenv("MAIL_PROFILE_URL"), params={"access_token": access_token}
         ).json()
         # get user's info
@@ -192,7 +305,7 @@ class MailSignIn(OAuthSignIn):
         email: str = user_info_response.get("email")
         username: str = user_info_response.get("nickname")
         return register_social_account(
-            request=request,
+            client=get_client_info(request=request),
             social_name=self.provider_name,
             social_id=social_id,
             email=email,
@@ -201,23 +314,21 @@ class MailSignIn(OAuthSignIn):
 
 
 class YandexSignIn(OAuthSignIn):
+    client_settings: dict = {
+        "authorize_url": os.getenv("YANDEX_AUTHORIZE_URL"),
+        "response_type": "code",
+        "display": "popup",
+        "scope": "login:info login:email",
+    }
+
     def __init__(self):
         super(YandexSignIn, self).__init__(provider_name=OAUTH_SERVICES.yandex)
-        self.service = oauth.register(
-            name=self.provider_name,
-            client_id=self.client_id,
-            client_secret=self.client_secret,
-            authorize_url=os.getenv("YANDEX_AUTHORIZE_URL"),
-            response_type="code",
-            display="popup",
-            scope="login:info login:email",
-        )
 
     @remote_oauth_api_error_handler
     def get_profile_data(self, request=None):
         code: str = request.args.get("code")
         # authorize in yandex
-        yandex_response = requests.post(
+        yandex_response = self.http.post(
             url=os.getenv("YANDEX_TOKEN_URL"),
             data={
                 "client_id": self.client_id,
@@ -227,7 +338,7 @@ class YandexSignIn(OAuthSignIn):
             },
         ).json()
         access_token: str = yandex_response.get("access_token")
-        user_info_response = requests.get(
+        user_info_response = self.http.get(
             url=os.getenv("YANDEX_PROFILE_URL"),
             params={
                 "format": "json",
@@ -240,7 +351,7 @@ class YandexSignIn(OAuthSignIn):
         email: str = user_info_response.get("default_email")
         username: str = user_info_response.get("login")
         return register_social_account(
-            request=request,
+            client=get_client_info(request=request),
             social_name=self.provider_name,
             social_id=social_id,
             email=email,
@@ -0,0 +1,80 @@
+import os
+from typing import Optional
+
+from flasgger import Swagger
+from flask import Flask, Response, current_app
+
+from core import config
+from utils.decorators import requires_basic_auth
+from utils.representations import dumps
+
+SPEC_ENDPOINT: str = "apispec_1"
+SWAGGER_TEMPLATE: dict = {
+    "swagger": "2.0",
+    "info": {
+        "title": "Auth service, Team 16",
+        "description": "Sprint 7",
+        "version": "1.0",
+    },
+    "securityDefinitions": {
+        "Bearer": {
+            "type": "apiKey",
+            "name": "Authorization",
+            "in": "header",
+            "description": 'JWT Authorization header using the Bearer scheme. Example: "Authorization: Bearer {'
+            'token}"',
+        }
+    },
+    "security": [{"Bearer": []}],
+    "consumes": [
+        "application/json",
+    ],
+    "produces": [
+        "application/json",
+    ],
+}
+
+_spec: Optional[bytes] = None
+
+
+def build_spec(flask_app: Flask) -> dict:
+    """the spec from the views' YAML docstrings, in an app context"""
+    return flask_app.swag.get_apispecs(endpoint=SPEC_ENDPOINT)
+
+
+def load_spec() -> bytes:
+    """OPENAPI_SPEC_PATH as written at build time by flask openapi; without
+    it the spec is built in memory once, nothing is written at runtime"""
+    global _spec
+    if _spec is None:
+        if os.path.exists(config.OPENAPI_SPEC_PATH):
+            with open(config.OPENAPI_SPEC_PATH, "rb") as file:
+                _spec = file.read()
+        else:
+            _spec = dumps(build_spec(flask_app=current_app))
+    return _spec
+
+
+@requires_basic_auth
+def spec_view() -> Response:
+    if current_app.debug:
+        # flasgger rebuilds the spec on every request in debug
+        return current_app.view_functions[f"flasgger.{SPEC_ENDPOINT}"]()
+    return Response(load_spec(), content_type="application/json")
+
+
+def setup_swagger(flask_app: Flask) -> None:
+    """Swagger UI at /apidocs/, the spec at /apispec_1.json.
+
+    All rules are registered here, at startup: url_map is never changed
+    while requests are matched against it. flasgger's views parse nothing
+    until the spec is built, and workers serve the spec as-is from
+    OPENAPI_SPEC_PATH, see load_spec.
+    """
+    # registered before flasgger's rule for the same URL, so this one matches
+    flask_app.add_url_rule(f"/{SPEC_ENDPOINT}.json", "openapi_spec", spec_view)
+    Swagger(
+        app=flask_app,
+        decorators=[requires_basic_auth],
+        template=SWAGGER_TEMPLATE,
+    )
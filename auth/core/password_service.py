@@ -0,0 +1,148 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from threading import BoundedSemaphore, Lock
+from typing import Callable, Optional
+
+from opentelemetry import trace
+from werkzeug.security import (
+    DEFAULT_PBKDF2_ITERATIONS,
+    check_password_hash,
+    generate_password_hash,
+)
+
+from core import config
+
+tracer = trace.get_tracer(__name__)
+
+
+def _timed_call(func: Callable, *args) -> tuple[float, object]:
+    """runs in the pool: returns start time to measure time spent in queue"""
+    return time.time(), func(*args)
+
+
+def normalize_method(method: str) -> str:
+    """pbkdf2:sha256 -> pbkdf2:sha256:260000, the prefix werkzeug writes"""
+    parts: list[str] = method.split(":")
+    if parts[0] == "pbkdf2" and len(parts) == 2:
+        parts.append(f"{DEFAULT_PBKDF2_ITERATIONS}")
+    return ":".join(parts)
+
+
+class PasswordHasher:
+    """Password hashing outside the gevent hub.
+
+    PBKDF2 is CPU-bound, so hash and verify run on a process pool created
+    lazily in every process (after fork). At most max_concurrency calls are
+    in flight, the others wait for a slot; the wait plus the time spent in
+    the pool queue is collected in stats as queue_time.
+    executor="inline" hashes in the calling greenlet.
+
+    hash_async and verify_async await the pool from an event loop (the ASGI
+    views); the pool's own queue bounds them, max_concurrency does not.
+    """
+
+    def __init__(
+        self,
+        executor: str,
+        max_workers: int,
+        max_concurrency: int,
+        method: str,
+        salt_length: int,
+    ):
+        self.executor: str = executor
+        self.max_workers: int = max_workers
+        self.method: str = normalize_method(method=method)
+        self.salt_length: int = salt_length
+        self.stats: dict[str, float] = {
+            "calls": 0,
+            "queue_time": 0.0,
+            "max_queue_time": 0.0,
+            "run_time": 0.0,
+        }
+        self._semaphore: BoundedSemaphore = BoundedSemaphore(max_concurrency)
+        self._pool: Optional[Executor] = None
+        self._pid: Optional[int] = None
+        self._lock: Lock = Lock()
+
+    def hash(self, password: str) -> str:
+        return self._run(
+            generate_password_hash, password, self.method, self.salt_length
+        )
+
+    def verify(self, pwhash: str, password: str) -> bool:
+        with tracer.start_as_current_span("password.verify"):
+            return self._run(check_password_hash, pwhash, password)
+
+    async def hash_async(self, password: str) -> str:
+        return await self._run_async(
+            generate_password_hash, password, self.method, self.salt_length
+        )
+
+    async def verify_async(self, pwhash: str, password: str) -> bool:
+        with tracer.start_as_current_span("password.verify"):
+            return await self._run_async(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash: str) -> bool:
+        """hash was made with another algorithm, cost or salt length"""
+        method, salt, _ = pwhash.split("$", 2)
+        return method != self.method or len(salt) != self.salt_length
+
+    def shutdown(self, wait: bool = True) -> None:
+        """stop this process' pool, its processes would outlive os._exit"""
+        with self._lock:
+            if self._pool is not None and self._pid == os.getpid():
+                self._pool.shutdown(wait=wait)
+            self._pool = None
+            self._pid = None
+
+    def _get_pool(self) -> Executor:
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("fork"),
+                    )
+                    self._pid = os.getpid()
+        return self._pool
+
+    def _run(self, func: Callable, *args):
+        if self.executor == "inline":
+            return func(*args)
+        queued_at: float = time.time()
+        with self._semaphore:
+            started_at, result = (
+                self._get_pool().submit(_timed_call, func, *args).result()
+            )
+        self._record(queued_at=queued_at, started_at=started_at)
+        return result
+
+    async def _run_async(self, func: Callable, *args):
+        if self.executor == "inline":
+            return func(*args)
+        queued_at: float = time.time()
+        started_at, result = await asyncio.wrap_future(
+            self._get_pool().submit(_timed_call, func, *args)
+        )
+        self._record(queued_at=queued_at, started_at=started_at)
+        return result
+
+    def _record(self, queued_at: float, started_at: float) -> None:
+        queue_time: float = started_at - queued_at
+        trace.get_current_span().set_attribute("password.queue_time", queue_time)
+        self.stats["calls"] += 1
+        self.stats["queue_time"] += queue_time
+        self.stats["max_queue_time"] = max(self.stats["max_queue_time"], queue_time)
+        self.stats["run_time"] += time.time() - started_at
+
+
+password_hasher: PasswordHasher = PasswordHasher(
+    executor=config.PASSWORD_HASH_EXECUTOR,
+    max_workers=config.PASSWORD_HASH_WORKERS,
+    max_concurrency=config.PASSWORD_HASH_MAX_CONCURRENCY,
+    method=config.PASSWORD_HASH_METHOD,
+    salt_length=config.PASSWORD_HASH_SALT_LENGTH,
+)
@@ -1,10 +1,10 @@
 import http
 from functools import wraps
 
-from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from flask_jwt_extended import verify_jwt_in_request
 
 from core import config
-from models import Role, UserRole
+from core.role_service import get_current_user_roles
 from utils import constants
 
 
@@ -13,13 +13,7 @@ def is_admin_permissions():
         @wraps(func)
         def decorator(*args, **kwargs):
             verify_jwt_in_request()
-            user_id: str = get_jwt_identity()
-            roles: list[str] = [
-                i.name
-                for i in Role.query.join(UserRole)
-                .filter(UserRole.user_id == user_id)
-                .all()
-            ]
+            roles: list[str] = get_current_user_roles()
             if constants.ROLE_FOR_ADMIN in roles or config.TESTING:
                 return func(*args, **kwargs)
             else:
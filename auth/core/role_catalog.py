@@ -0,0 +1,73 @@
+import uuid
+from typing import Callable, Union
+
+from flask import Response, request
+
+from core import config
+from db import cache
+from utils.local_cache import TTLCache
+from utils.representations import dumps
+
+VERSION_KEY: str = "RoleCatalog::version"
+
+local_catalog: TTLCache = TTLCache(
+    max_size=config.ROLE_CATALOG_LOCAL_MAX_SIZE, ttl=config.ROLE_CATALOG_TTL
+)
+
+
+def catalog_key(version: str, name: str) -> str:
+    return f"RoleCatalog::{version}:{name}"
+
+
+def get_catalog_version() -> str:
+    """current version token, a new one if Redis lost it"""
+    version = cache.get(key=VERSION_KEY)
+    if version is None:
+        pipe = cache.pipeline()
+        pipe.set(VERSION_KEY, uuid.uuid4().hex, ex=config.ROLE_CATALOG_TTL, nx=True)
+        pipe.get(VERSION_KEY)
+        _, version = pipe.execute()
+    return version
+
+
+def bump_catalog_version() -> None:
+    """call after the commit which changed role rows"""
+    cache.set(key=VERSION_KEY, value=uuid.uuid4().hex, expire=config.ROLE_CATALOG_TTL)
+
+
+def get_catalog_body(
+    version: str, name: str, render: Callable[[], dict]
+) -> Union[bytes, str]:
+    """serialized response envelope: in-process -> Redis -> render()"""
+    key: str = catalog_key(version=version, name=name)
+    body = local_catalog.get(key)
+    if body is not None:
+        return body
+    body = cache.get(key=key)
+    if body is None:
+        body = dumps({"success": True, "data": [render()]})
+        cache.set(key=key, value=body, expire=config.ROLE_CATALOG_TTL)
+    local_catalog.set(key, body)
+    return body
+
+
+def catalog_response(name: str, render: Callable[[], dict]) -> Response:
+    """Conditional GET of a role catalog entry.
+
+    Bodies are cached under the catalog version, which is replaced on every
+    role change, so they are never invalidated one by one. A known version
+    costs one Redis lookup; a matching If-None-Match is answered with 304.
+    """
+    version: str = get_catalog_version()
+    etag: str = f"{version}-{name}"
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(
+            get_catalog_body(version=version, name=name, render=render),
+            mimetype="application/json",
+        )
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = config.ROLE_CATALOG_MAX_AGE
+    return response
@@ -0,0 +1,215 @@
+import json
+from typing import Optional
+
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from sqlalchemy import select
+
+from core import config
+from db import async_clients, blocklist, cache, db
+from db.redis import hash_tag
+from models import Role, UserRole
+from utils.local_cache import TTLCache
+
+# other workers' local layer keeps roles up to ROLE_CACHE_LOCAL_TTL seconds
+# after an invalidation, only the invalidating worker drops them at once
+local_roles: TTLCache = TTLCache(
+    max_size=config.ROLE_CACHE_LOCAL_MAX_SIZE, ttl=config.ROLE_CACHE_LOCAL_TTL
+)
+
+# KEYS = roles, version; ARGV = roles json, version read before loading the
+# roles, ttl. An invalidation in between bumped the version: the loaded
+# roles may predate it and are not cached.
+SET_IF_VERSION_SCRIPT: str = """
+if (redis.call("GET", KEYS[2]) or "0") ~= ARGV[2] then
+    return 0
+end
+redis.call("SET", KEYS[1], ARGV[1], "EX", ARGV[3])
+return 1
+"""
+set_if_version = cache.register_script(SET_IF_VERSION_SCRIPT)
+
+
+def user_roles_key(user_id: str) -> str:
+    return f"UserRoles::{hash_tag(user_id)}"
+
+
+def user_roles_version_key(user_id: str) -> str:
+    return f"UserRolesVersion::{hash_tag(user_id)}"
+
+
+def get_roles_versions(user_ids: list[str]) -> dict[str, str]:
+    """versions to read before loading roles, see cache_user_roles"""
+    pipe = cache.pipeline()
+    for user_id in user_ids:
+        pipe.get(user_roles_version_key(user_id=user_id))
+    return {
+        f"{user_id}": version or "0"
+        for user_id, version in zip(user_ids, pipe.execute())
+    }
+
+
+async def get_roles_versions_async(user_ids: list[str]) -> dict[str, str]:
+    pipe = async_clients.pipeline()
+    for user_id in user_ids:
+        pipe.get(user_roles_version_key(user_id=user_id))
+    return {
+        f"{user_id}": version or "0"
+        for user_id, version in zip(user_ids, await pipe.execute())
+    }
+
+
+def load_user_roles(user_id: str) -> list[str]:
+    """user's role names in one query"""
+    return [
+        name
+        for name, in db.session.query(Role.name)
+        .join(UserRole)
+        .filter(UserRole.user_id == user_id)
+    ]
+
+
+def users_roles_query(user_ids: list[str]):
+    return (
+        select(UserRole.user_id, Role.name)
+        .join(Role)
+        .where(UserRole.user_id.in_(user_ids))
+    )
+
+
+def group_users_roles(user_ids: list[str], rows) -> dict[str, list[str]]:
+    roles: dict[str, list[str]] = {f"{user_id}": [] for user_id in user_ids}
+    for user_id, name in rows:
+        roles[f"{user_id}"].append(name)
+    return roles
+
+
+def load_users_roles(user_ids: list[str]) -> dict[str, list[str]]:
+    """role names of many users in one query"""
+    return group_users_roles(
+        user_ids=user_ids,
+        rows=db.session.execute(users_roles_query(user_ids=user_ids)),
+    )
+
+
+async def load_users_roles_async(user_ids: list[str]) -> dict[str, list[str]]:
+    async with async_clients.engine.connect() as connection:
+        rows = await connection.execute(users_roles_query(user_ids=user_ids))
+    return group_users_roles(user_ids=user_ids, rows=rows)
+
+
+def set_if_version_call(user_id: str, roles: list[str], version: str) -> dict:
+    """keys and args of set_if_version for the user's loaded roles"""
+    return {
+        "keys": [
+            user_roles_key(user_id=user_id),
+            user_roles_version_key(user_id=user_id),
+        ],
+        "args": [json.dumps(roles), version, config.ROLE_CACHE_TTL],
+    }
+
+
+def cache_user_roles(user_id: str, roles: list[str], version: str, pipe) -> None:
+    """put freshly loaded roles to both cache layers through pipe (a
+    pipeline or the client), the Redis write is skipped when the roles were
+    invalidated since version was read
+    """
+    set_if_version(
+        **set_if_version_call(user_id=user_id, roles=roles, version=version),
+        client=pipe,
+    )
+    local_roles.set(f"{user_id}", roles)
+
+
+async def cache_user_roles_async(
+    user_id: str, roles: list[str], version: str, pipe
+) -> None:
+    """cache_user_roles through an asyncio pipeline or client"""
+    await async_clients.script(set_if_version)(
+        **set_if_version_call(user_id=user_id, roles=roles, version=version),
+        client=pipe,
+    )
+    local_roles.set(f"{user_id}", roles)
+
+
+def get_user_roles(user_id: str, local: bool = True) -> list[str]:
+    """user's role names: in-process TTL layer (unless local is False) ->
+    Redis -> Postgres"""
+    user_id: str = f"{user_id}"
+    roles: Optional[list[str]] = local_roles.get(user_id) if local else None
+    if roles is not None:
+        return roles
+    pipe = cache.pipeline()
+    pipe.get(user_roles_key(user_id=user_id))
+    pipe.get(user_roles_version_key(user_id=user_id))
+    cached, version = pipe.execute()
+    if cached is not None:
+        roles = json.loads(cached)
+    else:
+        roles = load_user_roles(user_id=user_id)
+        cache_user_roles(
+            user_id=user_id, roles=roles, version=version or "0", pipe=cache.cache
+        )
+    local_roles.set(user_id, roles)
+    return roles
+
+
+async def get_user_roles_async(user_id: str, local: bool = True) -> list[str]:
+    """get_user_roles on the asyncio clients"""
+    user_id: str = f"{user_id}"
+    roles: Optional[list[str]] = local_roles.get(user_id) if local else None
+    if roles is not None:
+        return roles
+    pipe = async_clients.pipeline()
+    pipe.get(user_roles_key(user_id=user_id))
+    pipe.get(user_roles_version_key(user_id=user_id))
+    cached, version = await pipe.execute()
+    if cached is not None:
+        roles = json.loads(cached)
+    else:
+        roles = (await load_users_roles_async(user_ids=[user_id]))[user_id]
+        await cache_user_roles_async(
+            user_id=user_id,
+            roles=roles,
+            version=version or "0",
+            pipe=async_clients.redis_client,
+        )
+    local_roles.set(user_id, roles)
+    return roles
+
+
+def get_current_user_roles() -> list[str]:
+    """roles of the request's user, JWT has to be verified before"""
+    if config.ROLE_RESOLVER == "claims":
+        roles: Optional[list[str]] = get_jwt().get("roles")
+        if roles is not None:
+            return roles
+    return get_user_roles(user_id=get_jwt_identity())
+
+
+def invalidate_user_roles(*user_ids: str) -> None:
+    """call after the commit which changed user_role rows: bumps the users'
+    versions, so roles loaded before the commit are not cached after it.
+    With ROLE_RESOLVER=claims the users' access tokens carry the old roles
+    and are revoked, a refresh signs the new ones.
+    """
+    if config.ROLE_RESOLVER == "claims":
+        blocklist.revoke_users(
+            user_ids=user_ids, expire=config.JWT_ACCESS_TOKEN_EXPIRES
+        )
+    pipe = cache.pipeline()
+    for user_id in user_ids:
+        local_roles.pop(f"{user_id}")
+        pipe.incr(user_roles_version_key(user_id=user_id))
+        pipe.expire(user_roles_version_key(user_id=user_id), config.ROLE_CACHE_TTL)
+        pipe.delete(user_roles_key(user_id=user_id))
+    pipe.execute()
+
+
+def get_role_user_ids(role_id: str) -> list[str]:
+    """users whose cached roles depend on the role"""
+    return [
+        f"{user_id}"
+        for user_id, in db.session.query(UserRole.user_id).filter(
+            UserRole.role_id == role_id
+        )
+    ]
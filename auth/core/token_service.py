@@ -0,0 +1,102 @@
+import time
+import uuid
+from typing import Iterable, Optional
+
+from flask_jwt_extended import create_access_token, create_refresh_token
+from opentelemetry import trace
+
+from core import config
+from core.metrics import TOKEN_SIGN_SECONDS, TOKENS_ISSUED
+from core.role_service import (
+    cache_user_roles,
+    cache_user_roles_async,
+    get_roles_versions,
+    get_roles_versions_async,
+    load_users_roles,
+    load_users_roles_async,
+)
+from db import async_clients, cache, sessions
+
+tracer = trace.get_tracer(__name__)
+
+
+def new_jti() -> str:
+    return f"{uuid.uuid4()}"
+
+
+def sign_tokens(
+    user_id: str, roles: list[str], roles_at: float
+) -> tuple[dict[str, str], str]:
+    """access and refresh tokens and the refresh token's jti, chosen up front;
+    roles_at: when the roles were read, see TokenBlocklist.revoke_users"""
+    jti: str = new_jti()
+    with tracer.start_as_current_span("token.sign"), TOKEN_SIGN_SECONDS.time():
+        access_token: str = create_access_token(
+            identity=user_id, additional_claims={"roles": roles, "roles_at": roles_at}
+        )
+        refresh_token: str = create_refresh_token(
+            identity=user_id, additional_claims={"roles": roles, "jti": jti}
+        )
+    TOKENS_ISSUED.inc()
+    return {"access_token": access_token, "refresh_token": refresh_token}, jti
+
+
+def issue_tokens_batch(
+    user_ids: Iterable[str], device: Optional[dict] = None
+) -> dict[str, dict[str, str]]:
+    """Tokens for many users (imports, load tests): user id -> tokens.
+
+    Roles of all users are loaded in one query, after their cache versions
+    are read; refresh token sessions are registered and the loaded roles are
+    cached in one Redis pipeline.
+    """
+    user_ids: list[str] = [f"{user_id}" for user_id in user_ids]
+    roles_at: float = time.time()
+    versions: dict[str, str] = get_roles_versions(user_ids=user_ids)
+    roles: dict[str, list[str]] = load_users_roles(user_ids=user_ids)
+    tokens: dict[str, dict[str, str]] = {}
+    pipe = cache.pipeline()
+    for user_id in user_ids:
+        tokens[user_id], jti = sign_tokens(
+            user_id=user_id, roles=roles[user_id], roles_at=roles_at
+        )
+        sessions.register(
+            user_id=user_id,
+            jti=jti,
+            expire=config.JWT_REFRESH_TOKEN_EXPIRES,
+            device=device,
+            pipe=pipe,
+        )
+        cache_user_roles(
+            user_id=user_id, roles=roles[user_id], version=versions[user_id], pipe=pipe
+        )
+    pipe.execute()
+    return tokens
+
+
+def issue_tokens(user_id: str, device: Optional[dict] = None) -> dict[str, str]:
+    return issue_tokens_batch(user_ids=[user_id], device=device)[f"{user_id}"]
+
+
+async def issue_tokens_async(
+    user_id: str, device: Optional[dict] = None
+) -> dict[str, str]:
+    """issue_tokens on the asyncio clients, in an app context"""
+    user_id: str = f"{user_id}"
+    roles_at: float = time.time()
+    versions: dict[str, str] = await get_roles_versions_async(user_ids=[user_id])
+    roles: list[str] = (await load_users_roles_async(user_ids=[user_id]))[user_id]
+    tokens, jti = sign_tokens(user_id=user_id, roles=roles, roles_at=roles_at)
+    pipe = async_clients.pipeline()
+    await sessions.register_async(
+        user_id=user_id,
+        jti=jti,
+        expire=config.JWT_REFRESH_TOKEN_EXPIRES,
+        device=device,
+        pipe=pipe,
+    )
+    await cache_user_roles_async(
+        user_id=user_id, roles=roles, version=versions[user_id], pipe=pipe
+    )
+    await pipe.execute()
+    return tokens
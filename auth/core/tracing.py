@@ -0,0 +1,67 @@
+import os
+
+from flask import Flask
+from opentelemetry import trace
+from opentelemetry.sdk.resources import SERVICE_NAME, Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    ConsoleSpanExporter,
+    SpanExporter,
+)
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+from core import config
+
+
+def create_exporter(name: str) -> SpanExporter:
+    if name == "console":
+        return ConsoleSpanExporter()
+    if name == "file":
+        return ConsoleSpanExporter(
+            out=open(config.TRACING_FILE_PATH, "a"),
+            formatter=lambda span: span.to_json(indent=None) + os.linesep,
+        )
+    if name == "otlp":
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import (
+            OTLPSpanExporter,
+        )
+
+        return OTLPSpanExporter(
+            endpoint=config.TRACING_OTLP_ENDPOINT,
+            insecure=config.TRACING_OTLP_INSECURE,
+        )
+    raise ValueError(f"Unknown TRACING_EXPORTER {name}")
+
+
+def setup_tracing(flask_app: Flask) -> None:
+    """Tracer provider from the environment, TRACING_EXPORTER=none disables.
+
+    With no provider installed spans (the manual ones included) are no-op
+    and the app is not instrumented. Otherwise a trace is sampled when its
+    parent was, root traces with TRACING_SAMPLE_RATIO; spans are exported by
+    a background thread from a bounded queue, overflowing spans are dropped.
+    """
+    if config.TRACING_EXPORTER == "none":
+        return
+    from opentelemetry.instrumentation.flask import FlaskInstrumentor
+    from opentelemetry.instrumentation.requests import RequestsInstrumentor
+
+    provider = TracerProvider(
+        resource=Resource.create({SERVICE_NAME: config.TRACING_SERVICE_NAME}),
+        sampler=ParentBased(root=TraceIdRatioBased(config.TRACING_SAMPLE_RATIO)),
+    )
+    provider.add_span_processor(
+        BatchSpanProcessor(
+            create_exporter(name=config.TRACING_EXPORTER),
+            max_queue_size=config.TRACING_MAX_QUEUE_SIZE,
+            max_export_batch_size=config.TRACING_MAX_EXPORT_BATCH_SIZE,
+            schedule_delay_millis=config.TRACING_SCHEDULE_DELAY_MILLIS,
+            export_timeout_millis=config.TRACING_EXPORT_TIMEOUT_MILLIS,
+        )
+    )
+    trace.set_tracer_provider(provider)
+    FlaskInstrumentor().instrument_app(
+        flask_app, excluded_urls=config.TRACING_EXCLUDED_URLS
+    )
+    RequestsInstrumentor().instrument()
@@ -0,0 +1,259 @@
+import csv
+import io
+import json
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, Optional
+
+from werkzeug.exceptions import HTTPException
+from werkzeug.security import generate_password_hash
+
+from core.password_service import password_hasher
+from db import db
+from utils import constants
+from utils.validators import email_validation, username_validation
+
+USER_COLUMNS: tuple[str, ...] = ("id", "username", "email", "password")
+
+# staging tables live for the session and are emptied by every commit
+CREATE_STAGING: str = """
+SET statement_timeout = 0;
+CREATE TEMP TABLE IF NOT EXISTS import_user (
+    id uuid, username text, email text, password text
+) ON COMMIT DELETE ROWS;
+CREATE TEMP TABLE IF NOT EXISTS import_user_role (
+    id uuid, user_id uuid, role_name text
+) ON COMMIT DELETE ROWS;
+"""
+
+INSERT_USERS: str = """
+INSERT INTO "user" (id, created_at, updated_at, username, email, password)
+SELECT id, now(), now(), username, email, password FROM import_user
+ON CONFLICT DO NOTHING
+"""
+
+# users skipped as duplicates are not in "user", so their roles are skipped too
+INSERT_USER_ROLES: str = """
+INSERT INTO user_role (id, created_at, updated_at, user_id, role_id)
+SELECT import_user_role.id, now(), now(), import_user_role.user_id, role.id
+FROM import_user_role
+JOIN "user" ON "user".id = import_user_role.user_id
+JOIN role ON role.name = import_user_role.role_name
+ON CONFLICT DO NOTHING
+"""
+
+
+@dataclass
+class ImportReport:
+    read: int = 0
+    imported: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    batches: int = 0
+    hash_time: float = 0.0
+    load_time: float = 0.0
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def __str__(self) -> str:
+        rate: float = self.read / self.elapsed if self.elapsed else 0.0
+        return (
+            f"read {self.read}, imported {self.imported}, "
+            f"duplicates {self.duplicates}, invalid {self.invalid} "
+            f"in {self.elapsed:.1f}s ({rate:.0f} users/s; "
+            f"waited for hashing {self.hash_time:.1f}s, loading {self.load_time:.1f}s)"
+        )
+
+
+def read_records(path: str, file_format: Optional[str] = None) -> Iterator[dict]:
+    """stream users of a CSV (with a header) or JSONL file"""
+    file_format = file_format or ("jsonl" if path.endswith(".jsonl") else "csv")
+    with open(path, newline="", encoding="utf-8") as file:
+        if file_format == "jsonl":
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(file)
+
+
+def parse_roles(roles) -> list[str]:
+    """roles: a list (JSONL) or ';'-separated names (CSV)"""
+    if isinstance(roles, str):
+        roles = roles.split(";")
+    return [role.strip() for role in roles or [] if role and role.strip()]
+
+
+def validate_record(record: dict) -> Optional[dict]:
+    """user row for the record or None; password policy is not applied to
+    imported passwords, password_hash takes a werkzeug hash as is"""
+    try:
+        username: str = username_validation(value=record.get("username") or "")
+        email: str = email_validation(value=record.get("email") or "")
+    except HTTPException:
+        return None
+    if not (record.get("password") or record.get("password_hash")):
+        return None
+    return {
+        "id": uuid.uuid4(),
+        "username": username,
+        "email": email,
+        "password": record.get("password"),
+        "password_hash": record.get("password_hash"),
+        "roles": [constants.DEFAULT_ROLE_FOR_ALL_USERS]
+        + parse_roles(record.get("roles")),
+    }
+
+
+def hash_passwords(passwords: list[str], method: str, salt_length: int) -> list[str]:
+    """runs in a worker process"""
+    return [
+        generate_password_hash(password, method=method, salt_length=salt_length)
+        for password in passwords
+    ]
+
+
+def batched(records: Iterable[dict], size: int) -> Iterator[list[dict]]:
+    batch: list[dict] = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def to_csv(rows: Iterable[tuple]) -> io.StringIO:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    return buffer
+
+
+class UserImporter:
+    """Bulk import of users with their roles.
+
+    Records are validated and read in batches. Passwords of the next batch
+    are hashed in worker processes while the current batch is loaded: rows
+    are copied (COPY) into temporary staging tables and moved with one
+    INSERT ... ON CONFLICT DO NOTHING per table, then committed. Users whose
+    username, email or id already exist are counted as duplicates. After
+    every commit the number of consumed records is written to the
+    checkpoint file; a rerun skips them. Reloading a batch is harmless, as
+    its users already exist.
+    """
+
+    def __init__(self, batch_size: int, workers: int, checkpoint_path: str):
+        self.batch_size: int = batch_size
+        self.workers: int = workers
+        self.checkpoint_path: str = checkpoint_path
+        self.report: ImportReport = ImportReport()
+
+    def read_checkpoint(self) -> int:
+        if not os.path.exists(self.checkpoint_path):
+            return 0
+        with open(self.checkpoint_path) as file:
+            return json.load(file).get("offset", 0)
+
+    def write_checkpoint(self, offset: int) -> None:
+        tmp_path: str = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump({"offset": offset, "updated_at": time.time()}, file)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def run(self, records: Iterable[dict], progress=None) -> ImportReport:
+        offset: int = self.read_checkpoint()
+        records = iter(records)
+        for _ in range(offset):
+            next(records, None)
+        connection = db.engine.raw_connection()
+        pool = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("fork")
+        )
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(CREATE_STAGING)
+            connection.commit()
+            pending: Optional[tuple[list[dict], int, list[Future]]] = None
+            for batch in batched(records=records, size=self.batch_size):
+                offset += len(batch)
+                self.report.read += len(batch)
+                rows: list[dict] = []
+                for record in batch:
+                    row: Optional[dict] = validate_record(record=record)
+                    if row is None:
+                        self.report.invalid += 1
+                    else:
+                        rows.append(row)
+                current = (rows, offset, self.hash_async(pool=pool, rows=rows))
+                if pending:
+                    self.load(connection=connection, pending=pending)
+                    if progress:
+                        progress(self.report)
+                pending = current
+            if pending:
+                self.load(connection=connection, pending=pending)
+        finally:
+            pool.shutdown(cancel_futures=True)
+            # the session has staging tables, do not return it to the pool
+            connection.detach()
+            connection.close()
+        return self.report
+
+    def hash_async(self, pool: ProcessPoolExecutor, rows: list[dict]) -> list[Future]:
+        passwords: list[str] = [
+            row["password"] for row in rows if not row["password_hash"]
+        ]
+        chunk_size: int = max(1, -(-len(passwords) // self.workers))
+        return [
+            pool.submit(
+                hash_passwords,
+                passwords[start : start + chunk_size],
+                password_hasher.method,
+                password_hasher.salt_length,
+            )
+            for start in range(0, len(passwords), chunk_size)
+        ]
+
+    def load(self, connection, pending: tuple[list[dict], int, list[Future]]) -> None:
+        rows, offset, futures = pending
+        started_at: float = time.monotonic()
+        hashes: Iterator[str] = iter(
+            [password for future in futures for password in future.result()]
+        )
+        for row in rows:
+            row["password"] = row["password_hash"] or next(hashes)
+        loading_at: float = time.monotonic()
+        self.report.hash_time += loading_at - started_at
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY import_user ({', '.join(USER_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                to_csv(rows=([row[name] for name in USER_COLUMNS] for row in rows)),
+            )
+            cursor.copy_expert(
+                "COPY import_user_role (id, user_id, role_name) FROM STDIN WITH (FORMAT csv)",
+                to_csv(
+                    rows=(
+                        (uuid.uuid4(), row["id"], role)
+                        for row in rows
+                        for role in dict.fromkeys(row["roles"])
+                    )
+                ),
+            )
+            cursor.execute(INSERT_USERS)
+            imported: int = cursor.rowcount
+            cursor.execute(INSERT_USER_ROLES)
+        connection.commit()
+        self.write_checkpoint(offset=offset)
+        self.report.imported += imported
+        self.report.duplicates += len(rows) - imported
+        self.report.batches += 1
+        self.report.load_time += time.monotonic() - loading_at
@@ -1,3 +1,6 @@
 from .postgres import psql_db as db
 from .postgres import psql_db_url as db_url
+from .postgres import serving_connect_args
 from .redis import redis_cache as cache
+from .blocklist import token_blocklist as blocklist
+from .session_registry import session_registry as sessions
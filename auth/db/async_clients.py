@@ -0,0 +1,71 @@
+"""redis.asyncio and SQLAlchemy asyncio (asyncpg) clients of the ASGI views.
+
+Their pools are bound to the event loop that uses them first, so they are
+opened by connect() in the running loop on the ASGI startup (asgi.py) and
+closed by close() on its shutdown.
+"""
+
+from typing import Optional, Union
+
+from redis.asyncio import Redis as AsyncRedis
+from redis.asyncio.cluster import RedisCluster as AsyncRedisCluster
+from redis.commands.core import AsyncScript
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from core.metrics import timed_async
+from db.postgres import async_engine_options, async_psql_db_url
+from db.redis import (
+    AsyncClusterPipeline,
+    AsyncClusterScript,
+    create_async_redis_client,
+)
+
+redis_client: Optional[Union[AsyncRedis, AsyncRedisCluster]] = None
+engine: Optional[AsyncEngine] = None
+_scripts: dict[str, Union[AsyncScript, AsyncClusterScript]] = {}
+
+
+async def connect() -> None:
+    global redis_client, engine
+    redis_client = create_async_redis_client()
+    engine = create_async_engine(async_psql_db_url, **async_engine_options)
+
+
+async def close() -> None:
+    global redis_client, engine
+    if redis_client is not None:
+        await redis_client.close()
+        if not isinstance(redis_client, AsyncRedisCluster):
+            await redis_client.connection_pool.disconnect()
+    if engine is not None:
+        await engine.dispose()
+    redis_client, engine = None, None
+    _scripts.clear()
+
+
+def pipeline():
+    """transactional pipeline (ClusterPipeline on a cluster), timed as one
+    round trip"""
+    if isinstance(redis_client, AsyncRedisCluster):
+        pipe = AsyncClusterPipeline(client=redis_client, scripts=_scripts)
+    else:
+        pipe = redis_client.pipeline()
+    pipe.execute = timed_async(backend="redis", func=pipe.execute)
+    return pipe
+
+
+def script(sync_script) -> Union[AsyncScript, AsyncClusterScript]:
+    """the Lua script of a (sync) registered Script on the asyncio client:
+    both modes run the same scripts on the same keys"""
+    registered: Optional[Union[AsyncScript, AsyncClusterScript]] = _scripts.get(
+        sync_script.sha
+    )
+    if registered is None:
+        if isinstance(redis_client, AsyncRedisCluster):
+            registered = AsyncClusterScript(
+                client=redis_client, script=sync_script.script, sha=sync_script.sha
+            )
+        else:
+            registered = redis_client.register_script(sync_script.script)
+        _scripts[sync_script.sha] = registered
+    return registered
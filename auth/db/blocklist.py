@@ -0,0 +1,195 @@
+import json
+import logging
+import os
+import time
+from datetime import timedelta
+from threading import Thread
+from typing import Iterable, Optional, Union
+
+from opentelemetry import trace
+
+from core import config
+from core.metrics import BLOCKLIST_CHECKS
+from db.cache import AbstractCache
+from db.redis import redis_cache
+from utils.bloom import BloomFilter
+
+logger = logging.getLogger(__name__)
+tracer = trace.get_tracer(__name__)
+
+
+class TokenBlocklist:
+    """Revoked access tokens with an in-process Bloom filter in front of Redis.
+
+    Revoked jti are kept as keys (as before) and in a sorted set scored by
+    expiry, and announced on a pub/sub channel. Every process keeps a Bloom
+    filter of live revoked jti: rebuilt from the sorted set every
+    refresh_interval seconds and updated from the channel in between. A jti
+    missing from the filter is not revoked, so the common case costs no
+    Redis round trip; possible positives are confirmed in Redis. Until the
+    filter is loaded, or when it is stale, every check goes to Redis.
+
+    Users whose role claims changed, who changed their password or logged
+    out everywhere have the access tokens with roles read until then
+    (roles_at claim, else iat) revoked: user id -> time in a sorted set,
+    kept in every process next to the filter the same way.
+    """
+
+    revoked_key: str = "RevokedAccess"
+    channel: str = "RevokedAccess"
+    revoked_users_key: str = "RevokedUserTokens"
+    users_channel: str = "RevokedUserTokens"
+
+    def __init__(
+        self,
+        cache: AbstractCache,
+        enabled: bool,
+        capacity: int,
+        error_rate: float,
+        refresh_interval: float,
+    ):
+        self.cache: AbstractCache = cache
+        self.enabled: bool = enabled
+        self.capacity: int = capacity
+        self.error_rate: float = error_rate
+        self.refresh_interval: float = refresh_interval
+        self._filter: Optional[BloomFilter] = None
+        self._revoked_users: dict[str, float] = {}
+        self._loaded_at: float = 0
+        self._pid: Optional[int] = None
+
+    def revoke(self, jti: str, user_id: str, expire: Union[int, timedelta]) -> None:
+        ttl: int = int(
+            expire.total_seconds() if isinstance(expire, timedelta) else expire
+        )
+        now: int = int(time.time())
+        pipe = self.cache.pipeline()
+        pipe.setex(name=jti, time=ttl, value=f"{user_id}")
+        pipe.zadd(self.revoked_key, {jti: now + ttl})
+        pipe.zremrangebyscore(self.revoked_key, "-inf", now)
+        pipe.publish(self.channel, jti)
+        pipe.execute()
+        if self._filter is not None:
+            self._filter.add(jti)
+
+    def revoke_users(
+        self, user_ids: Iterable[str], expire: Union[int, timedelta]
+    ) -> None:
+        """revoke the users' access tokens issued (roles read) until now,
+        expire is the access token lifetime"""
+        user_ids: list[str] = [f"{user_id}" for user_id in user_ids]
+        if not user_ids:
+            return
+        ttl: int = int(
+            expire.total_seconds() if isinstance(expire, timedelta) else expire
+        )
+        now: float = time.time()
+        pipe = self.cache.pipeline()
+        pipe.zadd(self.revoked_users_key, dict.fromkeys(user_ids, now))
+        pipe.zremrangebyscore(self.revoked_users_key, "-inf", now - ttl)
+        pipe.publish(
+            self.users_channel, json.dumps({"revoked_at": now, "user_ids": user_ids})
+        )
+        pipe.execute()
+        self._revoked_users.update(dict.fromkeys(user_ids, now))
+
+    def is_revoked(
+        self, jti: str, user_id: Optional[str] = None, roles_at: Optional[float] = None
+    ) -> bool:
+        with tracer.start_as_current_span("blocklist.check") as span:
+            if self.enabled:
+                self._ensure_worker()
+                if self._is_fresh():
+                    if self._roles_before(
+                        roles_at=roles_at,
+                        revoked_at=self._revoked_users.get(f"{user_id}"),
+                    ):
+                        span.set_attribute("blocklist.redis", False)
+                        BLOCKLIST_CHECKS.labels(source="filter", revoked="true").inc()
+                        return True
+                    if jti not in self._filter:
+                        span.set_attribute("blocklist.redis", False)
+                        BLOCKLIST_CHECKS.labels(source="filter", revoked="false").inc()
+                        return False
+            span.set_attribute("blocklist.redis", True)
+            pipe = self.cache.pipeline()
+            pipe.get(jti)
+            pipe.zscore(self.revoked_users_key, f"{user_id}")
+            revoked_jti, revoked_at = pipe.execute()
+            revoked: bool = bool(revoked_jti) or self._roles_before(
+                roles_at=roles_at, revoked_at=revoked_at
+            )
+            BLOCKLIST_CHECKS.labels(source="redis", revoked=f"{revoked}".lower()).inc()
+            return revoked
+
+    @staticmethod
+    def _roles_before(roles_at: Optional[float], revoked_at: Optional[float]) -> bool:
+        return (
+            roles_at is not None and revoked_at is not None and roles_at <= revoked_at
+        )
+
+    def _is_fresh(self) -> bool:
+        return (
+            self._filter is not None
+            and time.monotonic() - self._loaded_at < 2 * self.refresh_interval
+        )
+
+    def _ensure_worker(self) -> None:
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._filter = None
+        Thread(target=self._run, name="token-blocklist", daemon=True).start()
+
+    def _reload(self) -> None:
+        pipe = self.cache.pipeline()
+        pipe.zrangebyscore(self.revoked_key, int(time.time()), "+inf")
+        pipe.zrange(self.revoked_users_key, 0, -1, withscores=True)
+        jtis, revoked_users = pipe.execute()
+        bloom_filter = BloomFilter(
+            capacity=max(self.capacity, 2 * len(jtis)), error_rate=self.error_rate
+        )
+        for jti in jtis:
+            bloom_filter.add(jti)
+        self._filter = bloom_filter
+        self._revoked_users = dict(revoked_users)
+        self._loaded_at = time.monotonic()
+
+    def _run(self) -> None:
+        while True:
+            pubsub = self.cache.pubsub()
+            try:
+                # subscribe before loading, updates in between are not lost
+                pubsub.subscribe(self.channel, self.users_channel)
+                self._reload()
+                while True:
+                    message = pubsub.get_message(
+                        ignore_subscribe_messages=True, timeout=self.refresh_interval
+                    )
+                    if message and self._filter is not None:
+                        if message.get("channel") == self.users_channel:
+                            revoked: dict = json.loads(message.get("data"))
+                            self._revoked_users.update(
+                                dict.fromkeys(
+                                    revoked["user_ids"], revoked["revoked_at"]
+                                )
+                            )
+                        else:
+                            self._filter.add(message.get("data"))
+                    if time.monotonic() - self._loaded_at >= self.refresh_interval:
+                        self._reload()
+            except Exception:
+                self._filter = None
+                logger.exception("Token blocklist filter is disabled, retrying")
+                time.sleep(self.refresh_interval)
+            finally:
+                pubsub.close()
+
+
+token_blocklist: TokenBlocklist = TokenBlocklist(
+    cache=redis_cache,
+    enabled=config.BLOCKLIST_FILTER_ENABLED,
+    capacity=config.BLOCKLIST_FILTER_CAPACITY,
+    error_rate=config.BLOCKLIST_FILTER_ERROR_RATE,
+    refresh_interval=config.BLOCKLIST_FILTER_REFRESH_INTERVAL,
+)
@@ -10,6 +10,14 @@ class AbstractCache(ABC):
     def get(self, key: str, **kwargs):
         pass
 
+    @abstractmethod
+    def set(self, key: str, value: Union[bytes, str], expire: int):
+        pass
+
+    @abstractmethod
+    def delete(self, *keys: str):
+        pass
+
     @abstractmethod
     def add_token(self, key: str, expire: int, value: Union[bytes, str]):
         pass
@@ -37,3 +45,11 @@ class AbstractCache(ABC):
     @abstractmethod
     def pipeline(self, **kwargs):
         pass
+
+    @abstractmethod
+    def pubsub(self, **kwargs):
+        pass
+
+    @abstractmethod
+    def register_script(self, script: str):
+        pass
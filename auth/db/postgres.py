@@ -1,9 +1,13 @@
 import os
+import time
 
 from dotenv import load_dotenv
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 from core import config
+from core.metrics import DB_POOL_TIMEOUTS, DB_POOL_WAIT_SECONDS
 
 load_dotenv()
 
@@ -12,6 +16,66 @@ DB_PASS: str = os.getenv("DB_PASS")
 DB_HOST: str = os.getenv("DB_HOST")
 DB_PORT: int = int(os.getenv("DB_PORT"))
 
+# connection pool, per process
+DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", 5))
+DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "True") == "True"
+# milliseconds, 0 disables the timeout
+DB_STATEMENT_TIMEOUT: int = int(os.getenv("DB_STATEMENT_TIMEOUT", 5000))
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool collecting how long checkouts wait for a connection"""
+
+    stats: dict[str, float] = {
+        "checkouts": 0,
+        "wait_time": 0.0,
+        "max_wait_time": 0.0,
+        "timeouts": 0,
+    }
+
+    def _do_get(self):
+        started_at: float = time.monotonic()
+        try:
+            return super()._do_get()
+        except TimeoutError:
+            self.stats["timeouts"] += 1
+            DB_POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            wait_time: float = time.monotonic() - started_at
+            self.stats["checkouts"] += 1
+            self.stats["wait_time"] += wait_time
+            self.stats["max_wait_time"] = max(self.stats["max_wait_time"], wait_time)
+            DB_POOL_WAIT_SECONDS.observe(wait_time)
+
+
+class InstrumentedAsyncQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    """InstrumentedQueuePool of the asyncio engine"""
+
+
+engine_options: dict = {
+    "poolclass": InstrumentedQueuePool,
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+    "pool_pre_ping": DB_POOL_PRE_PING,
+}
+# serving processes only (see create_app): flask db upgrade and the history
+# partition commands share the engine and run DDL longer than the timeout
+serving_connect_args: dict = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT}"}
+# the asyncio engine (asyncpg) of the ASGI views, see db/async_clients.py
+async_engine_options: dict = {
+    **engine_options,
+    "poolclass": InstrumentedAsyncQueuePool,
+    "connect_args": {
+        "server_settings": {"statement_timeout": f"{DB_STATEMENT_TIMEOUT}"}
+    },
+}
+
 
 if config.TESTING:
     """test db"""
@@ -19,11 +83,17 @@ if config.TESTING:
     psql_db_url: str = (
         f"postgresql+psycopg2://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_TEST_NAME}"
     )
-    psql_db = SQLAlchemy()
+    async_psql_db_url: str = (
+        f"postgresql+asyncpg://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_TEST_NAME}"
+    )
+    psql_db = SQLAlchemy(engine_options=engine_options)
 else:
     """prod db"""
     DB_NAME: str = os.getenv("DB_NAME")
     psql_db_url: str = (
         f"postgresql+psycopg2://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
     )
-    psql_db = SQLAlchemy()
+    async_psql_db_url: str = (
+        f"postgresql+asyncpg://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+    )
+    psql_db = SQLAlchemy(engine_options=engine_options)
@@ -1,21 +1,256 @@
 import os
-from typing import Union
+from functools import partial, wraps
+from typing import Callable, Optional, Union
 
 from dotenv import load_dotenv
-from redis import Redis
+from redis import BlockingConnectionPool, Redis
+from redis.asyncio import BlockingConnectionPool as AsyncBlockingConnectionPool
+from redis.asyncio import Redis as AsyncRedis
+from redis.asyncio.cluster import RedisCluster as AsyncRedisCluster
+from redis.asyncio.sentinel import Sentinel as AsyncSentinel
+from redis.cluster import RedisCluster
+from redis.exceptions import NoScriptError
+from redis.sentinel import Sentinel
 
+from core.metrics import timed, timed_async
 from db.cache import AbstractCache
 
 load_dotenv()
 
 REDIS_HOST: str = os.getenv("REDIS_HOST")
 REDIS_PORT: int = int(os.getenv("REDIS_PORT"))
+REDIS_PASSWORD: Optional[str] = os.getenv("REDIS_PASSWORD") or None
+# standalone | sentinel | cluster (REDIS_HOST:REDIS_PORT is any node of it)
+REDIS_MODE: str = os.getenv("REDIS_MODE", "standalone")
+# sentinel: comma separated host:port list and the monitored master name
+REDIS_SENTINELS: str = os.getenv("REDIS_SENTINELS", "")
+REDIS_SENTINEL_MASTER: str = os.getenv("REDIS_SENTINEL_MASTER", "mymaster")
+# connections per process, per node in cluster mode
+REDIS_MAX_CONNECTIONS: int = int(os.getenv("REDIS_MAX_CONNECTIONS", 50))
+# seconds to wait for a free connection when the pool is exhausted; cluster
+# node pools don't wait, an exhausted one raises ConnectionError
+REDIS_POOL_TIMEOUT: float = float(os.getenv("REDIS_POOL_TIMEOUT", 1.0))
+REDIS_SOCKET_TIMEOUT: float = float(os.getenv("REDIS_SOCKET_TIMEOUT", 1.0))
+REDIS_SOCKET_CONNECT_TIMEOUT: float = float(
+    os.getenv("REDIS_SOCKET_CONNECT_TIMEOUT", 1.0)
+)
+REDIS_HEALTH_CHECK_INTERVAL: int = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", 30))
+
+
+def hash_tag(value) -> str:
+    """Cluster hashes only the {tagged} part: keys with one tag share a slot,
+    so the keys of a script call are on one node"""
+    return f"{{{value}}}"
+
+
+def get_connection_kwargs() -> dict:
+    """connection settings of both clients, after checking REDIS_MODE"""
+    if REDIS_MODE not in ("standalone", "sentinel", "cluster"):
+        raise ValueError(
+            f"Unknown REDIS_MODE {REDIS_MODE}, "
+            "expected standalone, sentinel or cluster"
+        )
+    return {
+        "password": REDIS_PASSWORD,
+        "socket_timeout": REDIS_SOCKET_TIMEOUT,
+        "socket_connect_timeout": REDIS_SOCKET_CONNECT_TIMEOUT,
+        "socket_keepalive": True,
+        "health_check_interval": REDIS_HEALTH_CHECK_INTERVAL,
+        "retry_on_timeout": True,
+        "decode_responses": True,
+        "encoding": "utf-8",
+    }
+
+
+def get_sentinels() -> list[tuple[str, int]]:
+    return [
+        (host, int(port))
+        for host, port in (
+            address.strip().split(":")
+            for address in REDIS_SENTINELS.split(",")
+            if address.strip()
+        )
+    ]
+
+
+def create_redis_client() -> Union[Redis, RedisCluster]:
+    """Pooled client for REDIS_MODE"""
+    connection_kwargs: dict = get_connection_kwargs()
+    if REDIS_MODE == "cluster":
+        return RedisCluster(
+            host=REDIS_HOST,
+            port=REDIS_PORT,
+            max_connections=REDIS_MAX_CONNECTIONS,
+            **connection_kwargs,
+        )
+    if REDIS_MODE == "sentinel":
+        return Sentinel(
+            sentinels=get_sentinels(),
+            socket_timeout=REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=REDIS_SOCKET_CONNECT_TIMEOUT,
+        ).master_for(
+            service_name=REDIS_SENTINEL_MASTER,
+            max_connections=REDIS_MAX_CONNECTIONS,
+            **connection_kwargs,
+        )
+    return Redis(
+        connection_pool=BlockingConnectionPool(
+            host=REDIS_HOST,
+            port=REDIS_PORT,
+            db=0,
+            max_connections=REDIS_MAX_CONNECTIONS,
+            timeout=REDIS_POOL_TIMEOUT,
+            **connection_kwargs,
+        )
+    )
+
+
+def create_async_redis_client() -> Union[AsyncRedis, AsyncRedisCluster]:
+    """redis.asyncio client for REDIS_MODE, for the ASGI views (asgi.py).
+
+    Its pool is bound to the event loop using it first: create it in the
+    running loop, see db/async_clients.py.
+    """
+    connection_kwargs: dict = get_connection_kwargs()
+    if REDIS_MODE == "cluster":
+        client: Union[AsyncRedis, AsyncRedisCluster] = AsyncRedisCluster(
+            host=REDIS_HOST,
+            port=REDIS_PORT,
+            max_connections=REDIS_MAX_CONNECTIONS,
+            **connection_kwargs,
+        )
+    elif REDIS_MODE == "sentinel":
+        client = AsyncSentinel(
+            sentinels=get_sentinels(),
+            socket_timeout=REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=REDIS_SOCKET_CONNECT_TIMEOUT,
+        ).master_for(
+            service_name=REDIS_SENTINEL_MASTER,
+            max_connections=REDIS_MAX_CONNECTIONS,
+            **connection_kwargs,
+        )
+    else:
+        client = AsyncRedis(
+            connection_pool=AsyncBlockingConnectionPool(
+                host=REDIS_HOST,
+                port=REDIS_PORT,
+                db=0,
+                max_connections=REDIS_MAX_CONNECTIONS,
+                timeout=REDIS_POOL_TIMEOUT,
+                **connection_kwargs,
+            )
+        )
+    client.execute_command = timed_async(backend="redis", func=client.execute_command)
+    return client
+
+
+class ClusterPipeline:
+    """Pipeline of a RedisCluster client for the code written against Redis
+    pipelines.
+
+    Cluster pipelines refuse EVALSHA and PUBLISH: queued scripts and
+    publishes run on the client right after the pipelined commands, their
+    replies in queue order. A script's keys share a hash tag, so it runs on
+    one node as anywhere else. Unlike a Redis pipeline this is no MULTI
+    transaction: the commands of a slot run in order, not atomically.
+    """
+
+    def __init__(self, client, scripts: dict):
+        self.client = client
+        # sha -> script registered on the client
+        self.scripts: dict = scripts
+        self.pipe = client.pipeline()
+        self.deferred: list[tuple[int, Callable]] = []
+        self.size: int = 0
+
+    def __getattr__(self, name: str) -> Callable:
+        command: Callable = getattr(self.pipe, name)
+
+        @wraps(command)
+        def queue(*args, **kwargs):
+            command(*args, **kwargs)
+            self.size += 1
+            return self
+
+        return queue
+
+    def defer(self, call: Callable):
+        """run call on the client when the pipeline is executed"""
+        self.deferred.append((self.size, call))
+        self.size += 1
+        return self
+
+    def evalsha(self, sha: str, numkeys: int, *keys_and_args):
+        """queued by a script called with client=pipeline"""
+        return self.defer(
+            partial(
+                self.scripts[sha],
+                keys=keys_and_args[:numkeys],
+                args=keys_and_args[numkeys:],
+                client=self.client,
+            )
+        )
+
+    def publish(self, channel: str, message: str):
+        return self.defer(partial(self.client.publish, channel, message))
+
+    def execute(self) -> list:
+        replies: list = self.pipe.execute()
+        for index, call in self.deferred:
+            replies.insert(index, call())
+        self.deferred, self.size = [], 0
+        return replies
+
+
+class AsyncClusterPipeline(ClusterPipeline):
+    """ClusterPipeline of the asyncio RedisCluster client"""
+
+    async def evalsha(self, sha: str, numkeys: int, *keys_and_args):
+        return super().evalsha(sha, numkeys, *keys_and_args)
+
+    async def execute(self) -> list:
+        replies: list = await self.pipe.execute()
+        for index, call in self.deferred:
+            replies.insert(index, await call())
+        self.deferred, self.size = [], 0
+        return replies
+
+
+class AsyncClusterScript:
+    """Lua script on the asyncio RedisCluster client, which can't register
+    scripts: AsyncScript's call, loaded on every primary on NOSCRIPT"""
+
+    def __init__(self, client: AsyncRedisCluster, script: str, sha: str):
+        self.client: AsyncRedisCluster = client
+        self.script: str = script
+        self.sha: str = sha
+
+    async def __call__(self, keys=(), args=(), client=None):
+        if client is None:
+            client = self.client
+        try:
+            return await client.evalsha(self.sha, len(keys), *keys, *args)
+        except NoScriptError:
+            await self.client.script_load(self.script)
+            return await client.evalsha(self.sha, len(keys), *keys, *args)
 
 
 class RedisCache(AbstractCache):
+    def __init__(self, cache_instance):
+        super().__init__(cache_instance=cache_instance)
+        # sha -> registered script, run by ClusterPipeline
+        self.scripts: dict = {}
+
     def get(self, key: str, **kwargs):
         return self.cache.get(f"{key}")
 
+    def set(self, key: str, value: Union[bytes, str], expire: int):
+        self.cache.set(name=f"{key}", value=value, ex=expire)
+
+    def delete(self, *keys: str):
+        if keys:
+            self.cache.delete(*keys)
+
     def add_token(self, key: str, expire: int, value: Union[bytes, str]):
         self.cache.setex(name=f"{key}", time=expire, value=f"{value}")
 
@@ -35,11 +270,23 @@ class RedisCache(AbstractCache):
         self.cache.close()
 
     def pipeline(self, **kwargs):
-        return self.cache.pipeline()
+        if isinstance(self.cache, RedisCluster):
+            pipe = ClusterPipeline(client=self.cache, scripts=self.scripts)
+        else:
+            pipe = self.cache.pipeline()
+        pipe.execute = timed(backend="redis", func=pipe.execute)
+        return pipe
 
+    def pubsub(self, **kwargs):
+        return self.cache.pubsub(**kwargs)
 
-redis_cache: RedisCache = RedisCache(
-    cache_instance=Redis(
-        host=REDIS_HOST, port=REDIS_PORT, db=0, decode_responses=True, charset="utf-8"
-    )
-)
+    def register_script(self, script: str):
+        registered = self.cache.register_script(script)
+        self.scripts[registered.sha] = registered
+        return registered
+
+
+redis_client: Union[Redis, RedisCluster] = create_redis_client()
+# every command (scripts included) is one timed round trip, pipelines too
+redis_client.execute_command = timed(backend="redis", func=redis_client.execute_command)
+redis_cache: RedisCache = RedisCache(cache_instance=redis_client)
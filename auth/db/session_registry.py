@@ -0,0 +1,173 @@
+import json
+import time
+from datetime import timedelta
+from typing import Optional, Union
+
+from db import async_clients
+from db.cache import AbstractCache
+from db.redis import hash_tag, redis_cache
+
+# KEYS[1] - sessions hash (jti -> session), KEYS[2] - expiry sorted set (jti -> ts)
+CLEANUP_SCRIPT: str = """
+local expired = redis.call("ZRANGEBYSCORE", KEYS[2], "-inf", ARGV[1])
+for _, jti in ipairs(expired) do
+    redis.call("HDEL", KEYS[1], jti)
+end
+redis.call("ZREMRANGEBYSCORE", KEYS[2], "-inf", ARGV[1])
+"""
+
+# KEYS[3] - refresh token key, ARGV = now, jti, session, expires_at, ttl, user_id
+REGISTER_SCRIPT: str = CLEANUP_SCRIPT + """
+redis.call("SET", KEYS[3], ARGV[6], "EX", ARGV[5])
+redis.call("HSET", KEYS[1], ARGV[2], ARGV[3])
+redis.call("ZADD", KEYS[2], ARGV[4], ARGV[2])
+local last = redis.call("ZRANGE", KEYS[2], -1, -1, "WITHSCORES")
+local ttl = tonumber(last[2]) - tonumber(ARGV[1])
+redis.call("EXPIRE", KEYS[1], ttl)
+redis.call("EXPIRE", KEYS[2], ttl)
+"""
+
+LIST_SCRIPT: str = CLEANUP_SCRIPT + """
+return redis.call("HGETALL", KEYS[1])
+"""
+
+# ARGV[1] - refresh token key prefix, the jti is appended
+REVOKE_ALL_SCRIPT: str = """
+local jtis = redis.call("ZRANGE", KEYS[2], 0, -1)
+for _, jti in ipairs(jtis) do
+    redis.call("DEL", ARGV[1] .. jti)
+end
+redis.call("DEL", KEYS[1], KEYS[2])
+return #jtis
+"""
+
+
+class SessionRegistry:
+    """Refresh token sessions grouped by user.
+
+    Every refresh token is a key with the token's TTL (the token is valid
+    while the key exists) plus an entry in the user's sessions hash and
+    expiry sorted set, so the user's devices can be listed and revoked
+    one by one or all at once. Expired entries are removed on register and
+    list. All keys of a user share one hash tag, i.e. one cluster slot, as
+    the scripts require.
+    """
+
+    def __init__(self, cache: AbstractCache):
+        self.cache: AbstractCache = cache
+        self._register = cache.register_script(REGISTER_SCRIPT)
+        self._list = cache.register_script(LIST_SCRIPT)
+        self._revoke_all = cache.register_script(REVOKE_ALL_SCRIPT)
+
+    @staticmethod
+    def sessions_key(user_id: str) -> str:
+        return f"Sessions::{hash_tag(user_id)}"
+
+    @staticmethod
+    def expire_key(user_id: str) -> str:
+        return f"SessionsExpire::{hash_tag(user_id)}"
+
+    @staticmethod
+    def refresh_key_prefix(user_id: str) -> str:
+        return f"Refresh::{hash_tag(user_id)}:"
+
+    def refresh_key(self, user_id: str, jti: str) -> str:
+        return f"{self.refresh_key_prefix(user_id=user_id)}{jti}"
+
+    def register_call(
+        self,
+        user_id: str,
+        jti: str,
+        expire: Union[int, timedelta],
+        device: Optional[dict] = None,
+    ) -> dict:
+        """keys and args of the register script"""
+        ttl: int = int(
+            expire.total_seconds() if isinstance(expire, timedelta) else expire
+        )
+        now: int = int(time.time())
+        session: dict = {**(device or {}), "created_at": now, "expires_at": now + ttl}
+        return {
+            "keys": [
+                self.sessions_key(user_id=user_id),
+                self.expire_key(user_id=user_id),
+                self.refresh_key(user_id=user_id, jti=jti),
+            ],
+            "args": [now, jti, json.dumps(session), now + ttl, ttl, f"{user_id}"],
+        }
+
+    def register(
+        self,
+        user_id: str,
+        jti: str,
+        expire: Union[int, timedelta],
+        device: Optional[dict] = None,
+        pipe=None,
+    ) -> None:
+        """pipe: queue the registration to the pipeline instead of running it"""
+        self._register(
+            **self.register_call(
+                user_id=user_id, jti=jti, expire=expire, device=device
+            ),
+            client=pipe,
+        )
+
+    async def register_async(
+        self,
+        user_id: str,
+        jti: str,
+        expire: Union[int, timedelta],
+        device: Optional[dict] = None,
+        pipe=None,
+    ) -> None:
+        """register on the asyncio client or pipeline"""
+        await async_clients.script(self._register)(
+            **self.register_call(
+                user_id=user_id, jti=jti, expire=expire, device=device
+            ),
+            client=pipe,
+        )
+
+    def is_active(self, user_id: str, jti: str) -> bool:
+        return (
+            self.cache.get(key=self.refresh_key(user_id=user_id, jti=jti)) is not None
+        )
+
+    async def is_active_async(self, user_id: str, jti: str) -> bool:
+        return (
+            await async_clients.redis_client.get(
+                self.refresh_key(user_id=user_id, jti=jti)
+            )
+            is not None
+        )
+
+    def list(self, user_id: str) -> list[dict]:
+        values: list = self._list(
+            keys=[self.sessions_key(user_id=user_id), self.expire_key(user_id=user_id)],
+            args=[int(time.time())],
+        )
+        return sorted(
+            (
+                {"jti": jti, **json.loads(session)}
+                for jti, session in zip(values[::2], values[1::2])
+            ),
+            key=lambda session: session.get("created_at"),
+        )
+
+    def revoke(self, user_id: str, jti: str) -> bool:
+        pipe = self.cache.pipeline()
+        pipe.delete(self.refresh_key(user_id=user_id, jti=jti))
+        pipe.hdel(self.sessions_key(user_id=user_id), jti)
+        pipe.zrem(self.expire_key(user_id=user_id), jti)
+        deleted, *_ = pipe.execute()
+        return bool(deleted)
+
+    def revoke_all(self, user_id: str) -> int:
+        """log out everywhere: one atomic script call"""
+        return self._revoke_all(
+            keys=[self.sessions_key(user_id=user_id), self.expire_key(user_id=user_id)],
+            args=[self.refresh_key_prefix(user_id=user_id)],
+        )
+
+
+session_registry: SessionRegistry = SessionRegistry(cache=redis_cache)
@@ -0,0 +1,163 @@
+"""Pre-fork launcher: python3 launcher.py
+
+The master binds the listening socket and forks WEB_WORKERS gevent
+workers sharing it. The master imports neither gevent nor the app: every
+worker monkey-patches and imports the app after fork, so DB and Redis
+pools are opened in the worker that uses them.
+"""
+import os
+import random
+import signal
+import socket
+import sys
+import time
+import traceback
+from typing import Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+FLASK_PORT: int = int(os.getenv("FLASK_PORT"))
+WEB_WORKERS: int = int(os.getenv("WEB_WORKERS", os.cpu_count() or 1))
+WEB_BACKLOG: int = int(os.getenv("WEB_BACKLOG", 2048))
+# recycle a worker after that many requests (plus jitter), 0 never
+WEB_MAX_REQUESTS: int = int(os.getenv("WEB_MAX_REQUESTS", 0))
+WEB_MAX_REQUESTS_JITTER: int = int(os.getenv("WEB_MAX_REQUESTS_JITTER", 0))
+# concurrent requests per worker, in-flight ones are waited for on stop
+WEB_WORKER_CONNECTIONS: int = int(os.getenv("WEB_WORKER_CONNECTIONS", 1000))
+# seconds for in-flight requests on shutdown and recycle
+WEB_GRACEFUL_TIMEOUT: int = int(os.getenv("WEB_GRACEFUL_TIMEOUT", 30))
+# metrics of all workers are kept there, see core/metrics.py
+PROMETHEUS_MULTIPROC_DIR: Optional[str] = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+
+def serve(listener: socket.socket, max_requests: int) -> None:
+    """worker: serve until SIGTERM/SIGINT or max_requests"""
+    from gevent import monkey
+
+    monkey.patch_all()
+
+    from psycogreen.gevent import patch_psycopg
+
+    patch_psycopg()
+
+    import gevent
+    from gevent import socket as gevent_socket
+    from gevent.pool import Pool
+    from gevent.pywsgi import WSGIServer
+
+    from api.user.history_service import history_writer
+    from app import app, create_app
+    from core.metrics import watch_worker_pool
+    from core.password_service import password_hasher
+    from utils.rate_limit import limiter
+
+    wsgi_app = create_app(flask_app=app)
+    pool = Pool(WEB_WORKER_CONNECTIONS)
+    watch_worker_pool(pool=pool, limit=WEB_WORKER_CONNECTIONS)
+    server = WSGIServer(
+        gevent_socket.socket(fileno=listener.detach()),
+        wsgi_app,
+        spawn=pool,
+    )
+    served: int = 0
+
+    def counting_app(environ, start_response):
+        nonlocal served
+        served += 1
+        if served == max_requests:
+            gevent.spawn(server.stop, timeout=WEB_GRACEFUL_TIMEOUT)
+        return wsgi_app(environ, start_response)
+
+    if max_requests:
+        server.application = counting_app
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        gevent.signal_handler(signum, server.stop, timeout=WEB_GRACEFUL_TIMEOUT)
+    try:
+        server.serve_forever()
+    finally:
+        history_writer.flush()
+        # spawn() leaves with os._exit, the hashing processes have to be
+        # stopped before: they would be orphaned on every recycle
+        password_hasher.shutdown(wait=True)
+        limiter.flush()
+
+
+def spawn(listener: socket.socket) -> int:
+    pid: int = os.fork()
+    if pid:
+        return pid
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    code: int = 0
+    try:
+        serve(
+            listener=listener,
+            max_requests=WEB_MAX_REQUESTS
+            and WEB_MAX_REQUESTS + random.randint(0, WEB_MAX_REQUESTS_JITTER),
+        )
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+
+
+def reset_metrics() -> None:
+    """files of the previous run would be added up with the new ones"""
+    os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+    for name in os.listdir(PROMETHEUS_MULTIPROC_DIR):
+        if name.endswith(".db"):
+            os.remove(os.path.join(PROMETHEUS_MULTIPROC_DIR, name))
+
+
+def main() -> None:
+    if PROMETHEUS_MULTIPROC_DIR:
+        reset_metrics()
+    listener: socket.socket = socket.create_server(
+        ("", FLASK_PORT), backlog=WEB_BACKLOG
+    )
+    workers: dict[int, float] = {}
+    stopping: bool = False
+
+    def kill(signum, frame) -> None:
+        for pid in list(workers):
+            os.kill(pid, signal.SIGKILL)
+
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            os.kill(pid, signal.SIGTERM)
+        signal.signal(signal.SIGALRM, kill)
+        signal.alarm(WEB_GRACEFUL_TIMEOUT + 5)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(WEB_WORKERS):
+        workers[spawn(listener=listener)] = time.monotonic()
+    print(f"Serving on port {FLASK_PORT} with {WEB_WORKERS} workers", flush=True)
+    while workers:
+        pid, _ = os.wait()
+        if pid not in workers:
+            # an orphan re-parented to the launcher (PID 1 in a container)
+            continue
+        started_at: float = workers.pop(pid)
+        if PROMETHEUS_MULTIPROC_DIR:
+            from prometheus_client import multiprocess
+
+            # drop the dead worker's live gauges
+            multiprocess.mark_process_dead(pid)
+        if stopping:
+            continue
+        if time.monotonic() - started_at < 1:
+            # crash loop: do not fork as fast as the worker dies
+            time.sleep(1)
+        workers[spawn(listener=listener)] = time.monotonic()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""success_history (user_id, created_at, id) index
+
+Revision ID: 8c4e1f2a9d3b
+Revises: 27f453c95cbf
+Create Date: 2022-04-04 10:12:31.402118
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "8c4e1f2a9d3b"
+down_revision = "27f453c95cbf"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # index on the partitioned table is created on every partition
+    op.create_index(
+        "ix_success_history_user_id_created_at",
+        "success_history",
+        ["user_id", "created_at", "id"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index("ix_success_history_user_id_created_at", table_name="success_history")
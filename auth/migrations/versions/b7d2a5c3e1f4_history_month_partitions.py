@@ -0,0 +1,110 @@
+"""success_history monthly sub-partitions
+
+Revision ID: b7d2a5c3e1f4
+Revises: 8c4e1f2a9d3b
+Create Date: 2022-04-06 16:41:09.518230
+
+"""
+from datetime import date
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b7d2a5c3e1f4"
+down_revision = "8c4e1f2a9d3b"
+branch_labels = None
+depends_on = None
+
+PLATFORMS = ("windows", "linux", "macos", "other")
+
+
+def add_months(value: date, months: int) -> date:
+    month: int = value.year * 12 + value.month - 1 + months
+    return date(month // 12, month % 12 + 1, 1)
+
+
+def table_exists(name: str) -> bool:
+    return (
+        op.get_bind().execute(sa.text("SELECT to_regclass(:name)"), name=name).scalar()
+        is not None
+    )
+
+
+def upgrade():
+    # platform partitions become RANGE (created_at) partitioned: the existing
+    # ones are detached and attached back as "everything before next month"
+    this_month: date = add_months(date.today(), 0)
+    next_month: date = add_months(this_month, 1)
+    legacy: list[str] = []
+    for platform in PLATFORMS:
+        name: str = f"success_history_{platform}"
+        if not table_exists(name=name):
+            continue
+        op.execute(f'ALTER TABLE "success_history" DETACH PARTITION "{name}"')
+        op.execute(f'ALTER TABLE "{name}" RENAME TO "{name}_legacy"')
+        op.execute(
+            f'ALTER TABLE "{name}_legacy" DROP CONSTRAINT IF EXISTS "{name}_pkey"'
+        )
+        op.execute(
+            f'ALTER TABLE "{name}_legacy" '
+            f'DROP CONSTRAINT IF EXISTS "{name}_id_platform_key"'
+        )
+        op.execute(
+            f'UPDATE "{name}_legacy" SET created_at = COALESCE(updated_at, now()) '
+            "WHERE created_at IS NULL"
+        )
+        op.alter_column(f"{name}_legacy", "created_at", nullable=False)
+        legacy.append(platform)
+
+    op.drop_constraint(
+        "success_history_id_platform_key", "success_history", type_="unique"
+    )
+    op.drop_constraint("success_history_pkey", "success_history", type_="primary")
+    op.alter_column("success_history", "created_at", nullable=False)
+    op.create_primary_key(
+        "success_history_pkey", "success_history", ["id", "platform", "created_at"]
+    )
+
+    for platform in PLATFORMS:
+        name: str = f"success_history_{platform}"
+        op.execute(
+            f'CREATE TABLE "{name}" PARTITION OF "success_history" '
+            f"FOR VALUES IN ('{platform}') PARTITION BY RANGE (created_at)"
+        )
+        op.execute(f'CREATE TABLE "{name}_default" PARTITION OF "{name}" DEFAULT')
+        if platform in legacy:
+            op.execute(
+                f'ALTER TABLE "{name}" ATTACH PARTITION "{name}_legacy" '
+                f"FOR VALUES FROM (MINVALUE) TO ('{next_month}')"
+            )
+        month: date = next_month if platform in legacy else this_month
+        while month <= next_month:
+            op.execute(
+                f'CREATE TABLE "{name}_{month:%Y_%m}" PARTITION OF "{name}" '
+                f"FOR VALUES FROM ('{month}') TO ('{add_months(month, 1)}')"
+            )
+            month = add_months(month, 1)
+
+
+def downgrade():
+    for platform in PLATFORMS:
+        name: str = f"success_history_{platform}"
+        op.execute(f'ALTER TABLE "success_history" DETACH PARTITION "{name}"')
+        op.execute(f'ALTER TABLE "{name}" RENAME TO "{name}_ranged"')
+
+    op.drop_constraint("success_history_pkey", "success_history", type_="primary")
+    op.alter_column("success_history", "created_at", nullable=True)
+    op.create_primary_key("success_history_pkey", "success_history", ["id", "platform"])
+    op.create_unique_constraint(
+        "success_history_id_platform_key", "success_history", ["id", "platform"]
+    )
+
+    for platform in PLATFORMS:
+        name: str = f"success_history_{platform}"
+        op.execute(
+            f'CREATE TABLE "{name}" PARTITION OF "success_history" '
+            f"FOR VALUES IN ('{platform}')"
+        )
+        op.execute(f'INSERT INTO "{name}" SELECT * FROM "{name}_ranged"')
+        op.execute(f'DROP TABLE "{name}_ranged"')
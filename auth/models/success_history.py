@@ -1,32 +1,196 @@
+import re
 import uuid
+from datetime import date
+from typing import Optional
 
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import text
 from sqlalchemy.dialects.postgresql import UUID
 
+from core import config
 from db import db
 from models.mixins import CreatedUpgradeTimeMixin
 
+PLATFORMS: tuple[str, ...] = ("windows", "linux", "macos", "other")
 
-def create_partition(target, connection, **kw) -> None:
-    """creating partition by success_history"""
-    connection.execute(
-        """CREATE TABLE IF NOT EXISTS "success_history_windows" PARTITION OF "success_history" FOR VALUES IN ('windows')"""
+
+def add_months(value: date, months: int) -> date:
+    """first day of the month `months` months after the value's month"""
+    month: int = value.year * 12 + value.month - 1 + months
+    return date(month // 12, month % 12 + 1, 1)
+
+
+def get_range_partitions(connection) -> list[tuple[str, str, Optional[date]]]:
+    """(platform partition, month partition, upper bound); None is DEFAULT"""
+    rows = connection.execute(
+        text(
+            """SELECT parent.relname, child.relname,
+                pg_get_expr(child.relpartbound, child.oid)
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = ANY(:parents)"""
+        ),
+        {"parents": [f"success_history_{platform}" for platform in PLATFORMS]},
     )
+    partitions: list[tuple[str, str, Optional[date]]] = []
+    for parent, child, bound in rows:
+        upper = re.search(r"TO \('(\d{4}-\d{2}-\d{2})", bound)
+        partitions.append(
+            (parent, child, date.fromisoformat(upper.group(1)) if upper else None)
+        )
+    return partitions
+
+
+def month_partition_name(parent: str, month: date) -> str:
+    return f"{parent}_{month:%Y_%m}"
+
+
+def get_missing_partitions(
+    connection, months_ahead: int, today: Optional[date] = None
+) -> list[tuple[str, date]]:
+    """(platform partition, month) from the current month to months_ahead
+    months ahead that no partition covers yet"""
+    first_month: date = add_months(today or date.today(), 0)
+    covered: dict[str, date] = {}
+    for parent, _, upper in get_range_partitions(connection=connection):
+        if upper and upper > covered.get(parent, first_month):
+            covered[parent] = upper
+    missing: list[tuple[str, date]] = []
+    for platform in PLATFORMS:
+        parent: str = f"success_history_{platform}"
+        for offset in range(months_ahead + 1):
+            month: date = add_months(first_month, offset)
+            if month >= covered.get(parent, first_month):
+                missing.append((parent, month))
+    return missing
+
+
+def create_month_partition(connection, parent: str, month: date) -> Optional[str]:
+    """Partition of the parent for the month, in the connection's transaction.
+
+    Rows of the month already written to the DEFAULT partition are moved
+    into the new one: DEFAULT is detached, the month created, its rows
+    re-inserted and DEFAULT attached back. Inserts into the parent wait for
+    the transaction meanwhile. Concurrent callers are serialized by an
+    advisory lock, None when the partition exists by then.
+    """
+    name: str = month_partition_name(parent=parent, month=month)
+    default: str = f"{parent}_default"
+    end: date = add_months(month, 1)
+    bounds: dict[str, date] = {"start": month, "end": end}
+    # moving rows and validating DEFAULT may outlast the serving timeout
+    connection.execute("SET LOCAL statement_timeout = 0")
     connection.execute(
-        """CREATE TABLE IF NOT EXISTS "success_history_linux" PARTITION OF "success_history" FOR VALUES IN ('linux')"""
+        text("SELECT pg_advisory_xact_lock(hashtext(:parent))"), {"parent": parent}
     )
-    connection.execute(
-        """CREATE TABLE IF NOT EXISTS "success_history_macos" PARTITION OF "success_history" FOR VALUES IN ('macos')"""
+    if connection.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar():
+        return None
+    create: str = (
+        f'CREATE TABLE "{name}" PARTITION OF "{parent}" '
+        f"FOR VALUES FROM ('{month}') TO ('{end}')"
     )
+    in_month: str = "created_at >= :start AND created_at < :end"
+    has_rows = connection.execute(
+        text(f'SELECT 1 FROM "{default}" WHERE {in_month} LIMIT 1'), bounds
+    ).scalar()
+    if not has_rows:
+        connection.execute(create)
+        return name
+    connection.execute(f'ALTER TABLE "{parent}" DETACH PARTITION "{default}"')
+    connection.execute(create)
     connection.execute(
-        """CREATE TABLE IF NOT EXISTS "success_history_other" PARTITION OF "success_history" FOR VALUES IN ('other')"""
+        text(f"""WITH moved AS (DELETE FROM "{default}" WHERE {in_month} RETURNING *)
+            INSERT INTO "{name}" SELECT * FROM moved"""),
+        bounds,
     )
+    connection.execute(f'ALTER TABLE "{parent}" ATTACH PARTITION "{default}" DEFAULT')
+    return name
+
+
+def create_month_partitions(
+    engine, months_ahead: int, today: Optional[date] = None
+) -> list[str]:
+    """Monthly partitions from the current month to months_ahead months ahead.
+
+    Every partition is created in its own transaction, a failure leaves the
+    ones before it in place. Rows of a month that has no partition land in
+    the platform's DEFAULT partition until the month is created.
+    """
+    with engine.connect() as connection:
+        missing: list[tuple[str, date]] = get_missing_partitions(
+            connection=connection, months_ahead=months_ahead, today=today
+        )
+    created: list[str] = []
+    for parent, month in missing:
+        with engine.begin() as connection:
+            name: Optional[str] = create_month_partition(
+                connection=connection, parent=parent, month=month
+            )
+        if name:
+            created.append(name)
+    return created
+
+
+def drop_expired_partitions(
+    engine, retention_months: int, detach_only: bool, today: Optional[date] = None
+) -> list[str]:
+    """Detach (and drop) partitions entirely older than retention_months.
+
+    Expired rows in the DEFAULT partitions are moved to their month's
+    partition first, which then expires with the others.
+    """
+    horizon: date = add_months(today or date.today(), -retention_months)
+    expired_months: list[tuple[str, date]] = []
+    with engine.connect() as connection:
+        for platform in PLATFORMS:
+            parent: str = f"success_history_{platform}"
+            rows = connection.execute(
+                text(f"""SELECT DISTINCT date_trunc('month', created_at)::date
+                    FROM "{parent}_default" WHERE created_at < :horizon"""),
+                {"horizon": horizon},
+            )
+            expired_months.extend((parent, month) for month in rows.scalars())
+    for parent, month in expired_months:
+        with engine.begin() as connection:
+            create_month_partition(connection=connection, parent=parent, month=month)
+    with engine.connect() as connection:
+        partitions = get_range_partitions(connection=connection)
+    expired: list[str] = []
+    for parent, child, upper in partitions:
+        if upper is None or upper > horizon:
+            continue
+        with engine.begin() as connection:
+            connection.execute(f'ALTER TABLE "{parent}" DETACH PARTITION "{child}"')
+            if not detach_only:
+                connection.execute(f'DROP TABLE "{child}"')
+        expired.append(child)
+    return expired
+
+
+def create_partition(target, connection, **kw) -> None:
+    """creating partition by success_history: LIST by platform, RANGE by month"""
+    for platform in PLATFORMS:
+        connection.execute(
+            f'CREATE TABLE IF NOT EXISTS "success_history_{platform}" '
+            f"""PARTITION OF "success_history" FOR VALUES IN ('{platform}') """
+            "PARTITION BY RANGE (created_at)"
+        )
+        connection.execute(
+            f'CREATE TABLE IF NOT EXISTS "success_history_{platform}_default" '
+            f'PARTITION OF "success_history_{platform}" DEFAULT'
+        )
+    for parent, month in get_missing_partitions(
+        connection=connection, months_ahead=config.HISTORY_PARTITIONS_AHEAD
+    ):
+        create_month_partition(connection=connection, parent=parent, month=month)
 
 
 class SuccessHistory(CreatedUpgradeTimeMixin):
     __tablename__ = "success_history"
     __table_args__ = (
-        UniqueConstraint("id", "platform"),
+        db.Index(
+            "ix_success_history_user_id_created_at", "user_id", "created_at", "id"
+        ),
         {
             "postgresql_partition_by": "LIST (platform)",
             "listeners": [("after_create", create_partition)],
@@ -36,6 +200,10 @@ class SuccessHistory(CreatedUpgradeTimeMixin):
     id = db.Column(
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, nullable=False
     )
+    # every partition key is a part of the primary key
+    created_at = db.Column(
+        db.DateTime, primary_key=True, default=db.func.now(), nullable=False
+    )
     user_id = db.Column(UUID(as_uuid=True), db.ForeignKey("user.id"))
     description = db.Column(db.String(length=500), nullable=False)
     ip_address = db.Column(db.String(length=100))
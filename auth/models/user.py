@@ -1,5 +1,6 @@
-from werkzeug.security import check_password_hash, generate_password_hash
-
+from core import config
+from core.metrics import password_seconds
+from core.password_service import password_hasher
 from db import db
 from models.mixins import CreatedUpgradeTimeMixin
 from utils import constants
@@ -38,7 +39,19 @@ class User(CreatedUpgradeTimeMixin):
 
     def set_password(self, password: str):
         password: str = password_validation(value=password)
-        self.password = generate_password_hash(password=password)
+        with password_seconds["hash"].time():
+            self.password = password_hasher.hash(password=password)
 
     def check_password(self, password):
-        return check_password_hash(pwhash=self.password, password=password)
+        with password_seconds["verify"].time():
+            return password_hasher.verify(pwhash=self.password, password=password)
+
+    def rehash_password(self, password: str) -> bool:
+        """after a successful check: re-hash with the configured method"""
+        if config.PASSWORD_REHASH_ON_LOGIN and password_hasher.needs_rehash(
+            pwhash=self.password
+        ):
+            with password_seconds["hash"].time():
+                self.password = password_hasher.hash(password=password)
+            return True
+        return False
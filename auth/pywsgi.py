@@ -4,6 +4,11 @@ from gevent import monkey
 
 monkey.patch_all()
 
+from psycogreen.gevent import patch_psycopg
+
+# psycopg2 waits for the server through the gevent hub
+patch_psycopg()
+
 from dotenv import load_dotenv
 from gevent.pywsgi import WSGIServer
 
@@ -8,6 +8,7 @@ from flask_jwt_extended import JWTManager, create_access_token, create_refresh_t
 from multidict import CIMultiDictProxy
 
 from app import app as test_app
+from core.role_catalog import bump_catalog_version
 from db import db
 from models import Role, User, UserRole
 from tests.functional.settings import Settings
@@ -108,6 +109,8 @@ def app():
             new_role_2.save_to_db()
             new_user_role_2 = UserRole(user_id=user.id, role_id=new_role_2.id)
             new_user_role_2.save_to_db()
+        # roles were recreated with new ids, drop the server's cached catalog
+        bump_catalog_version()
 
 
 @pytest.fixture
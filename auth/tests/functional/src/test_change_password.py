@@ -18,6 +18,11 @@ async def test_success_change_password(make_request, access_token):
     )
     assert response.status == http.HTTPStatus.OK
     assert response.body.get("message") == "Successful password change by the user"
+    # access tokens issued before the change are revoked
+    response = await make_request(
+        endpoint="/me/users", http_method="get", headers=access_token
+    )
+    assert response.status == http.HTTPStatus.UNAUTHORIZED
 
 
 async def test_unsuccessful_change_change_password(make_request, access_token):
@@ -0,0 +1,41 @@
+import time
+
+import pytest
+
+from api.user.history_service import (
+    HistoryWriter,
+    build_history_row,
+    history_partitioner,
+)
+from core import config
+from models import SuccessHistory
+from utils.client_info import ClientInfo
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_flush_writes_the_worker_batch(user, monkeypatch):
+    monkeypatch.setattr(config, "HISTORY_WRITE_BEHIND", True)
+    monkeypatch.setattr(history_partitioner, "interval", 0)
+    writer: HistoryWriter = HistoryWriter(
+        max_size=100, batch_size=10, flush_interval=60
+    )
+    client: ClientInfo = ClientInfo(
+        user_agent="Mozilla/5.0 (X11; Linux x86_64) Firefox/99.0",
+        platform="linux",
+        browser="firefox",
+        ip_address="127.0.0.1",
+    )
+    for _ in range(3):
+        writer.write(row=build_history_row(user_id=user.id, client=client))
+    # the worker takes the rows off the queue and waits for a full batch
+    for _ in range(100):
+        if writer.queue.empty():
+            break
+        time.sleep(0.01)
+    assert writer.queue.empty()
+
+    writer.flush()
+
+    assert not writer._worker.is_alive()
+    assert SuccessHistory.query.filter_by(user_id=user.id).count() == 3
@@ -1,6 +1,10 @@
 import http
 
 import pytest
+from werkzeug.security import generate_password_hash
+
+from core.password_service import password_hasher
+from db import db
 
 pytestmark = pytest.mark.asyncio
 
@@ -40,6 +44,21 @@ async def test_success_login(make_request):
     assert len(response.body.get("data")) == 1
 
 
+async def test_login_rehashes_short_salt(make_request, user):
+    user.password = generate_password_hash(
+        "Test!12345", method=password_hasher.method, salt_length=8
+    )
+    user.save_to_db()
+    response = await make_request(
+        endpoint="/login",
+        http_method="post",
+        data={"email": "Test_243f@mail.ru", "password": "Test!12345"},
+    )
+    assert response.status == http.HTTPStatus.OK
+    db.session.refresh(user)
+    assert len(user.password.split("$")[1]) == password_hasher.salt_length
+
+
 async def test_logout_access_login(make_request, access_token):
     response = await make_request(
         endpoint="/logout/access", http_method="post", headers=access_token
@@ -52,3 +71,33 @@ async def test_logout_refresh_login(make_request, refresh_token):
         endpoint="/logout/refresh", http_method="post", headers=refresh_token
     )
     assert response.status == http.HTTPStatus.OK
+
+
+async def test_auth_history_pagination(make_request):
+    for _ in range(2):
+        response = await make_request(
+            endpoint="/login",
+            http_method="post",
+            data={"email": "UserTestUser@mail.ru", "password": "CoolPassword!1!"},
+        )
+    headers: dict = {
+        "Authorization": f"Bearer {response.body.get('data')[0].get('access_token')}"
+    }
+    response = await make_request(
+        endpoint="/auth_history?limit=1", http_method="get", headers=headers
+    )
+    assert response.status == http.HTTPStatus.OK
+    page: dict = response.body.get("data")[0]
+    assert len(page.get("history")) == 1
+    assert page.get("next_cursor")
+    response = await make_request(
+        endpoint=f"/auth_history?limit=1&cursor={page.get('next_cursor')}",
+        http_method="get",
+        headers=headers,
+    )
+    assert response.status == http.HTTPStatus.OK
+    assert len(response.body.get("data")[0].get("history")) == 1
+    response = await make_request(
+        endpoint="/auth_history?cursor=wrong", http_method="get", headers=headers
+    )
+    assert response.status == http.HTTPStatus.BAD_REQUEST
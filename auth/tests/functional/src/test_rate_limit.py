@@ -0,0 +1,56 @@
+import asyncio
+import http
+
+import pytest
+
+from db import cache
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def clear_rate_limits():
+    yield
+    for key in cache.cache.scan_iter(match="Limit::*"):
+        cache.delete(key)
+
+
+async def test_rate_limit_headers(make_request, clear_rate_limits):
+    first = await make_request(endpoint="/registration", http_method="post")
+    second = await make_request(endpoint="/registration", http_method="post")
+    assert first.status == http.HTTPStatus.BAD_REQUEST
+    limit: int = int(first.headers["X-RateLimit-Limit"])
+    assert int(first.headers["X-RateLimit-Remaining"]) < limit
+    assert int(second.headers["X-RateLimit-Remaining"]) < int(
+        first.headers["X-RateLimit-Remaining"]
+    )
+    assert int(first.headers["X-RateLimit-Reset"]) > 0
+    assert "Retry-After" not in first.headers
+
+
+async def test_rate_limit_exceeded(make_request, clear_rate_limits):
+    response = await make_request(endpoint="/registration", http_method="post")
+    limit: int = int(response.headers["X-RateLimit-Limit"])
+    if limit > 2000:
+        pytest.skip("the server runs with a scaled up RATE_LIMIT_SCALE")
+    for _ in range(0, limit + 50, 50):
+        responses = await asyncio.gather(
+            *(
+                make_request(endpoint="/registration", http_method="post")
+                for _ in range(50)
+            )
+        )
+        rejected = [
+            item
+            for item in responses
+            if item.status == http.HTTPStatus.TOO_MANY_REQUESTS
+        ]
+        if rejected:
+            break
+    assert rejected
+    assert int(rejected[0].headers["Retry-After"]) >= 1
+    assert rejected[0].headers["X-RateLimit-Remaining"] == "0"
+    assert "Too many requests" in rejected[0].body["message"]
+    # other endpoints keep their own limits
+    response = await make_request(endpoint="/login", http_method="post")
+    assert response.status == http.HTTPStatus.BAD_REQUEST
@@ -2,6 +2,8 @@ import http
 
 import pytest
 
+from tests.functional.settings import Settings
+
 pytestmark = pytest.mark.asyncio
 
 
@@ -22,6 +24,34 @@ async def test_role_list_and_detail(make_request, access_token):
     assert response_detail_id == role_id
 
 
+async def test_role_list_etag(make_request, session, access_token):
+    """Check conditional GET of the role list"""
+    response_list = await make_request(
+        endpoint="/role/", http_method="get", headers=access_token
+    )
+    etag: str = response_list.headers.get("ETag")
+    assert response_list.status == http.HTTPStatus.OK
+    assert etag
+    """ Not modified """
+    async with session.get(
+        url=f"{Settings.SERVICE_URL}/role/", headers={"If-None-Match": etag}
+    ) as response:
+        assert response.status == http.HTTPStatus.NOT_MODIFIED
+    """ New ETag after a role change """
+    await make_request(
+        endpoint="/role/",
+        http_method="post",
+        headers=access_token,
+        data={"name": "etag_role"},
+    )
+    response_list = await make_request(
+        endpoint="/role/", http_method="get", headers=access_token
+    )
+    assert response_list.headers.get("ETag") != etag
+    roles: list = response_list.body.get("data")[0].get("roles")
+    assert "etag_role" in [role.get("name") for role in roles]
+
+
 async def test_role_create(make_request, access_token):
     """Check creating role"""
     test_role: str = "test_role"
@@ -0,0 +1,53 @@
+import http
+
+import pytest
+
+pytestmark = pytest.mark.asyncio
+
+
+async def login(make_request) -> dict:
+    response = await make_request(
+        endpoint="/login",
+        http_method="post",
+        data={
+            "email": "UserTestUser@mail.ru",
+            "password": "CoolPassword!1!",
+        },
+    )
+    assert response.status == http.HTTPStatus.OK
+    return response.body.get("data")[0]
+
+
+async def test_list_sessions(make_request):
+    tokens: dict = await login(make_request=make_request)
+    response = await make_request(
+        endpoint="/sessions",
+        http_method="get",
+        headers={"Authorization": f"Bearer {tokens.get('access_token')}"},
+    )
+    assert response.status == http.HTTPStatus.OK
+    assert len(response.body.get("data")[0].get("sessions")) == 1
+
+
+async def test_revoke_all_sessions(make_request):
+    tokens: dict = await login(make_request=make_request)
+    other_device: dict = await login(make_request=make_request)
+    response = await make_request(
+        endpoint="/sessions",
+        http_method="delete",
+        headers={"Authorization": f"Bearer {tokens.get('access_token')}"},
+    )
+    assert response.status == http.HTTPStatus.OK
+    response = await make_request(
+        endpoint="/token/refresh",
+        http_method="post",
+        headers={"Authorization": f"Bearer {tokens.get('refresh_token')}"},
+    )
+    assert response.status == http.HTTPStatus.UNAUTHORIZED
+    # access tokens of the other devices are revoked too
+    response = await make_request(
+        endpoint="/sessions",
+        http_method="get",
+        headers={"Authorization": f"Bearer {other_device.get('access_token')}"},
+    )
+    assert response.status == http.HTTPStatus.UNAUTHORIZED
@@ -26,3 +26,29 @@ async def test_delete_user_role(make_request, access_token, user, get_role_id):
     )
     assert response.status == http.HTTPStatus.BAD_REQUEST
     assert response.body.get("message") == "You can not delete own role"
+
+
+async def test_bulk_user_role(make_request, access_token, user, get_role_id):
+    """grant and revoke roles in bulk"""
+    items: list[dict] = [
+        {"user_id": f"{user.id}", "role_id": get_role_id},
+        {"user_id": "wrong", "role_id": get_role_id},
+    ]
+    response = await make_request(
+        endpoint="/user_role/bulk",
+        http_method="post",
+        headers=access_token,
+        data={"items": items},
+    )
+    assert response.status == http.HTTPStatus.OK
+    results: list[dict] = response.body.get("data")[0].get("results")
+    assert results[0].get("status") in ("created", "exists")
+    assert results[1].get("status") == "invalid"
+    response = await make_request(
+        endpoint="/user_role/bulk",
+        http_method="delete",
+        headers=access_token,
+        data={"items": items[:1]},
+    )
+    assert response.status == http.HTTPStatus.OK
+    assert response.body.get("data")[0].get("results")[0].get("status") == "forbidden"
@@ -0,0 +1,27 @@
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class ClientInfo:
+    """Client of a login, independent of the serving mode's request object"""
+
+    user_agent: str
+    platform: Optional[str]
+    browser: Optional[str]
+    ip_address: Optional[str]
+
+    def as_dict(self) -> dict[str, Optional[str]]:
+        return asdict(self)
+
+
+def get_client_info(request=None) -> Optional[ClientInfo]:
+    """client of a werkzeug request"""
+    if not request:
+        return None
+    return ClientInfo(
+        user_agent=request.user_agent.string,
+        platform=request.user_agent.platform,
+        browser=request.user_agent.browser,
+        ip_address=request.remote_addr,
+    )
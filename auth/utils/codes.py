@@ -1,3 +1,4 @@
 INVALID_PASSWORD_ERROR: str = "Invalid password"
 INVALID_EMAIL_ERROR: str = "Invalid email"
 OBJECT_NOT_FOUND: str = "Not found"
+INVALID_USERNAME_ERROR: str = "Invalid username"
@@ -1,6 +1,7 @@
+import asyncio
 import http
 from functools import wraps
-from typing import Optional, Union
+from typing import Union
 
 from flask import Response, request
 from flask_restful import abort
@@ -82,44 +83,69 @@ def param_error_handler():
     return decorator
 
 
+# keys moved from an endpoint's dict to the envelope
+ENVELOPE_KEYS: tuple[str, ...] = ("message", "description", "errors")
+
+
+def build_envelope(response, status_code: int) -> dict:
+    """{success, data, message, description, errors} in one pass.
+
+    The endpoint's dict (or list) becomes the data item as is; a new dict
+    is built only when it has envelope keys to move out. Empty message,
+    description and errors are omitted.
+    """
+    envelope: dict = {"success": 200 <= status_code < 300, "data": []}
+    if isinstance(response, list):
+        envelope["data"] = response
+        return envelope
+    if not response:
+        return envelope
+    if not any(key in response for key in ENVELOPE_KEYS):
+        envelope["data"] = [response]
+        return envelope
+    data: dict = {}
+    meta: dict = {}
+    for key, value in response.items():
+        if key in ENVELOPE_KEYS:
+            meta[key] = value
+        else:
+            data[key] = value
+    if data:
+        envelope["data"] = [data]
+    for key in ENVELOPE_KEYS:
+        if meta.get(key):
+            envelope[key] = meta[key]
+    return envelope
+
+
+def wrap_response(result):
+    """the view's result in the envelope"""
+    if isinstance(result, Response):
+        # already serialized, e.g. a cached or 304 response
+        return result
+    if not isinstance(result, tuple):
+        return build_envelope(response=result, status_code=200), 200
+    response, status_code, *headers = result
+    return (
+        build_envelope(response=response, status_code=status_code),
+        status_code,
+        *headers,
+    )
+
+
 def api_response_wrapper():
     def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_inner(*args, **kwargs) -> tuple:
+                return wrap_response(result=await func(*args, **kwargs))
+
+            return async_inner
+
         @wraps(func)
         def inner(*args, **kwargs) -> tuple:
-            result = func(*args, **kwargs)
-
-            response, status_code = (
-                result if isinstance(result, tuple) else (result, 200)
-            )
-
-            message: Optional[str] = (
-                response.pop("message") if "message" in response else None
-            )
-            description: Optional[str] = (
-                response.pop("description") if "description" in response else None
-            )
-            errors: Optional[list] = (
-                response.pop("errors") if "errors" in response else []
-            )
-            """ prepare wrapped response """
-            data: list = []
-            if isinstance(response, list):
-                data = response
-            elif response:
-                data.append(response)
-            wrapped_response: dict[str, Union[str, list, bool]] = {
-                "success": True
-                if str(status_code.numerator).startswith("2")
-                else False,
-                "data": data,
-            }
-            if message:
-                wrapped_response["message"] = message
-            if description:
-                wrapped_response["description"] = description
-            if errors:
-                wrapped_response["errors"] = errors
-            return wrapped_response, status_code
+            return wrap_response(result=func(*args, **kwargs))
 
         return inner
 
@@ -0,0 +1,69 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Hashable
+
+
+class LRUCache:
+    """In-process bounded mapping, evicts the least recently used key"""
+
+    def __init__(self, max_size: int):
+        self.max_size: int = max_size
+        self._data: OrderedDict = OrderedDict()
+        self._lock: Lock = Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key: Hashable, value: Any) -> list[tuple[Hashable, Any]]:
+        """store the value, returns the evicted (key, value) pairs"""
+        evicted: list[tuple[Hashable, Any]] = []
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                evicted.append(self._data.popitem(last=False))
+        return evicted
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def items(self) -> list[tuple[Hashable, Any]]:
+        with self._lock:
+            return list(self._data.items())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class TTLCache(LRUCache):
+    """Bounded LRU cache whose entries expire after ttl seconds"""
+
+    def __init__(self, max_size: int, ttl: float):
+        super().__init__(max_size=max_size)
+        self.ttl: float = ttl
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = super().get(key)
+        if item is None:
+            return default
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            self.pop(key)
+            return default
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        super().set(key, (time.monotonic() + self.ttl, value))
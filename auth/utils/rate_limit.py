@@ -1,35 +1,520 @@
-import datetime
+import asyncio
+import atexit
+import logging
+import math
+import os
+import time
+import uuid
+from dataclasses import dataclass
 from functools import wraps
 from http import HTTPStatus
+from threading import Lock, Thread
+from typing import Optional
 
-from flask import request
+from flask import after_this_request, request
 
-from db import cache
+from core import config
+from core.metrics import RATE_LIMIT_REJECTIONS, endpoint_label
+from db import async_clients, cache
+from db.redis import hash_tag
+from utils.local_cache import LRUCache
 
+logger = logging.getLogger(__name__)
 
-def rate_limit(limit=1000, interval=60):
+# Lua scripts: ARGV = now (ms), limit, interval (ms), cost, force[, member prefix]
+# every script returns {allowed, remaining, reset (ms), retry_after (ms)};
+# force=1 counts the cost even over the limit (hits already served elsewhere)
+
+SLIDING_WINDOW_LOG_SCRIPT: str = """
+local now = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+local interval = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local force = tonumber(ARGV[5])
+redis.call("ZREMRANGEBYSCORE", KEYS[1], "-inf", now - interval)
+local count = redis.call("ZCARD", KEYS[1])
+local allowed = count + cost <= limit
+if allowed or force == 1 then
+    for i = 1, cost do
+        redis.call("ZADD", KEYS[1], now, ARGV[6] .. ":" .. i)
+    end
+    redis.call("PEXPIRE", KEYS[1], interval)
+    count = count + cost
+end
+local oldest = redis.call("ZRANGE", KEYS[1], 0, 0, "WITHSCORES")
+local reset = interval
+if oldest[2] then
+    reset = tonumber(oldest[2]) + interval - now
+end
+if allowed then
+    return {1, limit - count, reset, 0}
+end
+return {0, math.max(limit - count, 0), reset, reset}
+"""
+
+SLIDING_WINDOW_COUNTER_SCRIPT: str = """
+local now = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+local interval = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local force = tonumber(ARGV[5])
+local elapsed = now % interval
+local reset = interval - elapsed
+local current = tonumber(redis.call("GET", KEYS[1]) or "0")
+local previous = tonumber(redis.call("GET", KEYS[2]) or "0")
+local weighted = previous * reset / interval + current
+if weighted + cost <= limit then
+    redis.call("INCRBY", KEYS[1], cost)
+    redis.call("PEXPIRE", KEYS[1], interval * 2)
+    return {1, math.floor(limit - weighted - cost), reset, 0}
+end
+if force == 1 then
+    redis.call("INCRBY", KEYS[1], cost)
+    redis.call("PEXPIRE", KEYS[1], interval * 2)
+    -- counted: the retry is for the next single request
+    current = current + cost
+    weighted = weighted + cost
+    cost = 1
+end
+local retry = reset
+if previous > 0 and current + cost <= limit then
+    retry = math.min(reset, math.ceil((weighted + cost - limit) * interval / previous))
+end
+return {0, math.max(math.floor(limit - weighted), 0), reset, retry}
+"""
+
+GCRA_SCRIPT: str = """
+local now = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+local interval = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local force = tonumber(ARGV[5])
+local emission = interval / limit
+local tat = tonumber(redis.call("GET", KEYS[1]) or now)
+if tat < now then
+    tat = now
+end
+local new_tat = tat + emission * cost
+local allow_at = new_tat - interval
+if allow_at <= now or force == 1 then
+    redis.call("SET", KEYS[1], new_tat, "PX", math.ceil(new_tat - now))
+end
+if allow_at <= now then
+    return {1, math.floor((now - allow_at) / emission), math.ceil(new_tat - now), 0}
+end
+if force == 1 then
+    -- counted: the retry is for the next single request
+    return {0, 0, math.ceil(new_tat - now), math.ceil(new_tat + emission - interval - now)}
+end
+local remaining = math.max(math.floor((now - (tat - interval)) / emission), 0)
+return {0, remaining, math.ceil(tat - now), math.ceil(allow_at - now)}
+"""
+
+
+@dataclass
+class RateLimitResult:
+    allowed: bool
+    limit: int
+    remaining: int
+    reset: float
+    retry_after: float
+
+    @property
+    def headers(self) -> dict[str, str]:
+        headers: dict[str, str] = {
+            "X-RateLimit-Limit": f"{self.limit}",
+            "X-RateLimit-Remaining": f"{max(self.remaining, 0)}",
+            "X-RateLimit-Reset": f"{math.ceil(self.reset)}",
+        }
+        if not self.allowed:
+            headers["Retry-After"] = f"{max(math.ceil(self.retry_after), 1)}"
+        return headers
+
+
+class RateLimitAlgorithm:
+    """Base class for algorithms evaluated by one atomic Redis script call"""
+
+    name: str = None
+    script_source: str = None
+
+    def __init__(self):
+        self.script = cache.register_script(self.script_source)
+
+    def keys(self, key: str, now: int, interval: int) -> list[str]:
+        return [f"{key}"]
+
+    def args(self, now: int, limit: int, interval: int, cost: int, force: bool) -> list:
+        return [now, limit, interval, cost, int(force)]
+
+    def flush(self, idle: float = 0) -> None:
+        """every hit goes to Redis at once, nothing to send"""
+
+    def call(self, key: str, limit: int, interval: int, cost: int, force: bool) -> dict:
+        """keys and args of the script, interval in seconds"""
+        now: int = int(time.time() * 1000)
+        interval_ms: int = int(interval * 1000)
+        return {
+            "keys": self.keys(key=key, now=now, interval=interval_ms),
+            "args": self.args(
+                now=now, limit=limit, interval=interval_ms, cost=cost, force=force
+            ),
+        }
+
+    @staticmethod
+    def result(reply: list, limit: int) -> RateLimitResult:
+        allowed, remaining, reset, retry_after = reply
+        return RateLimitResult(
+            allowed=bool(allowed),
+            limit=limit,
+            remaining=int(remaining),
+            reset=int(reset) / 1000,
+            retry_after=int(retry_after) / 1000,
+        )
+
+    def hit(
+        self, key: str, limit: int, interval: int, cost: int = 1, force: bool = False
+    ):
+        """Count `cost` requests for key, interval in seconds; with force
+        they are counted even when the answer is not allowed"""
+        reply: list = self.script(
+            **self.call(key=key, limit=limit, interval=interval, cost=cost, force=force)
+        )
+        return self.result(reply=reply, limit=limit)
+
+    async def hit_async(
+        self, key: str, limit: int, interval: int, cost: int = 1, force: bool = False
+    ):
+        """hit on the asyncio client"""
+        reply: list = await async_clients.script(self.script)(
+            **self.call(key=key, limit=limit, interval=interval, cost=cost, force=force)
+        )
+        return self.result(reply=reply, limit=limit)
+
+
+class SlidingWindowLog(RateLimitAlgorithm):
+    """Exact limit: timestamp of every request inside the interval"""
+
+    name: str = "sliding_window_log"
+    script_source: str = SLIDING_WINDOW_LOG_SCRIPT
+
+    def args(self, now: int, limit: int, interval: int, cost: int, force: bool) -> list:
+        return [now, limit, interval, cost, int(force), uuid.uuid4().hex]
+
+
+class SlidingWindowCounter(RateLimitAlgorithm):
+    """Approximate limit: current window plus weighted previous window"""
+
+    name: str = "sliding_window_counter"
+    script_source: str = SLIDING_WINDOW_COUNTER_SCRIPT
+
+    def keys(self, key: str, now: int, interval: int) -> list[str]:
+        window: int = now // interval
+        return [f"{key}:{window}", f"{key}:{window - 1}"]
+
+
+class GCRA(RateLimitAlgorithm):
+    """Generic cell rate algorithm: one timestamp per key, bursts up to limit"""
+
+    name: str = "gcra"
+    script_source: str = GCRA_SCRIPT
+
+
+ALGORITHMS: dict[str, type] = {
+    algorithm.name: algorithm
+    for algorithm in (SlidingWindowLog, SlidingWindowCounter, GCRA)
+}
+
+
+class TokenBucket:
+    __slots__ = (
+        "limit",
+        "interval",
+        "tokens",
+        "updated_at",
+        "pending",
+        "synced_at",
+        "remaining",
+        "blocked_until",
+    )
+
+    def __init__(self, limit: int, interval: int, now: float):
+        self.limit: int = limit
+        self.interval: int = interval
+        self.tokens: float = limit
+        self.updated_at: float = now
+        self.pending: int = 0
+        self.synced_at: float = now
+        self.remaining: int = limit
+        self.blocked_until: float = 0
+
+
+class LocalRateLimiter:
+    """Per-process token buckets in front of a Redis algorithm.
+
+    Keys over the local rate or blocked by the last Redis answer are rejected
+    without a round trip. Allowed hits are served at once and sent to Redis
+    as one batch (cost) when the batch is full, the sync interval passed or
+    the batch could exhaust the remaining global limit. Redis counts the
+    batch even over the limit, its answer only drains the local bucket. A
+    background thread sends batches idle for the sync interval, evicted
+    buckets are sent before they are dropped.
+    """
+
+    def __init__(
+        self,
+        remote: RateLimitAlgorithm,
+        max_keys: int,
+        sync_batch: int,
+        sync_interval: float,
+    ):
+        self.remote: RateLimitAlgorithm = remote
+        self.name: str = remote.name
+        self.sync_batch: int = sync_batch
+        self.sync_interval: float = sync_interval
+        self.buckets: LRUCache = LRUCache(max_size=max_keys)
+        self._lock: Lock = Lock()
+        self._pid: Optional[int] = None
+
+    def hit(self, key: str, limit: int, interval: int, cost: int = 1):
+        result, bucket, sync, evicted = self._hit_locally(
+            key=key, limit=limit, interval=interval, cost=cost
+        )
+        for evicted_key, evicted_bucket in evicted:
+            self._sync(key=evicted_key, bucket=evicted_bucket)
+        if sync:
+            reply: Optional[RateLimitResult] = self._sync(key=key, bucket=bucket)
+            if reply is not None:
+                result.remaining, result.reset = reply.remaining, reply.reset
+        return result
+
+    async def hit_async(self, key: str, limit: int, interval: int, cost: int = 1):
+        """hit with the batches sent on the asyncio client; the background
+        thread keeps sending idle ones on the blocking client"""
+        result, bucket, sync, evicted = self._hit_locally(
+            key=key, limit=limit, interval=interval, cost=cost
+        )
+        for evicted_key, evicted_bucket in evicted:
+            await self._sync_async(key=evicted_key, bucket=evicted_bucket)
+        if sync:
+            reply: Optional[RateLimitResult] = await self._sync_async(
+                key=key, bucket=bucket
+            )
+            if reply is not None:
+                result.remaining, result.reset = reply.remaining, reply.reset
+        return result
+
+    def _hit_locally(
+        self, key: str, limit: int, interval: int, cost: int
+    ) -> tuple[RateLimitResult, TokenBucket, bool, list[tuple[str, TokenBucket]]]:
+        """the local answer, the key's bucket, whether its batch is due and
+        the buckets evicted for it"""
+        self._ensure_worker()
+        now: float = time.monotonic()
+        evicted: list[tuple[str, TokenBucket]] = []
+        with self._lock:
+            bucket: TokenBucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(limit=limit, interval=interval, now=now)
+                evicted = self.buckets.set(key, bucket)
+            result, sync = self._take(bucket=bucket, cost=cost, now=now)
+        return result, bucket, sync, evicted
+
+    def flush(self, idle: float = 0) -> None:
+        """send the batches not synced for idle seconds"""
+        now: float = time.monotonic()
+        for key, bucket in self.buckets.items():
+            if bucket.pending and now - bucket.synced_at >= idle:
+                self._sync(key=key, bucket=bucket)
+
+    def _take(
+        self, bucket: TokenBucket, cost: int, now: float
+    ) -> tuple[RateLimitResult, bool]:
+        """the local answer and whether the batch is due, under the lock"""
+        limit, interval = bucket.limit, bucket.interval
+        bucket.tokens = min(
+            limit, bucket.tokens + (now - bucket.updated_at) * limit / interval
+        )
+        bucket.updated_at = now
+        retry_after: float = max(
+            bucket.blocked_until - now, (cost - bucket.tokens) * interval / limit
+        )
+        if retry_after > 0:
+            return (
+                RateLimitResult(
+                    allowed=False,
+                    limit=limit,
+                    remaining=0,
+                    reset=retry_after,
+                    retry_after=retry_after,
+                ),
+                False,
+            )
+        bucket.tokens -= cost
+        bucket.pending += cost
+        sync: bool = (
+            bucket.pending >= min(self.sync_batch, bucket.remaining)
+            or now - bucket.synced_at >= self.sync_interval
+        )
+        return (
+            RateLimitResult(
+                allowed=True,
+                limit=limit,
+                remaining=bucket.remaining - bucket.pending,
+                reset=interval,
+                retry_after=0,
+            ),
+            sync,
+        )
+
+    def _sync(self, key: str, bucket: TokenBucket) -> Optional[RateLimitResult]:
+        batch, now = self._start_sync(bucket=bucket)
+        if not batch:
+            return None
+        try:
+            result: RateLimitResult = self.remote.hit(
+                key=key,
+                limit=bucket.limit,
+                interval=bucket.interval,
+                cost=batch,
+                force=True,
+            )
+        except Exception:
+            self._restore_batch(bucket=bucket, batch=batch)
+            raise
+        self._finish_sync(bucket=bucket, result=result, now=now)
+        return result
+
+    async def _sync_async(
+        self, key: str, bucket: TokenBucket
+    ) -> Optional[RateLimitResult]:
+        batch, now = self._start_sync(bucket=bucket)
+        if not batch:
+            return None
+        try:
+            result: RateLimitResult = await self.remote.hit_async(
+                key=key,
+                limit=bucket.limit,
+                interval=bucket.interval,
+                cost=batch,
+                force=True,
+            )
+        except Exception:
+            self._restore_batch(bucket=bucket, batch=batch)
+            raise
+        self._finish_sync(bucket=bucket, result=result, now=now)
+        return result
+
+    def _start_sync(self, bucket: TokenBucket) -> tuple[int, float]:
+        """takes the pending batch"""
+        with self._lock:
+            batch, bucket.pending = bucket.pending, 0
+            bucket.synced_at = now = time.monotonic()
+        return batch, now
+
+    def _restore_batch(self, bucket: TokenBucket, batch: int) -> None:
+        """the batch was not counted, it goes with the next one"""
+        with self._lock:
+            bucket.pending += batch
+
+    def _finish_sync(
+        self, bucket: TokenBucket, result: RateLimitResult, now: float
+    ) -> None:
+        with self._lock:
+            bucket.remaining = result.remaining
+            if not result.allowed:
+                bucket.tokens = 0
+                bucket.blocked_until = now + result.retry_after
+
+    def _ensure_worker(self) -> None:
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is None:
+                atexit.register(self.flush)
+            self._pid = os.getpid()
+            Thread(target=self._run, name="rate-limit-sync", daemon=True).start()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.sync_interval)
+            try:
+                self.flush(idle=self.sync_interval)
+            except Exception:
+                logger.exception("Failed to sync local rate limits")
+
+
+if config.RATE_LIMIT_ALGORITHM not in ALGORITHMS:
+    raise ValueError(
+        f"Unknown RATE_LIMIT_ALGORITHM {config.RATE_LIMIT_ALGORITHM}, "
+        f"expected one of {', '.join(ALGORITHMS)}"
+    )
+limiter = ALGORITHMS[config.RATE_LIMIT_ALGORITHM]()
+if config.RATE_LIMIT_LOCAL_ENABLED:
+    limiter = LocalRateLimiter(
+        remote=limiter,
+        max_keys=config.RATE_LIMIT_LOCAL_MAX_KEYS,
+        sync_batch=config.RATE_LIMIT_LOCAL_SYNC_BATCH,
+        sync_interval=config.RATE_LIMIT_LOCAL_SYNC_INTERVAL,
+    )
+
+
+def rate_limit(limit=1000, interval=60, scope: Optional[str] = None):
     """Rate limit for API endpoints.
     If the user has exceeded the limit, then return the response 429.
+    A coroutine view (see asgi.py) gets a coroutine wrapper; it passes the
+    scope of its sync twin to share the twin's counters.
     """
+    limit: int = max(1, int(limit * config.RATE_LIMIT_SCALE))
+
+    def rejected(result: RateLimitResult) -> tuple:
+        RATE_LIMIT_REJECTIONS.labels(endpoint=endpoint_label()).inc()
+        return (
+            {
+                "message": f"Too many requests. Limit {limit} in {interval} seconds",
+            },
+            HTTPStatus.TOO_MANY_REQUESTS,
+            result.headers,
+        )
+
+    def add_headers(result: RateLimitResult) -> None:
+        @after_this_request
+        def add_rate_limit_headers(response):
+            for name, value in result.headers.items():
+                response.headers[name] = value
+            return response
 
     def rate_limit_decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            key: str = f"Limit::{request.remote_addr}:{datetime.datetime.now().minute}"
-            current_request_count = cache.get(key=key)
+        # a counter per decorated view: endpoints don't share their limits
+        view_scope: str = scope or f"{func.__module__}.{func.__qualname__}"
+
+        def get_key() -> str:
+            return f"Limit::{limiter.name}:{view_scope}:{hash_tag(request.remote_addr)}"
 
-            if current_request_count and int(current_request_count) >= limit:
-                return {
-                    "message": f"Too many requests. Limit {limit} in {interval} seconds",
-                }, HTTPStatus.TOO_MANY_REQUESTS
+        if asyncio.iscoroutinefunction(func):
 
-            else:
-                pipe = cache.pipeline()
-                pipe.incr(key, 1)
-                pipe.expire(key, interval + 1)
-                pipe.execute()
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                result: RateLimitResult = await limiter.hit_async(
+                    key=get_key(), limit=limit, interval=interval
+                )
+                if not result.allowed:
+                    return rejected(result=result)
+                add_headers(result=result)
+                return await func(*args, **kwargs)
 
-                return func(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            result: RateLimitResult = limiter.hit(
+                key=get_key(), limit=limit, interval=interval
+            )
+            if not result.allowed:
+                return rejected(result=result)
+            add_headers(result=result)
+            return func(*args, **kwargs)
 
         return wrapper
 
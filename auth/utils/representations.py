@@ -0,0 +1,16 @@
+import orjson
+from flask import make_response
+
+# UUID, datetime and enums are serialized natively, no default= fallback
+JSON_OPTIONS: int = orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS
+
+
+def dumps(data) -> bytes:
+    return orjson.dumps(data, option=JSON_OPTIONS)
+
+
+def output_json(data, code, headers=None):
+    """flask-restful "application/json" representation serialized by orjson"""
+    response = make_response(dumps(data), code)
+    response.headers.extend(headers or {})
+    return response
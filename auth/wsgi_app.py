@@ -2,4 +2,11 @@ from gevent import monkey
 
 monkey.patch_all()
 
-from app import app
+from psycogreen.gevent import patch_psycopg
+
+# psycopg2 waits for the server through the gevent hub
+patch_psycopg()
+
+from app import app, create_app
+
+create_app(flask_app=app)